@@ -6,15 +6,18 @@ http://www.algolia.com
 from django.utils.module_loading import autodiscover_modules
 
 import logging
+from . import group
 from . import models
 from . import registration
 from . import settings
+from . import tasks
 from . import version
 
 __version__ = version.VERSION
 ALGOLIA_SETTINGS = settings.SETTINGS
 
 AlgoliaIndex = models.AlgoliaIndex
+AlgoliaIndexGroup = group.AlgoliaIndexGroup
 AlgoliaEngine = registration.AlgoliaEngine
 algolia_engine = registration.algolia_engine
 
@@ -33,6 +36,11 @@ update_records = algolia_engine.update_records
 raw_search = algolia_engine.raw_search
 clear_objects = algolia_engine.clear_objects
 reindex_all = algolia_engine.reindex_all
+reindex_since = algolia_engine.reindex_since
+
+# Background tasks functions
+
+wait_all = tasks.task_waiter.wait_all
 
 
 class NullHandler(logging.Handler):
@@ -1,3 +1,5 @@
+import atexit
+
 from django.apps import AppConfig
 
 
@@ -9,3 +11,5 @@ class AlgoliaConfig(AppConfig):
     def ready(self):
         super(AlgoliaConfig, self).ready()
         self.module.autodiscover()
+        # Drain the queues of ASYNC_INDEXING when the process exits
+        atexit.register(self.module.algolia_engine.shutdown)
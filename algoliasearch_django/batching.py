@@ -0,0 +1,96 @@
+from __future__ import unicode_literals
+
+import logging
+
+from .encoders import is_json
+
+logger = logging.getLogger(__name__)
+
+# The bytes added to each record by the batch request wrapping it, e.g.
+# {"action":"partialUpdateObjectNoCreate","body":...},
+ACTION_BYTES = 48
+
+
+class RecordBatcher(object):
+    """
+    Splits the records to send into batches of a bounded number of records
+    and, if `batch_bytes` is set, of a bounded encoded size.
+
+    The records larger than `max_record_bytes` are passed to `trim` with the
+    limit, which returns a smaller record or None to skip it, so that a
+    single record does not fail its whole batch.
+
+    The batches hold the records normalized by the encoder, when they hold
+    types other than those of JSON.
+    """
+
+    def __init__(self, encoder, batch_bytes=None, max_record_bytes=None, trim=None):
+        self.encoder = encoder
+        self.batch_bytes = batch_bytes
+        self.max_record_bytes = max_record_bytes
+        self.trim = trim
+
+    def split(self, records, batch_size=1000, batch_bytes=None, skipped=None):
+        """
+        Yields the batches of the records. The objectIDs of the skipped
+        records are appended to the `skipped` list, if given.
+        """
+        batch_bytes = batch_bytes or self.batch_bytes
+        if not batch_bytes and not self.max_record_bytes:
+            # Nothing to measure, the client splits the records by count
+            yield self.encoder.normalize(records)
+            return
+
+        batch = []
+        size = 0
+        for record in records:
+            measured, record_size = self.measure(record)
+            if measured is None:
+                if skipped is not None:
+                    skipped.append(record.get("objectID"))
+                continue
+            record = measured
+
+            if batch and (
+                len(batch) >= batch_size
+                or (batch_bytes and size + record_size > batch_bytes)
+            ):
+                yield batch
+                batch = []
+                size = 0
+            batch.append(record)
+            size += record_size + ACTION_BYTES
+        if batch:
+            yield batch
+
+    def measure(self, record):
+        """
+        Returns the record normalized and its encoded size, or None if it is
+        too large.
+        """
+        payload = self.encoder.encode(record)
+        if self.max_record_bytes and len(payload) > self.max_record_bytes:
+            trimmed = None
+            if self.trim is not None:
+                trimmed = self.trim(self.encoder.decode(payload), self.max_record_bytes)
+            if trimmed is not None:
+                trimmed_payload = self.encoder.encode(trimmed)
+                if len(trimmed_payload) <= self.max_record_bytes:
+                    logger.info(
+                        "RECORD %s TRIMMED FROM %d TO %d BYTES",
+                        record.get("objectID"),
+                        len(payload),
+                        len(trimmed_payload),
+                    )
+                    return self.encoder.decode(trimmed_payload), len(trimmed_payload)
+
+            logger.warning(
+                "RECORD %s SKIPPED: %d BYTES, OVER THE LIMIT OF %d",
+                record.get("objectID"),
+                len(payload),
+                self.max_record_bytes,
+            )
+            return None, len(payload)
+        if not is_json(record):
+            record = self.encoder.decode(payload)
+        return record, len(payload)
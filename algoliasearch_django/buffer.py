@@ -0,0 +1,216 @@
+from __future__ import unicode_literals
+
+from collections import OrderedDict
+from functools import partial
+import logging
+import threading
+
+from django.db import transaction
+
+from .group import AlgoliaIndexGroup, iter_indices
+
+logger = logging.getLogger(__name__)
+
+SAVE = "save"
+PARTIAL_UPDATE = "partial_update"
+DELETE = "delete"
+
+
+class PendingRecord(dict):
+    """
+    A full raw record, queued with its instance until the attributes of the
+    prepare_batch of its index are added, once for all the pending records
+    of the index when the buffer is sent.
+    """
+
+    def __init__(self, record, instance):
+        super(PendingRecord, self).__init__(record)
+        self.instance = instance
+
+
+class IndexingBuffer(object):
+    """
+    Collects write operations and sends them as one batch per index.
+
+    Operations are keyed by index and objectID: a later operation on the same
+    record replaces the pending one, except partial updates which are merged
+    into it.
+    """
+
+    def __init__(self):
+        self._operations = OrderedDict()
+
+    def __len__(self):
+        return len(self._operations)
+
+    def __iter__(self):
+        """Iterates over the pending operations as (adapter, action, record)."""
+        for (adapter, _), (action, record) in self._operations.items():
+            yield adapter, action, record
+
+    def save(self, adapter, instance, update_fields=None):
+        """Queues the record of the instance (or its deletion if it should not be indexed)."""
+        if isinstance(adapter, AlgoliaIndexGroup):
+            with adapter.shared_fields():
+                for index in adapter.indices:
+                    self.save(index, instance, update_fields=update_fields)
+            return
+
+        if not adapter._should_index(instance):
+            self.delete(adapter, instance)
+            return
+
+        update_fields = adapter._get_update_fields(update_fields)
+        if update_fields is not None:
+            record = adapter.get_raw_record(instance, update_fields=update_fields)
+            self.add(adapter, PARTIAL_UPDATE, record)
+        else:
+            record = adapter.get_raw_record(instance)
+            if adapter._prepares_batch():
+                record = PendingRecord(record, instance)
+            self.add(adapter, SAVE, record)
+
+    def delete(self, adapter, instance):
+        """Queues the deletion of the record of the instance."""
+        for index in iter_indices(adapter):
+            self.add(index, DELETE, {"objectID": index.objectID(instance)})
+
+    def add(self, adapter, action, record):
+        """Queues a raw operation, collapsing it with the pending one on the same record."""
+        key = (adapter, record["objectID"])
+        previous = self._operations.pop(key, None)
+
+        if action == PARTIAL_UPDATE and previous is not None:
+            previous_action, previous_record = previous
+            if previous_action != DELETE:
+                action = previous_action
+                merged = dict(previous_record, **record)
+                if isinstance(previous_record, PendingRecord):
+                    merged = PendingRecord(merged, previous_record.instance)
+                record = merged
+
+        self._operations[key] = (action, record)
+
+    def merge(self, other):
+        """Queues all the operations of another buffer, which is then emptied."""
+        for adapter, action, record in other:
+            self.add(adapter, action, record)
+        other.clear()
+
+    def clear(self):
+        self._operations = OrderedDict()
+
+    def flush(self, raise_exceptions=False):
+        """
+        Sends the pending operations, grouped by index and action.
+
+        If `raise_exceptions` is set, the first error is raised instead of
+        logged.
+        """
+        operations, self._operations = self._operations, OrderedDict()
+        if operations:
+            logger.debug("FLUSH %d OPERATIONS", len(operations))
+
+        batches = OrderedDict()
+        for (adapter, object_id), (action, record) in operations.items():
+            batch = batches.setdefault(
+                adapter, {SAVE: [], PARTIAL_UPDATE: [], DELETE: []}
+            )
+            batch[action].append(object_id if action == DELETE else record)
+
+        for adapter, batch in batches.items():
+            _prepare(adapter, batch[SAVE])
+            adapter.save_objects(batch[SAVE], raise_exceptions=raise_exceptions)
+            adapter.partial_update_objects(
+                batch[PARTIAL_UPDATE], raise_exceptions=raise_exceptions
+            )
+            adapter.delete_objects(batch[DELETE], raise_exceptions=raise_exceptions)
+
+
+def _prepare(adapter, records):
+    """Replaces the pending records by their prepared version."""
+    pending = [
+        position
+        for position, record in enumerate(records)
+        if isinstance(record, PendingRecord)
+    ]
+    if not pending:
+        return
+
+    instances = [records[position].instance for position in pending]
+    prepared = adapter._prepare_records(
+        instances, [dict(records[position]) for position in pending]
+    )
+    for position, record in zip(pending, prepared):
+        records[position] = record
+
+
+class TransactionBuffer(object):
+    """
+    Defers write operations made inside a transaction until it commits.
+
+    Each operation is registered with `transaction.on_commit()`, so it is
+    dropped with its savepoint if that one is rolled back. Committed
+    operations are gathered in an `IndexingBuffer`, sent by the last of them
+    which is sure to run: one registered after it in the same atomic block
+    or an enclosing one runs whenever it does, and sends the buffer instead.
+    The buffer is flushed, or handed to `send` if it is given.
+    """
+
+    def __init__(self, send=None):
+        self._local = threading.local()
+        self._send = send
+
+    def in_transaction(self, using=None):
+        """Returns True if operations made on this connection can be deferred."""
+        return transaction.get_connection(using).in_atomic_block
+
+    def save(self, adapter, instance, update_fields=None, using=None):
+        """Defers the saving of the instance until the transaction commits."""
+        buffer = IndexingBuffer()
+        buffer.save(adapter, instance, update_fields=update_fields)
+        self._defer(buffer, using)
+
+    def delete(self, adapter, instance, using=None):
+        """Defers the deletion of the instance until the transaction commits."""
+        buffer = IndexingBuffer()
+        buffer.delete(adapter, instance)
+        self._defer(buffer, using)
+
+    def _state(self, using):
+        alias = transaction.get_connection(using).alias
+        if not hasattr(self._local, "states"):
+            self._local.states = {}
+        if alias not in self._local.states:
+            self._local.states[alias] = {"buffer": IndexingBuffer(), "pending": []}
+        return self._local.states[alias]
+
+    def _defer(self, buffer, using):
+        state = self._state(using)
+        # The savepoints of the atomic blocks the operation is made in
+        blocks = tuple(transaction.get_connection(using).savepoint_ids)
+        operation = {"blocks": blocks, "superseded": False}
+        pending = []
+        for previous in state["pending"]:
+            if previous["blocks"][: len(blocks)] == blocks:
+                previous["superseded"] = True
+            else:
+                pending.append(previous)
+        pending.append(operation)
+        state["pending"] = pending
+        transaction.on_commit(
+            partial(self._commit, state, buffer, operation), using=using
+        )
+
+    def _commit(self, state, buffer, operation):
+        state["buffer"].merge(buffer)
+        if operation in state["pending"]:
+            state["pending"].remove(operation)
+        if operation["superseded"]:
+            return
+
+        buffer, state["buffer"] = state["buffer"], IndexingBuffer()
+        if self._send is not None:
+            self._send(buffer)
+        else:
+            buffer.flush()
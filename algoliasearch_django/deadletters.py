@@ -0,0 +1,119 @@
+from __future__ import unicode_literals
+
+from contextlib import contextmanager
+import json
+import os
+import shutil
+import threading
+import time
+
+from django.utils.module_loading import import_string
+
+from .encoders import default
+
+
+def get_sink(settings):
+    """
+    Returns the dead-letter sink configured by the DEAD_LETTER_SINK setting,
+    or None if failed writes are only logged.
+    """
+    path = settings.get("DEAD_LETTER_SINK", None)
+    if not path:
+        return None
+
+    sink_cls = import_string(path)
+    return sink_cls(**settings.get("DEAD_LETTER_SINK_OPTIONS", {}))
+
+
+class DeadLetterSink(object):
+    """
+    Keeps the writes which failed after all their retries, to replay them
+    with the `algolia_replay_dead_letters` command.
+
+    An entry is a dict with the `index_name`, the `action` (save,
+    partial_update or delete), the raw `records` (only the objectID for a
+    delete), the `error` and the `failed_at` timestamp.
+    """
+
+    def add(self, index_name, action, records, error):
+        """Keeps a failed write."""
+        self.add_entry(
+            {
+                "index_name": index_name,
+                "action": action,
+                "records": records,
+                "error": str(error),
+                "failed_at": time.time(),
+            }
+        )
+
+    def add_entry(self, entry):
+        raise NotImplementedError
+
+    def pop_all(self):
+        """Returns and removes all the kept entries, oldest first."""
+        raise NotImplementedError
+
+    @contextmanager
+    def replay(self):
+        """
+        Yields all the kept entries, oldest first. They are removed only once
+        the block exits without error, and kept otherwise.
+        """
+        entries = self.pop_all()
+        try:
+            yield entries
+        except BaseException:
+            for entry in entries:
+                self.add_entry(entry)
+            raise
+
+
+class FileDeadLetterSink(DeadLetterSink):
+    """Appends the entries to a JSON lines file."""
+
+    _lock = threading.Lock()
+
+    def __init__(self, path):
+        self.path = path
+
+    def add_entry(self, entry):
+        # Encoded like the records sent, e.g. a Decimal as a float
+        line = json.dumps(entry, default=default) + "\n"
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+
+    def pop_all(self):
+        with self.replay() as entries:
+            return entries
+
+    @contextmanager
+    def replay(self):
+        # Entries added while replaying go to a new file, the replayed ones
+        # are kept in the `.replaying` file until the replay succeeds
+        replaying = "{}.replaying".format(self.path)
+        with self._lock:
+            if not os.path.exists(replaying):
+                try:
+                    os.rename(self.path, replaying)
+                except FileNotFoundError:
+                    pass
+            elif os.path.exists(self.path):
+                # Follow the entries of an interrupted replay
+                with open(self.path, encoding="utf-8") as src:
+                    with open(replaying, "a", encoding="utf-8") as dst:
+                        shutil.copyfileobj(src, dst)
+                os.remove(self.path)
+
+        try:
+            with open(replaying, encoding="utf-8") as f:
+                entries = [json.loads(line) for line in f if line.strip()]
+        except FileNotFoundError:
+            entries = []
+
+        yield entries
+        try:
+            os.remove(replaying)
+        except FileNotFoundError:
+            pass
@@ -65,6 +65,7 @@ class disable_auto_indexing(ContextDecorator):
                 algolia_engine._AlgoliaEngine__pre_delete_receiver,  # pyright: ignore
                 sender=model,
             )
+            algolia_engine._AlgoliaEngine__auto_indexed.discard(model)  # pyright: ignore
 
     def __exit__(self, exc_type, exc_value, traceback):
         for model in self.models:
@@ -76,3 +77,4 @@ class disable_auto_indexing(ContextDecorator):
                 algolia_engine._AlgoliaEngine__pre_delete_receiver,  # pyright: ignore
                 sender=model,
             )
+            algolia_engine._AlgoliaEngine__auto_indexed.add(model)  # pyright: ignore
@@ -0,0 +1,81 @@
+from __future__ import unicode_literals
+
+from array import array
+from bisect import bisect_left
+
+from .fingerprints import fingerprint
+
+
+def content_hash(record):
+    """Returns a 64 bits hash of a raw record, never 0."""
+    return int(fingerprint(record, digest_size=8), 16) or 1
+
+
+def format_hash(value):
+    return "{:016x}".format(value)
+
+
+def parse_hash(value):
+    """Parses a stored hash, returning 0 if it is missing or invalid."""
+    try:
+        return int(value, 16)
+    except (TypeError, ValueError):
+        return 0
+
+
+class IndexSnapshot(object):
+    """
+    The objectIDs of an index and the content hashes stored in their
+    records, as a sorted list and an array of 64 bits integers, so that the
+    full records are never kept in memory.
+
+    While the records are compared to the snapshot, the objectIDs found are
+    flagged, and the ones never found are the orphans of the index.
+    """
+
+    def __init__(self, object_ids, hashes):
+        order = sorted(range(len(object_ids)), key=object_ids.__getitem__)
+        self.object_ids = [object_ids[i] for i in order]
+        self.hashes = array("Q", (hashes[i] for i in order))
+        self.seen = bytearray(len(order))
+
+    def __len__(self):
+        return len(self.object_ids)
+
+    def match(self, object_id, value):
+        """
+        Flags the objectID as found, and returns True if its record has the
+        given content hash in the index.
+        """
+        object_id = str(object_id)
+        i = bisect_left(self.object_ids, object_id)
+        if i == len(self.object_ids) or self.object_ids[i] != object_id:
+            return False
+
+        self.seen[i] = 1
+        return self.hashes[i] == value
+
+    def orphans(self):
+        """Yields the objectIDs which were never matched."""
+        for object_id, seen in zip(self.object_ids, self.seen):
+            if not seen:
+                yield object_id
+
+
+def snapshot_index(client, index_name, attribute):
+    """Browses the objectIDs and the content hashes of an index."""
+    object_ids = []
+    hashes = array("Q")
+
+    def aggregate(resp):
+        for hit in resp.hits:
+            hit = hit.to_dict()
+            object_ids.append(str(hit["objectID"]))
+            hashes.append(parse_hash(hit.get(attribute)))
+
+    client.browse_objects(
+        index_name,
+        aggregate,
+        {"attributesToRetrieve": [attribute], "hitsPerPage": 1000},
+    )
+    return IndexSnapshot(object_ids, hashes)
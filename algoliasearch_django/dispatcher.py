@@ -0,0 +1,213 @@
+from __future__ import unicode_literals
+
+import atexit
+import logging
+import queue
+import threading
+from collections import Counter
+
+from django.db import close_old_connections
+from django.db import connections
+
+from .buffer import IndexingBuffer
+
+logger = logging.getLogger(__name__)
+
+# Policies applied when the queue of a worker is full
+BLOCK = "block"
+DROP_OLDEST = "drop_oldest"
+INLINE = "inline"
+
+BACKPRESSURE_POLICIES = (BLOCK, DROP_OLDEST, INLINE)
+
+_STOP = object()
+
+
+class Dispatcher(object):
+    """
+    Sends write operations from a pool of background threads.
+
+    Each worker has its own bounded queue. Operations are routed to a worker
+    by index and objectID, so that the operations on a given record are
+    always sent in order, even when the `inline` backpressure sends some of
+    them from the caller. A worker merges the operations waiting in its
+    queue, up to `batch_size`, into a single `IndexingBuffer` flush.
+    """
+
+    def __init__(self, workers=1, queue_size=1000, backpressure=BLOCK, batch_size=1000):
+        if backpressure not in BACKPRESSURE_POLICIES:
+            raise ValueError(
+                "backpressure must be one of {}, got {}".format(
+                    ", ".join(BACKPRESSURE_POLICIES), backpressure
+                )
+            )
+
+        self.workers = max(1, workers)
+        self.backpressure = backpressure
+        self.batch_size = batch_size
+        self._queues = [
+            queue.Queue(maxsize=max(1, queue_size // self.workers))
+            for _ in range(self.workers)
+        ]
+        self._threads: list = [None] * self.workers
+        self._lock = threading.Lock()
+        # The number of queued or sending operations of each record
+        self._pending = Counter()
+        self._pending_lock = threading.Lock()
+        self._stopped = False
+        self._atexit_registered = False
+
+    def save(self, adapter, instance, update_fields=None):
+        """Queues the saving of the instance."""
+        buffer = IndexingBuffer()
+        buffer.save(adapter, instance, update_fields=update_fields)
+        self.dispatch(buffer)
+
+    def delete(self, adapter, instance):
+        """Queues the deletion of the instance."""
+        buffer = IndexingBuffer()
+        buffer.delete(adapter, instance)
+        self.dispatch(buffer)
+
+    def dispatch(self, buffer):
+        """Queues all the operations of the buffer, which is then emptied."""
+        if self._stopped:
+            buffer.flush()
+            return
+
+        self._ensure_started()
+        for operation in buffer:
+            worker = hash(_key(operation)) % self.workers
+            self._put(self._queues[worker], operation)
+        buffer.clear()
+
+    def join(self):
+        """Blocks until all the queued operations have been sent."""
+        for worker_queue in self._queues:
+            worker_queue.join()
+
+    def shutdown(self, timeout=None):
+        """Sends the queued operations and stops the workers."""
+        with self._lock:
+            if self._stopped:
+                return
+            self._stopped = True
+            threads = [thread for thread in self._threads if thread is not None]
+
+        for worker_queue, thread in zip(self._queues, self._threads):
+            if thread is not None and thread.is_alive():
+                worker_queue.put(_STOP)
+        for thread in threads:
+            thread.join(timeout)
+        logger.debug("DISPATCHER STOPPED")
+
+    def _put(self, worker_queue, operation):
+        key = _key(operation)
+        with self._pending_lock:
+            self._pending[key] += 1
+            pending = self._pending[key]
+
+        while True:
+            try:
+                worker_queue.put_nowait(operation)
+                return
+            except queue.Full:
+                pass
+
+            if self.backpressure == BLOCK or (
+                self.backpressure == INLINE and pending > 1
+            ):
+                # Operations on the same record are still waiting: this one
+                # can only be sent after them
+                worker_queue.put(operation)
+                return
+            elif self.backpressure == INLINE:
+                try:
+                    self._send([operation])
+                finally:
+                    self._done([operation])
+                return
+            else:
+                try:
+                    dropped = worker_queue.get_nowait()
+                    worker_queue.task_done()
+                    self._done([dropped])
+                    adapter, action, record = dropped
+                    logger.warning(
+                        "DROP %s OF %s FROM %s: QUEUE IS FULL",
+                        action,
+                        record["objectID"],
+                        adapter.model,
+                    )
+                except queue.Empty:
+                    pass
+
+    def _ensure_started(self):
+        with self._lock:
+            for worker, thread in enumerate(self._threads):
+                # Threads do not survive a fork, so check they are still alive
+                if thread is None or not thread.is_alive():
+                    thread = threading.Thread(
+                        target=self._run,
+                        args=(self._queues[worker],),
+                        name="algolia-dispatcher-{}".format(worker),
+                        daemon=True,
+                    )
+                    thread.start()
+                    self._threads[worker] = thread
+
+            if not self._atexit_registered:
+                atexit.register(self.shutdown)
+                self._atexit_registered = True
+
+    def _run(self, worker_queue):
+        while True:
+            operations = [worker_queue.get()]
+            while len(operations) < self.batch_size:
+                try:
+                    operations.append(worker_queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = _STOP in operations
+            operations = [op for op in operations if op is not _STOP]
+            # The records may be prepared from the database: like Django does
+            # around a request, drop the stale connections of the thread
+            close_old_connections()
+            try:
+                self._send(operations)
+            finally:
+                self._done(operations)
+                close_old_connections()
+                for _ in range(len(operations) + stop):
+                    worker_queue.task_done()
+
+            if stop:
+                connections.close_all()
+                return
+
+    def _send(self, operations):
+        buffer = IndexingBuffer()
+        for adapter, action, record in operations:
+            buffer.add(adapter, action, record)
+
+        try:
+            buffer.flush()
+        except Exception as e:
+            logger.warning(
+                "ERROR DURING DISPATCH OF %d OPERATIONS: %s", len(operations), e
+            )
+
+    def _done(self, operations):
+        with self._pending_lock:
+            for operation in operations:
+                key = _key(operation)
+                if self._pending[key] > 1:
+                    self._pending[key] -= 1
+                else:
+                    self._pending.pop(key, None)
+
+
+def _key(operation):
+    adapter, _, record = operation
+    return adapter.index_name, record["objectID"]
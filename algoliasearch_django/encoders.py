@@ -0,0 +1,122 @@
+from __future__ import unicode_literals
+
+import datetime
+import decimal
+import json
+import uuid
+
+from django.utils.functional import Promise
+from django.utils.module_loading import import_string
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def get_encoder(settings):
+    """
+    Returns the record encoder configured by the RECORD_ENCODER setting,
+    by default an OrjsonRecordEncoder if orjson is installed, and a
+    JSONRecordEncoder otherwise.
+    """
+    path = settings.get("RECORD_ENCODER", None)
+    if path:
+        encoder_cls = import_string(path)
+    elif orjson is not None:
+        encoder_cls = OrjsonRecordEncoder
+    else:
+        encoder_cls = JSONRecordEncoder
+    return encoder_cls(**settings.get("RECORD_ENCODER_OPTIONS", {}))
+
+
+def default(value):
+    """
+    Converts the values JSON does not support: Decimal to float, dates and
+    times to ISO 8601 strings, UUID and lazy translations to str, sets and
+    tuples to lists.
+    """
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, datetime.timedelta):
+        return value.total_seconds()
+    if isinstance(value, (uuid.UUID, Promise)):
+        return str(value)
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    raise TypeError(
+        "Object of type {} is not JSON serializable".format(type(value).__name__)
+    )
+
+
+def is_json(value):
+    """
+    Returns True if the value only holds the types of JSON, with string keys,
+    so that it does not need to be normalized.
+    """
+    if value is None or isinstance(value, (str, int, float)):
+        return True
+    if isinstance(value, list):
+        return all(is_json(item) for item in value)
+    if isinstance(value, dict):
+        return all(
+            isinstance(key, str) and is_json(item) for key, item in value.items()
+        )
+    return False
+
+
+class RecordEncoder(object):
+    """
+    Encodes the raw records to JSON.
+
+    Before a write, the records holding other types are normalized by a round
+    trip through the encoder, so that the client only gets the types of JSON.
+    """
+
+    def encode(self, records):
+        """Returns the JSON of the records, or of a single record, in bytes."""
+        raise NotImplementedError
+
+    def decode(self, payload):
+        raise NotImplementedError
+
+    def normalize(self, records):
+        """Returns the records, or copies of them holding only JSON types."""
+        if is_json(records):
+            return records
+        return self.decode(self.encode(records))
+
+
+class JSONRecordEncoder(RecordEncoder):
+    """Encodes the records with the json module of the standard library."""
+
+    def encode(self, records):
+        return json.dumps(
+            records, default=default, ensure_ascii=False, separators=(",", ":")
+        ).encode("utf-8")
+
+    def decode(self, payload):
+        return json.loads(payload)
+
+
+class OrjsonRecordEncoder(RecordEncoder):
+    """
+    Encodes the records with orjson, which serializes datetimes and UUIDs
+    natively.
+    """
+
+    def __init__(self):
+        if orjson is None:
+            raise ImportError("OrjsonRecordEncoder requires the orjson package")
+        self._orjson = orjson
+
+    def encode(self, records):
+        # Like the json module, converts the keys which are not strings
+        return self._orjson.dumps(
+            records, default=default, option=self._orjson.OPT_NON_STR_KEYS
+        )
+
+    def decode(self, payload):
+        return self._orjson.loads(payload)
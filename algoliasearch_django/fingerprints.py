@@ -0,0 +1,149 @@
+from __future__ import unicode_literals
+
+from collections import OrderedDict
+import hashlib
+import json
+import threading
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.utils.module_loading import import_string
+
+
+def fingerprint(record, digest_size=16):
+    """Returns a stable hash of a raw record, as digest_size hex bytes."""
+    payload = json.dumps(record, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=digest_size).hexdigest()
+
+
+def cache_key(prefix, index_name, *parts):
+    """Returns a valid cache key for the given parts of a key of the index."""
+    # objectIDs may hold characters that are not valid in cache keys
+    key = ":".join(str(part) for part in (index_name,) + parts)
+    return prefix + hashlib.md5(key.encode("utf-8")).hexdigest()
+
+
+def get_store(index_name, settings):
+    """
+    Returns the fingerprint store configured by the FINGERPRINT_STORE
+    setting for the given index, or None if fingerprinting is disabled.
+    """
+    path = settings.get("FINGERPRINT_STORE", None)
+    if not path:
+        return None
+
+    store_cls = import_string(path)
+    return store_cls(index_name, **settings.get("FINGERPRINT_STORE_OPTIONS", {}))
+
+
+class FingerprintStore(object):
+    """
+    Keeps the fingerprints of the records last sent to an index.
+
+    Subclasses implement the storage, keyed by objectID.
+    """
+
+    def __init__(self, index_name):
+        self.index_name = index_name
+
+    def get_many(self, object_ids):
+        """Returns a dict of the known fingerprints of the given objectIDs."""
+        raise NotImplementedError
+
+    def set_many(self, fingerprints):
+        """Stores a dict of fingerprints by objectID."""
+        raise NotImplementedError
+
+    def delete_many(self, object_ids):
+        """Forgets the fingerprints of the given objectIDs."""
+        raise NotImplementedError
+
+    def clear(self):
+        """Forgets all the fingerprints of the index."""
+        raise NotImplementedError
+
+
+class LocMemFingerprintStore(FingerprintStore):
+    """
+    Keeps the fingerprints in a per-process LRU.
+
+    Only use it when a single process writes to the index: a write from
+    another process is not seen, and a later identical write would be
+    skipped.
+    """
+
+    def __init__(self, index_name, max_size=10000):
+        super(LocMemFingerprintStore, self).__init__(index_name)
+        self.max_size = max_size
+        self._fingerprints = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, object_ids):
+        found = {}
+        with self._lock:
+            for object_id in object_ids:
+                if object_id in self._fingerprints:
+                    self._fingerprints.move_to_end(object_id)
+                    found[object_id] = self._fingerprints[object_id]
+        return found
+
+    def set_many(self, fingerprints):
+        with self._lock:
+            for object_id, value in fingerprints.items():
+                self._fingerprints[object_id] = value
+                self._fingerprints.move_to_end(object_id)
+            while len(self._fingerprints) > self.max_size:
+                self._fingerprints.popitem(last=False)
+
+    def delete_many(self, object_ids):
+        with self._lock:
+            for object_id in object_ids:
+                self._fingerprints.pop(object_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._fingerprints.clear()
+
+
+class CacheFingerprintStore(FingerprintStore):
+    """
+    Keeps the fingerprints in a Django cache, shared by all the processes.
+
+    Clearing the store bumps a version number stored in the cache, so the
+    keys of the previous version are left to expire.
+    """
+
+    def __init__(self, index_name, cache="default", timeout=DEFAULT_TIMEOUT):
+        super(CacheFingerprintStore, self).__init__(index_name)
+        self.cache = caches[cache]
+        self.timeout = timeout
+        self._version_key = self._hash_key("version")
+
+    def _hash_key(self, *parts):
+        return cache_key("algolia:fp:", self.index_name, *parts)
+
+    def _keys(self, object_ids):
+        version = self.cache.get(self._version_key, 0)
+        return {
+            self._hash_key(version, object_id): object_id for object_id in object_ids
+        }
+
+    def get_many(self, object_ids):
+        keys = self._keys(object_ids)
+        return {keys[key]: value for key, value in self.cache.get_many(keys).items()}
+
+    def set_many(self, fingerprints):
+        keys = self._keys(fingerprints)
+        self.cache.set_many(
+            {key: fingerprints[object_id] for key, object_id in keys.items()},
+            timeout=self.timeout,
+        )
+
+    def delete_many(self, object_ids):
+        self.cache.delete_many(list(self._keys(object_ids)))
+
+    def clear(self):
+        try:
+            self.cache.incr(self._version_key)
+        except ValueError:
+            self.cache.set(self._version_key, 1, timeout=None)
@@ -0,0 +1,262 @@
+from __future__ import unicode_literals
+
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import logging
+import threading
+
+from django.db import connections
+
+from .pipeline import BatchFeed
+
+logger = logging.getLogger(__name__)
+
+
+def iter_indices(adapter):
+    """Returns the indices of an adapter: those of a group, or the index itself."""
+    if isinstance(adapter, AlgoliaIndexGroup):
+        return adapter.indices
+    return (adapter,)
+
+
+class SharedFields(object):
+    """
+    Computes the fields of an instance once for all the indices of a group,
+    inside a scope. Outside of a scope, the fields are computed every time.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+
+    @contextmanager
+    def scope(self):
+        """Caches the fields computed until exiting, for a single instance."""
+        if getattr(self._local, "values", None) is not None:
+            yield  # Nested scopes share the outermost one
+            return
+
+        self._local.values = {}
+        try:
+            yield
+        finally:
+            self._local.values = None
+
+    def wrap(self, key, getter):
+        """Returns a getter caching the values of `getter` under `key`."""
+        local = self._local
+
+        def get(instance):
+            values = getattr(local, "values", None)
+            if values is None:
+                return getter(instance)
+            if key not in values:
+                values[key] = getter(instance)
+            return values[key]
+
+        return get
+
+
+class AlgoliaIndexGroup(object):
+    """
+    The indices registered for the same model, e.g. one per locale.
+
+    A save or a deletion is sent to each index, computing the fields they
+    share once. reindex_all reads the instances once, and feeds the records
+    of each index to its own reindex, run in a thread.
+    """
+
+    def __init__(self, model, indices):
+        self.model = model
+        self.indices = []
+        self.__shared = SharedFields()
+        for index in indices:
+            self.add(index)
+
+    def add(self, index):
+        """Adds an index to the group."""
+        index._share_fields(self.__shared)
+        self.indices.append(index)
+
+    @property
+    def custom_objectID(self):
+        return self.indices[0].custom_objectID
+
+    def objectID(self, instance):
+        return self.indices[0].objectID(instance)
+
+    def shared_fields(self):
+        """Returns a scope computing the shared fields of an instance once."""
+        return self.__shared.scope()
+
+    def _has_should_index(self):
+        return any(index._has_should_index() for index in self.indices)
+
+    def _should_index(self, instance):
+        """Returns True if the instance should be indexed by one of the indices."""
+        with self.__shared.scope():
+            return any(index._should_index(instance) for index in self.indices)
+
+    def save_record(self, instance, update_fields=None, **kwargs):
+        """Saves the record of the instance in each index."""
+        with self.__shared.scope():
+            for index in self.indices:
+                index.save_record(instance, update_fields=update_fields, **kwargs)
+
+    def delete_record(self, instance):
+        """Deletes the record of the instance from each index."""
+        for index in self.indices:
+            index.delete_record(instance)
+
+    def update_records(self, qs, batch_size=1000, **kwargs):
+        """Updates the records of the QuerySet in each index."""
+        for index in self.indices:
+            index.update_records(qs, batch_size=batch_size, **kwargs)
+
+    def raw_search(self, query="", params=None):
+        """Performs a search query on each index, and returns the results by index name."""
+        return {
+            index.index_name: index.raw_search(
+                query, dict(params) if params is not None else None
+            )
+            for index in self.indices
+        }
+
+    def set_settings(self):
+        """Applies the settings of each index."""
+        for index in self.indices:
+            index.set_settings()
+
+    def clear_objects(self):
+        """Clears each index."""
+        for index in self.indices:
+            index.clear_objects()
+
+    def reindex_since(
+        self, since=None, batch_size=1000, watermark_field=None, batch_bytes=None
+    ):
+        """Reindexes the instances modified since `since` in each index, in turn."""
+        results = [
+            index.reindex_since(
+                since,
+                batch_size=batch_size,
+                watermark_field=watermark_field,
+                batch_bytes=batch_bytes,
+            )
+            for index in self.indices
+        ]
+        return _total(results)
+
+    def reindex_all(
+        self,
+        batch_size=1000,
+        workers=1,
+        processes=1,
+        resume=False,
+        strategy="swap",
+        batch_bytes=None,
+    ):
+        """
+        Reindexes all the records of each index, and returns their total.
+
+        The instances are read once and the records of every index are built
+        from them, unless the indices read different querysets, or the
+        reindex is sharded in processes or resumed: then each index reads
+        them in turn.
+        """
+        qs = self.__get_reindex_queryset()
+        if qs is None or processes > 1 or resume:
+            logger.info("REINDEX THE INDICES OF %s IN TURN", self.model)
+            results = [
+                index.reindex_all(
+                    batch_size,
+                    workers=workers,
+                    processes=processes,
+                    resume=resume,
+                    strategy=strategy,
+                    batch_bytes=batch_bytes,
+                )
+                for index in self.indices
+            ]
+            return _total(results)
+
+        def reindex(index, feed):
+            try:
+                with index._reading_from(feed):
+                    return index.reindex_all(
+                        batch_size,
+                        workers=workers,
+                        strategy=strategy,
+                        batch_bytes=batch_bytes,
+                    )
+            finally:
+                feed.drain()
+                connections.close_all()
+
+        feeds = [BatchFeed() for _ in self.indices]
+        with ThreadPoolExecutor(max_workers=len(self.indices)) as executor:
+            futures = [
+                executor.submit(reindex, index, feed)
+                for index, feed in zip(self.indices, feeds)
+            ]
+            try:
+                self.__read_batches(qs, batch_size, feeds)
+            except Exception as e:
+                for feed in feeds:
+                    feed.fail(e)
+                raise
+            for feed in feeds:
+                feed.close()
+        return _total([future.result() for future in futures])
+
+    def __get_reindex_queryset(self):
+        """
+        Returns the instances to reindex for all the indices, or None if they
+        do not read the same ones.
+        """
+        get_querysets = {
+            getattr(type(index), "get_queryset", None) for index in self.indices
+        }
+        if len(get_querysets) > 1:
+            return None
+        if get_querysets != {None}:
+            return self.indices[0]._get_reindex_queryset()
+
+        qs = self.model.objects.all()
+        for index in self.indices:
+            qs = index._with_related(qs)
+        return qs
+
+    def __read_batches(self, qs, batch_size, feeds):
+        """Builds the records of each index from the instances read once."""
+        instances = [[] for _ in self.indices]
+        records = [[] for _ in self.indices]
+        last_pk = None
+        for instance in self.indices[0]._iter_chunked(qs, batch_size):
+            last_pk = instance.pk
+            with self.__shared.scope():
+                for position, index in enumerate(self.indices):
+                    if not index._should_index(instance):
+                        continue
+
+                    instances[position].append(instance)
+                    records[position].append(index.get_raw_record(instance))
+                    if len(records[position]) >= batch_size:
+                        self.__put(position, instances, records, feeds, last_pk)
+        for position in range(len(self.indices)):
+            if records[position]:
+                self.__put(position, instances, records, feeds, last_pk)
+
+    def __put(self, position, instances, records, feeds, last_pk):
+        """Feeds the prepared batch of an index, and empties it."""
+        batch = self.indices[position]._prepare_records(
+            instances[position], records[position]
+        )
+        feeds[position].put((batch, last_pk))
+        instances[position], records[position] = [], []
+
+
+def _total(results):
+    """Sums the counts of the indices, None if one of them failed."""
+    if any(result is None for result in results):
+        return None
+    return sum(results)
@@ -1,7 +1,33 @@
-from django.core.management.base import BaseCommand
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
 
 from algoliasearch_django import get_registered_model
 from algoliasearch_django import reindex_all
+from algoliasearch_django import reindex_since
+
+
+def parse_since(value):
+    """Parses the --since option, as a datetime, a date or a number."""
+    try:
+        since = parse_datetime(value) or parse_date(value)
+    except ValueError:
+        since = None
+    if since is None:
+        try:
+            return int(value)
+        except ValueError:
+            raise CommandError("Invalid --since value: {}".format(value))
+
+    if settings.USE_TZ and hasattr(since, "tzinfo") and timezone.is_naive(since):
+        since = timezone.make_aware(since)
+    return since
 
 
 class Command(BaseCommand):
@@ -9,7 +35,54 @@ class Command(BaseCommand):
 
     def add_arguments(self, parser):
         parser.add_argument("--batchsize", nargs="?", default=1000, type=int)
+        parser.add_argument(
+            "--batch-bytes",
+            type=int,
+            help="Maximum size in bytes of the records sent per request "
+            "(default to the BATCH_BYTES setting)",
+        )
         parser.add_argument("--model", nargs="+", type=str)
+        parser.add_argument(
+            "--workers",
+            default=1,
+            type=int,
+            help="Number of threads uploading the batches",
+        )
+        parser.add_argument(
+            "--processes",
+            default=1,
+            type=int,
+            help="Number of processes reindexing a range of primary keys each",
+        )
+        parser.add_argument(
+            "--strategy",
+            choices=["swap", "diff"],
+            default="swap",
+            help="swap rebuilds a tmp index and moves it, diff only sends the "
+            "changed records to the index and deletes its orphans",
+        )
+        parser.add_argument(
+            "--resume",
+            action="store_true",
+            help="Continue filling the tmp index of a failed reindex from its "
+            "checkpoint, instead of starting over",
+        )
+        parser.add_argument(
+            "--since",
+            help="Only send the instances modified since this date, straight "
+            "into the index (default to the watermark of the last run)",
+        )
+        parser.add_argument(
+            "--watermark-field",
+            help="Field holding the last modification of the instances "
+            "(default to the watermark_field of the index)",
+        )
+        parser.add_argument(
+            "--jobs",
+            default=1,
+            type=int,
+            help="Number of models reindexed concurrently",
+        )
 
     def handle(self, *args, **options):
         """Run the management command."""
@@ -18,11 +91,89 @@ class Command(BaseCommand):
             # py34-django18: batchsize is set to None if the user don't set
             # the value, instead of not be present in the dict
             batch_size = 1000
+        batch_bytes = options.get("batch_bytes")
+        workers = options.get("workers") or 1
+        processes = options.get("processes") or 1
+        jobs = options.get("jobs") or 1
+        since = options.get("since")
+        if isinstance(since, str):
+            since = parse_since(since)
+        watermark_field = options.get("watermark_field")
+        delta = since is not None or watermark_field is not None
+        if jobs > 1 and processes > 1:
+            # Forking from several threads is not safe
+            raise CommandError("--jobs and --processes cannot be used together")
+
+        models = [
+            model
+            for model in get_registered_model()
+            if not options.get("model", None) or model.__name__ in options["model"]
+        ]
+        lock = threading.Lock()
+
+        def reindex(model):
+            start = time.monotonic()
+            try:
+                if delta:
+                    counts = reindex_since(
+                        model,
+                        since,
+                        batch_size=batch_size,
+                        watermark_field=watermark_field,
+                        batch_bytes=batch_bytes,
+                    )
+                else:
+                    counts = reindex_all(
+                        model,
+                        batch_size=batch_size,
+                        workers=workers,
+                        processes=processes,
+                        resume=options.get("resume", False),
+                        strategy=options.get("strategy") or "swap",
+                        batch_bytes=batch_bytes,
+                    )
+                if counts is None:
+                    raise CommandError("the error was logged")
+            except Exception as e:
+                with lock:
+                    self.stderr.write("\t* {} --> FAILED: {}".format(model.__name__, e))
+                raise
+            finally:
+                if jobs > 1:
+                    # Each thread has its own database connections
+                    connections.close_all()
+
+            with lock:
+                self.stdout.write(
+                    "\t* {} --> {} ({:.1f}s)".format(
+                        model.__name__, counts, time.monotonic() - start
+                    )
+                )
+            return counts
 
         self.stdout.write("The following models were reindexed:")
-        for model in get_registered_model():
-            if options.get("model", None) and model.__name__ not in options["model"]:
-                continue
+        start = time.monotonic()
+        total = 0
+        failed = []
+        if jobs > 1:
+            with ThreadPoolExecutor(max_workers=jobs) as executor:
+                futures = {executor.submit(reindex, model): model for model in models}
+                for future in as_completed(futures):
+                    try:
+                        total += future.result()
+                    except Exception:
+                        failed.append(futures[future].__name__)
+        else:
+            for model in models:
+                try:
+                    total += reindex(model)
+                except Exception:
+                    failed.append(model.__name__)
 
-            counts = reindex_all(model, batch_size=batch_size)
-            self.stdout.write("\t* {} --> {}".format(model.__name__, counts))
+        self.stdout.write(
+            "Reindexed {} records of {} models in {:.1f}s".format(
+                total, len(models) - len(failed), time.monotonic() - start
+            )
+        )
+        if failed:
+            raise CommandError("Failed to reindex {}".format(", ".join(sorted(failed))))
@@ -0,0 +1,92 @@
+from collections import OrderedDict
+
+from algoliasearch.http.exceptions import AlgoliaException
+from django.core.management.base import BaseCommand, CommandError
+
+from algoliasearch_django import ALGOLIA_SETTINGS
+from algoliasearch_django import get_adapter
+from algoliasearch_django import get_registered_model
+from algoliasearch_django.buffer import DELETE, PARTIAL_UPDATE, SAVE, IndexingBuffer
+from algoliasearch_django.deadletters import get_sink
+from algoliasearch_django.group import iter_indices
+
+
+class Command(BaseCommand):
+    help = "Replay the writes kept by the dead-letter sink"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batchsize", nargs="?", default=1000, type=int)
+
+    def handle(self, *args, **options):
+        """Run the management command."""
+        batch_size = options.get("batchsize", None) or 1000
+
+        sink = get_sink(ALGOLIA_SETTINGS)
+        if sink is None:
+            raise CommandError("DEAD_LETTER_SINK is not set")
+
+        adapters = {}
+        for model in get_registered_model():
+            for adapter in iter_indices(get_adapter(model)):
+                adapters[adapter.index_name] = adapter
+
+        # The entries are kept until all the batches were sent or put back
+        with sink.replay() as entries:
+            counts, failed = self.replay(sink, adapters, entries, batch_size)
+
+        self.stdout.write("Replayed {} records, {} failed".format(counts, failed))
+
+    def replay(self, sink, adapters, entries, batch_size):
+        """Replays the entries, and puts back the ones which failed again."""
+        # Replay the writes in order, collapsing the ones on the same record
+        buffer = IndexingBuffer()
+        for entry in entries:
+            adapter = adapters.get(entry["index_name"])
+            if adapter is None:
+                self.stderr.write(
+                    "Kept {} records of {}: no registered model".format(
+                        len(entry["records"]), entry["index_name"]
+                    )
+                )
+                sink.add_entry(entry)
+                continue
+
+            for record in entry["records"]:
+                buffer.add(adapter, entry["action"], record)
+
+        batches = OrderedDict()
+        for adapter, action, record in buffer:
+            batches.setdefault((adapter, action), []).append(record)
+
+        counts = 0
+        failed = 0
+        for (adapter, action), records in batches.items():
+            try:
+                if action == SAVE:
+                    adapter.save_objects(
+                        records, batch_size=batch_size, raise_exceptions=True
+                    )
+                elif action == PARTIAL_UPDATE:
+                    adapter.partial_update_objects(
+                        records, batch_size=batch_size, raise_exceptions=True
+                    )
+                elif action == DELETE:
+                    adapter.delete_objects(
+                        [record["objectID"] for record in records],
+                        batch_size=batch_size,
+                        raise_exceptions=True,
+                    )
+                counts += len(records)
+            except Exception as e:
+                failed += len(records)
+                if not (
+                    isinstance(e, AlgoliaException) and adapter.keeps_dead_letter(e)
+                ):
+                    # Only the retryable errors were put back by the adapter
+                    sink.add(adapter.index_name, action, records, e)
+                self.stderr.write(
+                    "Failed to replay {} records of {}: {}".format(
+                        len(records), adapter.index_name, e
+                    )
+                )
+        return counts, failed
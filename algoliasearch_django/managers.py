@@ -0,0 +1,153 @@
+from __future__ import unicode_literals
+from contextvars import ContextVar
+
+from django.db import models
+from django.db import transaction
+
+from .buffer import DELETE
+from .group import iter_indices
+from .registration import algolia_engine
+
+# Set while a bulk operation sends its own records, so that the update() it
+# runs internally is not mirrored twice
+_mirrored = ContextVar("algolia_mirrored", default=False)
+
+
+def _chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i : i + size]
+
+
+class AlgoliaQuerySet(models.QuerySet):
+    """
+    QuerySet mirroring the bulk operations, which fire no post_save or
+    pre_delete signal, into the index of its model.
+
+    The records are sent through the Algolia engine, `batch_size` records at a
+    time, and join the current `algolia_engine.collect()` if there is one.
+
+    >>> class MyModel(models.Model):
+    >>>     objects = AlgoliaManager()
+    """
+
+    default_batch_size = 1000
+
+    def _algolia_adapter(self):
+        if not _mirrored.get() and algolia_engine.is_registered(self.model):
+            return algolia_engine.get_adapter(self.model)
+        return None
+
+    def bulk_create(self, objs, batch_size=None, *args, **kwargs):
+        objs = super(AlgoliaQuerySet, self).bulk_create(
+            objs, batch_size, *args, **kwargs
+        )
+
+        adapter = self._algolia_adapter()
+        if adapter is not None:
+            # Some backends do not return the primary keys of the new rows
+            created = [obj for obj in objs if obj.pk is not None]
+            for chunk in _chunks(created, batch_size or self.default_batch_size):
+                with algolia_engine.collect():
+                    for obj in chunk:
+                        if adapter._should_index(obj):
+                            algolia_engine.save_record(obj)
+        return objs
+
+    def bulk_update(self, objs, fields, batch_size=None):
+        objs = list(objs)
+        adapter = self._algolia_adapter()
+        token = _mirrored.set(True)
+        try:
+            rows = super(AlgoliaQuerySet, self).bulk_update(objs, fields, batch_size)
+        finally:
+            _mirrored.reset(token)
+
+        if adapter is not None:
+            # A partial update cannot add a record which became indexable
+            update_fields = None if adapter._has_should_index() else fields
+            for chunk in _chunks(objs, batch_size or self.default_batch_size):
+                with algolia_engine.collect():
+                    for obj in chunk:
+                        algolia_engine.save_record(obj, update_fields=update_fields)
+        return rows
+
+    def update(self, **kwargs):
+        adapter = self._algolia_adapter()
+        if adapter is None:
+            return super(AlgoliaQuerySet, self).update(**kwargs)
+
+        # Expressions have to be read back from the database
+        reload = adapter._has_should_index() or any(
+            hasattr(value, "resolve_expression") for value in kwargs.values()
+        )
+        update_fields = None if adapter._has_should_index() else list(kwargs)
+        rows = 0
+        # The update may change the rows matched by the QuerySet: the rows
+        # are updated by chunks of primary keys read before each update
+        with transaction.atomic(using=self.db):  # pyright: ignore[reportGeneralTypeIssues]
+            for chunk in self._algolia_pk_chunks():
+                qs = adapter.model._base_manager.using(self.db).filter(pk__in=chunk)
+                rows += qs.update(**kwargs)
+                with algolia_engine.collect():
+                    if reload:
+                        for instance in qs:
+                            algolia_engine.save_record(
+                                instance, update_fields=update_fields
+                            )
+                    else:
+                        algolia_engine.update_records(adapter.model, qs, **kwargs)
+        return rows
+
+    update.alters_data = True  # pyright: ignore[reportFunctionMemberAccess]
+
+    def delete(self):
+        adapter = self._algolia_adapter()
+        if adapter is None:
+            return super(AlgoliaQuerySet, self).delete()
+        if algolia_engine.is_auto_indexed(self.model):
+            # pre_delete sends the deletions as one batch, or defers them to
+            # the commit, or enqueues them in the outbox
+            with algolia_engine.collect():
+                return super(AlgoliaQuerySet, self).delete()
+
+        object_ids = self._algolia_object_ids(adapter)
+        deleted = super(AlgoliaQuerySet, self).delete()
+        for chunk in _chunks(object_ids, self.default_batch_size):
+            with algolia_engine.collect() as buffer:
+                _delete_records(buffer, adapter, chunk)
+        return deleted
+
+    delete.alters_data = True  # pyright: ignore[reportFunctionMemberAccess]
+    delete.queryset_only = True  # pyright: ignore[reportFunctionMemberAccess]
+
+    def _algolia_pk_chunks(self):
+        """Yields the primary keys of the matched rows, by keyset pagination."""
+        qs = self.order_by("pk").values_list("pk", flat=True)
+        chunk = list(qs[: self.default_batch_size])
+        while chunk:
+            yield chunk
+            chunk = list(qs.filter(pk__gt=chunk[-1])[: self.default_batch_size])
+
+    def _algolia_object_ids(self, adapter):
+        """Reads the objectIDs of the matched rows, without the instances if possible."""
+        concrete_fields = {
+            field.attname for field in adapter.model._meta.concrete_fields
+        }
+        if (
+            adapter.custom_objectID == "pk"
+            or adapter.custom_objectID in concrete_fields
+        ):
+            return list(self.values_list(adapter.custom_objectID, flat=True))
+        return [
+            adapter.objectID(instance)
+            for instance in self.iterator(chunk_size=self.default_batch_size)
+        ]
+
+
+def _delete_records(buffer, adapter, object_ids):
+    for index in iter_indices(adapter):
+        for object_id in object_ids:
+            buffer.add(index, DELETE, {"objectID": object_id})
+
+
+AlgoliaManager = models.Manager.from_queryset(AlgoliaQuerySet, "AlgoliaManager")
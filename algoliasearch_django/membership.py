@@ -0,0 +1,298 @@
+from __future__ import unicode_literals
+
+import hashlib
+import math
+import threading
+from typing import Any
+
+from django.core.cache import caches
+from django.utils.module_loading import import_string
+
+from .fingerprints import cache_key
+
+
+def get_store(index_name, settings):
+    """
+    Returns the membership store configured by the MEMBERSHIP_STORE setting
+    for the given index, or None if membership tracking is disabled.
+    """
+    path = settings.get("MEMBERSHIP_STORE", None)
+    if not path:
+        return None
+
+    store_cls = import_string(path)
+    return store_cls(index_name, **settings.get("MEMBERSHIP_STORE_OPTIONS", {}))
+
+
+class MembershipStore(object):
+    """
+    Tracks the objectIDs known to be in an index.
+
+    Until it is seeded with the full content of the index (by `reindex_all`
+    or `clear_objects`), a store cannot tell that an objectID is absent, and
+    `might_contain` always returns True.
+
+    A reindex seeds it by batch: `begin_seed`, then `seed_many` for each
+    batch, then `commit_seed` once the records are in the index. By default,
+    the objectIDs are kept in a list and passed to `seed`. If `shared` is
+    False, the store lives in the memory of the process, and the objectIDs
+    seeded by other processes are not seen.
+    """
+
+    shared = False
+
+    def __init__(self, index_name):
+        self.index_name = index_name
+        self._seeding: Any = None
+
+    def might_contain(self, object_id):
+        """Returns False only if the objectID is definitely not in the index."""
+        raise NotImplementedError
+
+    def add_many(self, object_ids):
+        """Records that the given objectIDs were saved to the index."""
+        raise NotImplementedError
+
+    def discard_many(self, object_ids):
+        """Records that the given objectIDs were deleted from the index."""
+        raise NotImplementedError
+
+    def seed(self, object_ids):
+        """Replaces the content of the store with the objectIDs of the index."""
+        raise NotImplementedError
+
+    def begin_seed(self):
+        """Starts seeding a new content, not used until `commit_seed`."""
+        self._seeding = []
+
+    def seed_many(self, object_ids):
+        """Adds objectIDs to the content being seeded."""
+        self._seeding.extend(object_ids)
+
+    def commit_seed(self):
+        """Replaces the content of the store with the seeded objectIDs."""
+        seeding, self._seeding = self._seeding, None
+        self.seed(seeding)
+
+    def clear(self):
+        """Forgets everything, so that any objectID might be in the index."""
+        raise NotImplementedError
+
+
+class LocMemMembershipStore(MembershipStore):
+    """
+    Keeps the exact set of objectIDs in the memory of the process.
+
+    Only use it when a single process writes to the index: a record saved by
+    another process is not seen, and would not be deleted.
+    """
+
+    def __init__(self, index_name):
+        super(LocMemMembershipStore, self).__init__(index_name)
+        self._object_ids = None
+        self._lock = threading.Lock()
+
+    def might_contain(self, object_id):
+        with self._lock:
+            return self._object_ids is None or object_id in self._object_ids
+
+    def add_many(self, object_ids):
+        with self._lock:
+            if self._object_ids is not None:
+                self._object_ids.update(object_ids)
+
+    def discard_many(self, object_ids):
+        with self._lock:
+            if self._object_ids is not None:
+                self._object_ids.difference_update(object_ids)
+
+    def seed(self, object_ids):
+        object_ids = set(object_ids)
+        with self._lock:
+            self._object_ids = object_ids
+
+    def begin_seed(self):
+        self._seeding = set()
+
+    def seed_many(self, object_ids):
+        self._seeding.update(object_ids)
+
+    def commit_seed(self):
+        seeding, self._seeding = self._seeding, None
+        with self._lock:
+            self._object_ids = seeding
+
+    def clear(self):
+        with self._lock:
+            self._object_ids = None
+
+
+class BloomMembershipStore(MembershipStore):
+    """
+    Keeps the objectIDs in a Bloom filter, in the memory of the process.
+
+    It takes about 1.2 bytes per objectID for a 1% false positive rate. A
+    false positive only costs a useless delete, but deleted objectIDs cannot
+    be removed from the filter: they stay false positives until the next
+    seed. Like `LocMemMembershipStore`, it is only safe with a single
+    writing process.
+    """
+
+    def __init__(self, index_name, capacity=1000000, error_rate=0.01):
+        super(BloomMembershipStore, self).__init__(index_name)
+        self.size = max(
+            8, int(math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        )
+        self.hash_count = max(1, int(round(self.size / capacity * math.log(2))))
+        self._bits = None
+        self._lock = threading.Lock()
+
+    def _positions(self, object_id):
+        digest = hashlib.blake2b(
+            str(object_id).encode("utf-8"), digest_size=16
+        ).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+
+    def _add(self, bits, object_ids):
+        for object_id in object_ids:
+            for position in self._positions(object_id):
+                bits[position >> 3] |= 1 << (position & 7)
+
+    def might_contain(self, object_id):
+        with self._lock:
+            bits = self._bits
+            if bits is None:
+                return True
+            return all(
+                bits[position >> 3] & (1 << (position & 7))
+                for position in self._positions(object_id)
+            )
+
+    def add_many(self, object_ids):
+        with self._lock:
+            if self._bits is not None:
+                self._add(self._bits, object_ids)
+
+    def discard_many(self, object_ids):
+        pass
+
+    def seed(self, object_ids):
+        self.begin_seed()
+        self.seed_many(object_ids)
+        self.commit_seed()
+
+    def begin_seed(self):
+        self._seeding = bytearray((self.size + 7) // 8)
+
+    def seed_many(self, object_ids):
+        self._add(self._seeding, object_ids)
+
+    def commit_seed(self):
+        seeding, self._seeding = self._seeding, None
+        with self._lock:
+            self._bits = seeding
+
+    def clear(self):
+        with self._lock:
+            self._bits = None
+
+
+class CacheMembershipStore(MembershipStore):
+    """
+    Keeps the exact set of objectIDs in a Django cache, shared by all the
+    processes.
+
+    Use a cache which does not evict keys (e.g. Redis without an eviction
+    policy): an evicted objectID would be taken as absent, and its record
+    would not be deleted.
+
+    Each seed fills a new version of the keys. The objectIDs written to a
+    version are also listed in chunks, so that the keys of the previous
+    version are deleted once the new one is committed.
+    """
+
+    shared = True
+
+    def __init__(self, index_name, cache="default", batch_size=1000):
+        super(CacheMembershipStore, self).__init__(index_name)
+        self.cache = caches[cache]
+        self.batch_size = batch_size
+        self._version_key = self._hash_key("version")
+
+    def _hash_key(self, *parts):
+        return cache_key("algolia:ids:", self.index_name, *parts)
+
+    def _keys(self, version, object_ids):
+        return [self._hash_key(version, object_id) for object_id in object_ids]
+
+    def _set_many(self, version, object_ids):
+        """Sets the keys of the objectIDs, listed in a new chunk of the version."""
+        object_ids = list(object_ids)
+        if not object_ids:
+            return
+        count_key = self._hash_key("chunks", version)
+        self.cache.add(count_key, 0, timeout=None)
+        chunk = self.cache.incr(count_key)
+        values: dict = dict.fromkeys(self._keys(version, object_ids), True)
+        values[self._hash_key("chunks", version, chunk)] = object_ids
+        self.cache.set_many(values, timeout=None)
+
+    def _purge(self, version):
+        """Deletes all the keys of a version."""
+        count_key = self._hash_key("chunks", version)
+        for chunk in range(1, self.cache.get(count_key, 0) + 1):
+            chunk_key = self._hash_key("chunks", version, chunk)
+            object_ids = self.cache.get(chunk_key, [])
+            self.cache.delete_many(self._keys(version, object_ids) + [chunk_key])
+        self.cache.delete(count_key)
+
+    def might_contain(self, object_id):
+        version = self.cache.get(self._version_key)
+        if version is None:
+            return True
+        return self.cache.get(self._hash_key(version, object_id)) is not None
+
+    def add_many(self, object_ids):
+        version = self.cache.get(self._version_key)
+        if version is not None:
+            self._set_many(version, object_ids)
+
+    def discard_many(self, object_ids):
+        version = self.cache.get(self._version_key)
+        if version is not None:
+            self.cache.delete_many(self._keys(version, object_ids))
+
+    def seed(self, object_ids):
+        self.begin_seed()
+        self.seed_many(object_ids)
+        self.commit_seed()
+
+    def begin_seed(self):
+        # Fill a new version, only used once it is complete, without the
+        # leftovers of an interrupted seed
+        self._seeding = self.cache.get(self._version_key, 0) + 1
+        self._purge(self._seeding)
+
+    def seed_many(self, object_ids):
+        batch = []
+        for object_id in object_ids:
+            batch.append(object_id)
+            if len(batch) >= self.batch_size:
+                self._set_many(self._seeding, batch)
+                batch = []
+        self._set_many(self._seeding, batch)
+
+    def commit_seed(self):
+        version, self._seeding = self._seeding, None
+        previous = self.cache.get(self._version_key)
+        self.cache.set(self._version_key, version, timeout=None)
+        if previous is not None:
+            self._purge(previous)
+
+    def clear(self):
+        version = self.cache.get(self._version_key)
+        self.cache.delete(self._version_key)
+        if version is not None:
+            self._purge(version)
@@ -0,0 +1,54 @@
+from __future__ import unicode_literals
+
+import asyncio
+
+from asgiref.sync import sync_to_async
+
+from . import algolia_engine
+
+try:
+    from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+except ImportError:  # asgiref < 3.6 (Django < 4.2)
+    iscoroutinefunction = asyncio.iscoroutinefunction
+
+    def markcoroutinefunction(func):
+        func._is_coroutine = asyncio.coroutines._is_coroutine  # pyright: ignore
+        return func
+
+
+class BatchIndexingMiddleware(object):
+    """
+    Collects the writes made through the Algolia engine while handling a
+    request, and sends them as one batch per index once the response is
+    built.
+
+    Add it to the MIDDLEWARE setting:
+
+    >>> MIDDLEWARE = [
+    >>>     "algoliasearch_django.middleware.BatchIndexingMiddleware",
+    >>>     ...
+    >>> ]
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(self.get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+
+        with algolia_engine.collect():
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        with algolia_engine.collect(send=False) as buffer:
+            try:
+                return await self.get_response(request)
+            finally:
+                await sync_to_async(algolia_engine.flush)(buffer)
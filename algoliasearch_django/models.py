@@ -1,26 +1,42 @@
 from __future__ import unicode_literals
 
+from contextlib import contextmanager
 import inspect
-from functools import partial
-from itertools import chain
+from itertools import chain, islice
 import logging
-from typing import Callable, Iterable, Optional
+import multiprocessing
+from operator import attrgetter, itemgetter
+import threading
+from typing import Any, Callable, Iterable, Iterator, Optional
 
 from algoliasearch.http.exceptions import AlgoliaException
 from algoliasearch.search.models.operation_index_params import OperationIndexParams
 from algoliasearch.search.models.operation_type import OperationType
+from algoliasearch.search.models.scope_type import ScopeType
 from algoliasearch.search.models.search_params_object import SearchParamsObject
+from django.core.exceptions import FieldDoesNotExist, ObjectDoesNotExist
+from django.db import connections
+from django.db.models import QuerySet
+from django.db.models.query import ModelIterable
 from django.db.models.query_utils import DeferredAttribute
 
+from .buffer import DELETE, PARTIAL_UPDATE, SAVE
+from .pipeline import BatchUploader, reindex_shards
 from .settings import DEBUG
+from . import batching
+from . import deadletters
+from . import diff
+from . import encoders
+from . import fingerprints
+from . import membership
+from . import retry
+from . import state
+from . import tasks
+from .tracking import ChangedFields
 
 logger = logging.getLogger(__name__)
 
 
-def _getattr(obj, name):
-    return getattr(obj, name)
-
-
 def check_and_get_attr(model, name):
     try:
         attr = getattr(model, name)
@@ -33,7 +49,84 @@ def check_and_get_attr(model, name):
 
 
 def get_model_attr(name):
-    return partial(_getattr, name=name)
+    return attrgetter(name)
+
+
+def is_related_path(name):
+    return "__" in name.strip("_") or "." in name
+
+
+class RelatedPath(object):
+    """
+    A path through related models to an attribute, e.g. "author__name" or
+    "categories.name", resolved once for a model.
+
+    Reading it returns the value of the attribute, None if a relation is
+    empty, or a flat list of values if a relation is multi-valued.
+    """
+
+    def __init__(self, model, path):
+        segments = path.replace(".", "__").split("__")
+        self.steps = []
+        self.select_related = None
+        self.prefetch_related = None
+        many = False
+
+        current = model
+        for i, segment in enumerate(segments[:-1]):
+            try:
+                field = current._meta.get_field(segment)
+            except FieldDoesNotExist:
+                field = None
+            if field is None or not field.is_relation or field.related_model is None:
+                raise AlgoliaIndexError(
+                    "{} is not a relation of {} in {}".format(segment, current, path)
+                )
+
+            many = many or field.many_to_many or field.one_to_many
+            lookup = "__".join(segments[: i + 1])
+            if many:
+                self.prefetch_related = lookup
+            else:
+                self.select_related = lookup
+            self.steps.append((segment, field.many_to_many or field.one_to_many))
+            current = field.related_model
+
+        self.attr = segments[-1]
+        if not hasattr(current, self.attr):
+            raise AlgoliaIndexError(
+                "{} is not an attribute of {} in {}".format(self.attr, current, path)
+            )
+        self.many = many
+
+        # A single-valued path to a column can be read by values_list()
+        self.column = None
+        if not many:
+            for field in current._meta.concrete_fields:
+                if self.attr in (field.name, field.attname) and not field.is_relation:
+                    self.column = "__".join(segments[:-1] + [field.attname])
+
+    def __call__(self, instance):
+        objs = [instance]
+        for segment, is_many in self.steps:
+            related = []
+            for obj in objs:
+                try:
+                    value = getattr(obj, segment)
+                except ObjectDoesNotExist:
+                    continue  # empty reverse one-to-one
+                if value is None:
+                    continue
+                if is_many:
+                    related.extend(value.all())
+                else:
+                    related.append(value)
+            objs = related
+
+        values = [getattr(obj, self.attr) for obj in objs]
+        if self.many:
+            return values
+        return values[0] if values else None
 
 
 def sanitize(hit):
@@ -76,6 +169,34 @@ class AlgoliaIndex(object):
     # - a boolean property or attribute
     should_index = None
 
+    # Use to specify the field holding the last modification of an instance,
+    # e.g. an auto_now DateTimeField, to reindex only the changed instances
+    # with reindex_since.
+    watermark_field = None
+
+    # Use to specify how far back from the stored watermark reindex_since
+    # starts, e.g. a timedelta, to catch the rows committed late with an
+    # older watermark value.
+    watermark_lag = None
+
+    # Use to specify the attribute of the records holding their content hash,
+    # compared by reindex_all(strategy="diff") to send only the changes.
+    content_hash_attribute = "_contentHash"
+
+    # Use to specify the attributes removed, in order, from the records over
+    # the RECORD_MAX_BYTES setting until they fit. See trim_record.
+    trim_attributes = ()
+
+    # Use to send only the attributes changed by a plain save() as a partial
+    # update, comparing the instance with its values when it was loaded.
+    track_changes = False
+
+    # Use to specify the model fields a callable attribute (of fields, or the
+    # geo_field, tags or should_index) depends on, e.g.
+    # {"full_name": ("first_name", "last_name")}, to update it only when they
+    # changed. Without them, it is always updated.
+    field_dependencies = {}
+
     # Name of the attribute to check on instances if should_index is not a callable
     _should_index_is_method = False
 
@@ -103,8 +224,33 @@ class AlgoliaIndex(object):
 
         self.model = model
         self.__client = client
+        self.__wait_for_tasks = settings.get("WAIT_FOR_TASKS", tasks.ALWAYS)
+        if self.__wait_for_tasks not in tasks.POLICIES:
+            raise AlgoliaIndexError(
+                "WAIT_FOR_TASKS must be one of {}, got {}".format(
+                    ", ".join(tasks.POLICIES), self.__wait_for_tasks
+                )
+            )
+        self.__fingerprints = fingerprints.get_store(self.index_name, settings)
+        self.__membership = membership.get_store(self.index_name, settings)
+        # The membership store while a reindex seeds it
+        self.__seeding = None
+        self.__retry = retry.get_policy(settings)
+        self.__dead_letters = deadletters.get_sink(settings)
+        self.__state = state.get_store(self.index_name, settings)
+        self.__encoder = encoders.get_encoder(settings)
+        self.__batcher = batching.RecordBatcher(
+            self.__encoder,
+            batch_bytes=settings.get("BATCH_BYTES"),
+            max_record_bytes=settings.get("RECORD_MAX_BYTES"),
+            trim=self.trim_record,
+        )
         self.__named_fields = {}
         self.__translate_fields = {}
+        self.__select_related = set()
+        self.__prefetch_related = set()
+        self.__batches = None
+        related_columns = {}
 
         if (
             self.settings is None
@@ -138,6 +284,15 @@ class AlgoliaIndex(object):
             self.__translate_fields[attr] = name
             if attr in all_model_fields:
                 self.__named_fields[name] = get_model_attr(attr)
+            elif is_related_path(attr) and not hasattr(model, attr):
+                related_path = RelatedPath(model, attr)
+                self.__named_fields[name] = related_path
+                if related_path.select_related:
+                    self.__select_related.add(related_path.select_related)
+                if related_path.prefetch_related:
+                    self.__prefetch_related.add(related_path.prefetch_related)
+                if related_path.column:
+                    related_columns[attr] = related_path.column
             else:
                 self.__named_fields[name] = check_and_get_attr(model, attr)
 
@@ -164,6 +319,42 @@ class AlgoliaIndex(object):
                 "{} is not a model field of {}".format(self.custom_objectID, model)
             )
 
+        # The columns of the attributes read from rows by the values path
+        concrete_attrs = dict(related_columns, pk="pk")
+        for field in model._meta.concrete_fields:
+            concrete_attrs[field.attname] = field.attname
+            if not field.is_relation:
+                concrete_attrs[field.name] = field.attname
+        # tags and geo_field are still attribute names here
+        tags = self.tags if isinstance(self.tags, str) else None
+        geo_field = self.geo_field if isinstance(self.geo_field, str) else None
+        tags_column = concrete_attrs.get(tags) if tags else None
+        geo_column = concrete_attrs.get(geo_field) if geo_field else None
+
+        # The model fields the attributes of the records depend on
+        concrete_fields = set(
+            chain.from_iterable(
+                (field.name, field.attname) for field in model._meta.concrete_fields
+            )
+        )
+        self.__dependencies = {
+            name: self.__get_dependencies(attr, concrete_fields)
+            for attr, name in self.__translate_fields.items()
+        }
+        if self.geo_field:
+            self.__dependencies["_geoloc"] = self.__get_dependencies(
+                self.geo_field, concrete_fields
+            )
+        if self.tags:
+            self.__dependencies["_tags"] = self.__get_dependencies(
+                self.tags, concrete_fields
+            )
+        self.__should_index_dependencies = (
+            self.__get_dependencies(self.should_index, concrete_fields)
+            if self.should_index
+            else frozenset()
+        )
+
         # Check tags
         if self.tags:
             if self.tags in all_model_fields:
@@ -195,6 +386,256 @@ class AlgoliaIndex(object):
                         )
                     )
 
+        self.__build_record = self.__compile_record_builder()
+        self.__check_should_index = self.__compile_should_index()
+        self.__row_plan = self.__compile_row_builder(
+            concrete_attrs, tags_column, geo_column
+        )
+
+    def __get_dependencies(self, attr, concrete_fields):
+        """
+        Returns the model fields an attribute depends on, or None if they are
+        unknown: a callable without field_dependencies.
+        """
+        if attr in self.field_dependencies:
+            return frozenset(self.field_dependencies[attr])
+        # A field, or a related path depending on its first relation
+        field = attr.split("__")[0]
+        if field in concrete_fields:
+            return frozenset([field])
+        return None
+
+    def __depends_on(self, name, update_fields):
+        dependencies = self.__dependencies.get(name)
+        if dependencies is None:
+            return isinstance(update_fields, ChangedFields)
+        return not dependencies.isdisjoint(update_fields)
+
+    def __compile_record_builder(self):
+        """
+        Returns a function building the full raw record of an instance.
+
+        The plain attributes are read by a single attrgetter, and the
+        `_geoloc` and `_tags` steps are only added when they are set.
+        """
+        objectID = self.objectID
+        attr_names = {name: attr for attr, name in self.__translate_fields.items()}
+        names = []
+        attrs = []
+        calls = []
+        for name, getter in self.__named_fields.items():
+            if isinstance(getter, attrgetter) and name in attr_names:
+                names.append(name)
+                attrs.append(attr_names[name])
+            else:
+                calls.append((name, getter))
+
+        names = tuple(names)
+        get_attrs: Callable[[object], tuple]
+        if len(attrs) > 1:
+            get_attrs = attrgetter(*attrs)
+        elif attrs:
+            get_single = attrgetter(attrs[0])
+
+            def get_single_attr(instance):
+                return (get_single(instance),)
+
+            get_attrs = get_single_attr
+        else:
+
+            def get_no_attrs(instance):
+                return ()
+
+            get_attrs = get_no_attrs
+
+        steps = []
+        if self.geo_field:
+            geo_field = self.geo_field
+            set_geoloc = self._set_geoloc
+
+            def add_geoloc(instance, record):
+                set_geoloc(record, geo_field(instance))
+
+            steps.append(add_geoloc)
+
+        if self.tags and callable(self.tags):
+            tags = self.tags
+
+            def add_tags(instance, record):
+                value = tags(instance)
+                record["_tags"] = (
+                    value if isinstance(value, list) else list(value)  # pyright: ignore
+                )
+
+            steps.append(add_tags)
+
+        def build_record(instance):
+            record = {"objectID": objectID(instance)}
+            record.update(zip(names, get_attrs(instance)))
+            for name, getter in calls:
+                record[name] = getter(instance)
+            for step in steps:
+                step(instance, record)
+            return record
+
+        return build_record
+
+    def _set_geoloc(self, record, loc):
+        """Sets the `_geoloc` of the record from the value of geo_field."""
+        if isinstance(loc, tuple):
+            record["_geoloc"] = {"lat": loc[0], "lng": loc[1]}
+        elif isinstance(loc, dict):
+            self._validate_geolocation(loc)
+            record["_geoloc"] = loc
+        elif isinstance(loc, list):
+            for geo in loc:
+                self._validate_geolocation(geo)
+            record["_geoloc"] = loc
+
+    def __compile_row_builder(self, concrete_attrs, tags_column, geo_column):
+        """
+        Returns the columns to read with values_list(), the primary key
+        first, and a function building the full raw record from a row, or
+        None if the record of an instance should not be indexed.
+
+        Returns None if a record needs an instance: a callable field, tags,
+        geo_field or should_index, or an overridden get_raw_record or
+        prepare_batch.
+        """
+        cls = type(self)
+        if cls.get_raw_record is not AlgoliaIndex.get_raw_record:
+            return None
+        if self._prepares_batch():
+            return None
+        if cls._should_index is not AlgoliaIndex._should_index:
+            return None
+        if self.tags and tags_column is None:
+            return None
+        if self.geo_field and geo_column is None:
+            return None
+
+        attr_names = {name: attr for attr, name in self.__translate_fields.items()}
+        columns = ["pk"]
+
+        def position(attr):
+            column = concrete_attrs.get(attr)
+            if column is None:
+                return None
+            if column not in columns:
+                columns.append(column)
+            return columns.index(column)
+
+        object_id = position(self.custom_objectID)
+        if object_id is None:
+            return None
+
+        should_index = None
+        if self.should_index is not None:
+            if type(self.should_index) is not DeferredAttribute:
+                return None
+            should_index = position(self.should_index.field.attname)
+
+        names = []
+        positions = []
+        for name, getter in self.__named_fields.items():
+            attr = attr_names.get(name)
+            if not isinstance(getter, (attrgetter, RelatedPath)) or attr is None:
+                return None
+            column = position(attr)
+            if column is None:
+                return None
+            names.append(name)
+            positions.append(column)
+
+        tags = position(tags_column) if tags_column else None
+        geo = position(geo_column) if geo_column else None
+
+        names = tuple(names)
+        get_values = itemgetter(*positions) if len(positions) > 1 else None
+        single = positions[0] if len(positions) == 1 else None
+        model_name = self.model.__name__
+        should_index_name = self.should_index
+        set_geoloc = self._set_geoloc
+
+        def build_row(row):
+            if should_index is not None:
+                value = row[should_index]
+                if type(value) is not bool:
+                    raise AlgoliaIndexError(
+                        "%s's should_index (%s) should be a boolean"
+                        % (model_name, should_index_name)
+                    )
+                if not value:
+                    return None
+
+            record = {"objectID": row[object_id]}
+            if get_values is not None:
+                record.update(zip(names, get_values(row)))
+            elif single is not None:
+                record[names[0]] = row[single]
+            if tags is not None:
+                value = row[tags]
+                record["_tags"] = value if isinstance(value, list) else list(value)
+            if geo is not None:
+                set_geoloc(record, row[geo])
+            return record
+
+        return tuple(columns), build_row
+
+    def __compile_should_index(self):
+        """
+        Returns a function evaluating should_index on an instance, with the
+        kind of should_index resolved once.
+        """
+        should_index = self.should_index
+        if should_index is None:
+            return None
+
+        if self._should_index_is_method:
+            try:
+                count_args = len(inspect.signature(should_index).parameters)  # pyright: ignore -- should_index_is_method
+            except AttributeError:
+                # noinspection PyDeprecation
+                count_args = len(inspect.getfullargspec(should_index).args)
+
+            if inspect.ismethod(should_index) or count_args == 1:
+                # bound method, call with instance
+                return should_index  # pyright: ignore -- should_index_is_method
+            else:
+                # unbound method, simply call without arguments
+                return lambda instance: should_index()  # pyright: ignore -- should_index_is_method
+
+        # property/attribute/Field, evaluate as bool
+        attr_type = type(should_index)
+        get_value: Callable[[object], object]
+        if attr_type is DeferredAttribute:
+            get_value = attrgetter(should_index.field.attname)
+        elif attr_type is str:
+            get_value = attrgetter(should_index)
+        elif attr_type is property:
+            get_value = should_index.__get__
+        else:
+
+            def get_invalid_value(instance):
+                raise AlgoliaIndexError(
+                    "{} should be a boolean attribute or a method that returns a boolean.".format(
+                        should_index
+                    )
+                )
+
+            get_value = get_invalid_value
+
+        def check_should_index(instance):
+            value = get_value(instance)
+            if type(value) is not bool:
+                raise AlgoliaIndexError(
+                    "%s's should_index (%s) should be a boolean"
+                    % (instance.__class__.__name__, should_index)
+                )
+            return value
+
+        return check_should_index
+
     @staticmethod
     def _validate_geolocation(geolocation):
         """
@@ -212,44 +653,98 @@ class AlgoliaIndex(object):
         Gets the raw record.
 
         If `update_fields` is set, the raw record will be build with only
-        the objectID and the given fields. Also, `_geoloc` and `_tags` will
-        not be included.
+        the objectID, the given fields and the attributes whose
+        field_dependencies include them. With the ChangedFields of a plain
+        save, the callable attributes without field_dependencies are
+        included too.
         """
+        if not update_fields and not isinstance(update_fields, ChangedFields):
+            return self.__build_record(instance)
+
         tmp = {"objectID": self.objectID(instance)}
 
-        if update_fields:
-            if isinstance(update_fields, str):
-                update_fields = (update_fields,)
+        if isinstance(update_fields, str):
+            update_fields = (update_fields,)
+        if not isinstance(update_fields, frozenset):
+            update_fields = frozenset(update_fields)
+
+        for attr, name in self.__translate_fields.items():
+            if attr in update_fields or self.__depends_on(name, update_fields):
+                tmp[name] = self.__named_fields[name](instance)
+
+        if self.geo_field and self.__depends_on("_geoloc", update_fields):
+            self._set_geoloc(tmp, self.geo_field(instance))
+        if (
+            self.tags
+            and callable(self.tags)
+            and self.__depends_on("_tags", update_fields)
+        ):
+            value = self.tags(instance)
+            tmp["_tags"] = (
+                value if isinstance(value, list) else list(value)  # pyright: ignore
+            )
 
-            for elt in update_fields:
-                key = self.__translate_fields.get(elt, None)
-                if key:
-                    tmp[key] = self.__named_fields[key](instance)
-        else:
-            for key, value in self.__named_fields.items():
-                tmp[key] = value(instance)
-
-            if self.geo_field:
-                loc = self.geo_field(instance)
-
-                if isinstance(loc, tuple):
-                    tmp["_geoloc"] = {"lat": loc[0], "lng": loc[1]}
-                elif isinstance(loc, dict):
-                    self._validate_geolocation(loc)
-                    tmp["_geoloc"] = loc
-                elif isinstance(loc, list):
-                    [self._validate_geolocation(geo) for geo in loc]
-                    tmp["_geoloc"] = loc
-
-            if self.tags:
-                if callable(self.tags):
-                    tmp["_tags"] = self.tags(instance)
-                if not isinstance(tmp["_tags"], list):
-                    tmp["_tags"] = list(tmp["_tags"])  # pyright: ignore
-
-        logger.debug("BUILD %s FROM %s", tmp["objectID"], self.model)
         return tmp
 
+    def prepare_batch(self, instances):
+        """
+        Returns the attributes added to the full records of a batch of
+        instances, as a dict of attributes by primary key, e.g. computed by a
+        single aggregate query instead of a callable field per instance.
+
+        Called once per batch by the reindexes and the buffered writes, and
+        with a single instance by save_record. By default, returns None.
+        """
+        return None
+
+    def _prepares_batch(self):
+        return type(self).prepare_batch is not AlgoliaIndex.prepare_batch
+
+    def _prepare_records(self, instances, records):
+        """Adds the attributes of prepare_batch to the records of the instances."""
+        attributes = self.prepare_batch(instances) if instances else None
+        if attributes:
+            for instance, record in zip(instances, records):
+                record.update(attributes.get(instance.pk, ()))
+        return records
+
+    def _get_raw_records(self, instances):
+        """Returns the full raw records of a batch of instances."""
+        records = [self.get_raw_record(instance) for instance in instances]
+        return self._prepare_records(instances, records)
+
+    def _get_update_fields(self, update_fields):
+        """
+        Returns the fields to send a partial record of, or None to send the
+        full record.
+
+        The ChangedFields of a plain save are only used if track_changes is
+        set, and should_index does not depend on them: the record of an
+        instance starting to be indexed must be sent in full.
+        """
+        if isinstance(update_fields, ChangedFields):
+            if not self.track_changes:
+                return None
+            dependencies = self.__should_index_dependencies
+            if dependencies is None or not dependencies.isdisjoint(update_fields):
+                return None
+            return update_fields
+        return update_fields or None
+
+    def trim_record(self, record, max_bytes):
+        """
+        Returns a version of the record, larger than the RECORD_MAX_BYTES
+        setting, small enough to be indexed, or None to skip it.
+
+        By default, removes the `trim_attributes` in order until it fits.
+        """
+        record = dict(record)
+        for attr in self.trim_attributes:
+            if record.pop(attr, None) is not None:
+                if len(self.__encoder.encode(record)) <= max_bytes:
+                    return record
+        return None
+
     def _has_should_index(self):
         """Return True if this AlgoliaIndex has a should_index method or attribute"""
         return self.should_index is not None
@@ -266,51 +761,103 @@ class AlgoliaIndex(object):
         if self.should_index is None:
             raise AlgoliaIndexError("{} should be defined.".format(self.should_index))
 
-        if self._should_index_is_method:
-            is_method = inspect.ismethod(self.should_index)
-            try:
-                count_args = len(inspect.signature(self.should_index).parameters)  # pyright: ignore -- should_index_is_method
-            except AttributeError:
-                # noinspection PyDeprecation
-                count_args = len(inspect.getfullargspec(self.should_index).args)
+        return self.__check_should_index(instance)  # pyright: ignore
 
-            if is_method or count_args == 1:
-                # bound method, call with instance
-                return self.should_index(instance)  # pyright: ignore -- should_index_is_method
-            else:
-                # unbound method, simply call without arguments
-                return self.should_index()  # pyright: ignore -- should_index_is_method
-        else:
-            # property/attribute/Field, evaluate as bool
-            attr_type = type(self.should_index)
-            if attr_type is DeferredAttribute:
-                attr_value = self.should_index.__get__(instance, None)
-            elif attr_type is str:
-                attr_value = getattr(instance, self.should_index)
-            elif attr_type is property:
-                attr_value = self.should_index.__get__(instance)
-            else:
-                raise AlgoliaIndexError(
-                    "{} should be a boolean attribute or a method that returns a boolean.".format(
-                        self.should_index
-                    )
-                )
-            if type(attr_value) is not bool:
-                raise AlgoliaIndexError(
-                    "%s's should_index (%s) should be a boolean"
-                    % (instance.__class__.__name__, self.should_index)
+    def __write(self, method, batch_bytes=None, skipped=None, **kwargs):
+        """
+        Calls a write method of the client on the index, retrying it according
+        to the RETRY_* settings, and waiting for the resulting tasks according
+        to the WAIT_FOR_TASKS setting.
+
+        The records are normalized by the RECORD_ENCODER, and split in
+        batches of at most `batch_bytes` (default to BATCH_BYTES). The
+        objectIDs of the records skipped as too large are appended to the
+        `skipped` list, if given.
+        """
+        if "objects" in kwargs:
+            responses = []
+            for batch in self.__batcher.split(
+                kwargs.pop("objects"),
+                kwargs.get("batch_size", 1000),
+                batch_bytes,
+                skipped,
+            ):
+                responses += self.__retry.call(
+                    method,
+                    index_name=self.index_name,
+                    objects=batch,
+                    wait_for_tasks=self.__wait_for_tasks == tasks.ALWAYS,
+                    **kwargs,
                 )
-            return attr_value
+        else:
+            responses = self.__retry.call(
+                method,
+                index_name=self.index_name,
+                wait_for_tasks=self.__wait_for_tasks == tasks.ALWAYS,
+                **kwargs,
+            )
+        if self.__wait_for_tasks == tasks.BACKGROUND:
+            for response in responses:
+                tasks.task_waiter.add(self.__client, self.index_name, response.task_id)
+        return responses
+
+    def keeps_dead_letter(self, error):
+        """
+        Returns True if a write which failed with the error is kept by the
+        dead-letter sink.
+        """
+        return self.__dead_letters is not None and retry.is_retryable(error)
+
+    def __dead_letter(self, action, records, error):
+        """Keeps a write which failed after all its retries."""
+        if self.__dead_letters is not None and self.keeps_dead_letter(error):
+            # Kept as they were sent, e.g. a Decimal as a float
+            records = self.__encoder.normalize(records)
+            self.__dead_letters.add(self.index_name, action, records, error)
+            logger.info(
+                "%d OBJECTS FROM %s SENT TO DEAD LETTERS", len(records), self.model
+            )
+
+    def __filter_unchanged(self, objects):
+        """
+        Returns the records whose fingerprint changed since they were last
+        sent, and their new fingerprints.
+        """
+        if self.__fingerprints is None:
+            return objects, {}
+
+        new_fingerprints = {
+            obj["objectID"]: fingerprints.fingerprint(obj) for obj in objects
+        }
+        known = self.__fingerprints.get_many(list(new_fingerprints))
+        changed = [
+            obj
+            for obj in objects
+            if known.get(obj["objectID"]) != new_fingerprints[obj["objectID"]]
+        ]
+        return changed, {
+            obj["objectID"]: new_fingerprints[obj["objectID"]] for obj in changed
+        }
+
+    def __remember_fingerprints(self, new_fingerprints):
+        if self.__fingerprints is not None and new_fingerprints:
+            self.__fingerprints.set_many(new_fingerprints)
+
+    def __forget_fingerprints(self, object_ids):
+        if self.__fingerprints is not None and object_ids:
+            self.__fingerprints.delete_many(object_ids)
 
     def save_record(self, instance, update_fields=None, **kwargs):
         """Saves the record.
 
         If `update_fields` is set, this method will use partial_update_object()
-        and will update only the given fields (never `_geoloc` and `_tags`).
+        and will update only the given fields and the attributes depending on
+        them (see get_raw_record).
 
         For more information about partial_update_object:
         https://github.com/algolia/algoliasearch-client-python#update-an-existing-object-in-the-index
         """
+        update_fields = self._get_update_fields(update_fields)
         if not self._should_index(instance):
             # Should not index, but since we don't now the state of the
             # instance, we need to send a DELETE request to ensure that if
@@ -320,18 +867,44 @@ class AlgoliaIndex(object):
 
         obj = {}
         try:
-            if update_fields:
+            if update_fields is not None:
                 obj = self.get_raw_record(instance, update_fields=update_fields)
-                self.__client.partial_update_objects(
-                    index_name=self.index_name, objects=[obj], wait_for_tasks=True
+                if len(obj) == 1:
+                    # None of the updated fields is indexed
+                    logger.debug(
+                        "SKIP %s FROM %s: NOTHING TO UPDATE",
+                        obj["objectID"],
+                        self.model,
+                    )
+                    return
+                skipped = []
+                self.__write(
+                    self.__client.partial_update_objects, objects=[obj], skipped=skipped
                 )
+                if skipped:
+                    return
+                self.__forget_fingerprints([obj["objectID"]])
             else:
-                obj = self.get_raw_record(instance)
-                self.__client.save_objects(
-                    index_name=self.index_name, objects=[obj], wait_for_tasks=True
-                )
+                obj = self._get_raw_records([instance])[0]
+                changed, new_fingerprints = self.__filter_unchanged([obj])
+                if not changed:
+                    logger.debug(
+                        "SKIP %s FROM %s: UNCHANGED", obj["objectID"], self.model
+                    )
+                    return
+                skipped = []
+                self.__write(self.__client.save_objects, objects=[obj], skipped=skipped)
+                if skipped:
+                    # Too large, the batcher logged it
+                    return
+                self.__remember_fingerprints(new_fingerprints)
+                if self.__membership is not None:
+                    self.__membership.add_many([obj["objectID"]])
             logger.info("SAVE %s FROM %s", obj["objectID"], self.model)
         except AlgoliaException as e:
+            self.__dead_letter(
+                PARTIAL_UPDATE if update_fields is not None else SAVE, [obj], e
+            )
             if DEBUG:
                 raise e
             else:
@@ -342,17 +915,144 @@ class AlgoliaIndex(object):
     def delete_record(self, instance):
         """Deletes the record."""
         objectID = self.objectID(instance)
+        if self.__membership is not None and not self.__membership.might_contain(
+            objectID
+        ):
+            logger.debug("SKIP DELETE %s FROM %s: NOT INDEXED", objectID, self.model)
+            return
+
         try:
-            self.__client.delete_objects(
-                index_name=self.index_name, object_ids=[objectID], wait_for_tasks=True
-            )
+            self.__write(self.__client.delete_objects, object_ids=[objectID])
+            self.__forget_fingerprints([objectID])
+            if self.__membership is not None:
+                self.__membership.discard_many([objectID])
             logger.info("DELETE %s FROM %s", objectID, self.model)
         except AlgoliaException as e:
+            self.__dead_letter(DELETE, [{"objectID": objectID}], e)
             if DEBUG:
                 raise e
             else:
                 logger.warning("%s FROM %s NOT DELETED: %s", objectID, self.model, e)
 
+    def save_objects(
+        self, objects, batch_size=1000, raise_exceptions=False, batch_bytes=None
+    ):
+        """
+        Saves the given raw records, batch_size records per request, and at
+        most batch_bytes per request (default to BATCH_BYTES).
+
+        Records whose fingerprint did not change since they were last sent
+        are skipped. Errors are only logged, unless `raise_exceptions` is set
+        (or RAISE_EXCEPTIONS).
+        """
+        objects, new_fingerprints = self.__filter_unchanged(objects)
+        if not objects:
+            return
+
+        try:
+            skipped = []
+            self.__write(
+                self.__client.save_objects,
+                objects=objects,
+                batch_size=batch_size,
+                batch_bytes=batch_bytes,
+                skipped=skipped,
+            )
+            # The records skipped as too large are not in the index
+            skipped = set(skipped)
+            object_ids = [
+                obj["objectID"] for obj in objects if obj["objectID"] not in skipped
+            ]
+            self.__remember_fingerprints(
+                {
+                    object_id: value
+                    for object_id, value in new_fingerprints.items()
+                    if object_id not in skipped
+                }
+            )
+            if self.__membership is not None:
+                self.__membership.add_many(object_ids)
+            logger.info("SAVE %d OBJECTS TO %s", len(object_ids), self.index_name)
+        except AlgoliaException as e:
+            self.__dead_letter(SAVE, objects, e)
+            if DEBUG or raise_exceptions:
+                raise e
+            else:
+                logger.warning(
+                    "%d OBJECTS FROM %s NOT SAVED: %s", len(objects), self.model, e
+                )
+
+    def partial_update_objects(
+        self, objects, batch_size=1000, raise_exceptions=False, batch_bytes=None
+    ):
+        """
+        Partially updates the given raw records, batch_size records per request,
+        and at most batch_bytes per request (default to BATCH_BYTES).
+
+        Records holding only an objectID are skipped.
+        """
+        objects = [obj for obj in objects if len(obj) > 1]
+        if not objects:
+            return
+
+        try:
+            skipped = []
+            self.__write(
+                self.__client.partial_update_objects,
+                objects=objects,
+                batch_size=batch_size,
+                batch_bytes=batch_bytes,
+                skipped=skipped,
+            )
+            self.__forget_fingerprints([obj["objectID"] for obj in objects])
+            logger.info(
+                "UPDATE %d OBJECTS TO %s", len(objects) - len(skipped), self.index_name
+            )
+        except AlgoliaException as e:
+            self.__dead_letter(PARTIAL_UPDATE, objects, e)
+            if DEBUG or raise_exceptions:
+                raise e
+            else:
+                logger.warning(
+                    "%d OBJECTS FROM %s NOT UPDATED: %s", len(objects), self.model, e
+                )
+
+    def delete_objects(self, object_ids, batch_size=1000, raise_exceptions=False):
+        """
+        Deletes the records with the given objectIDs, batch_size per request.
+
+        ObjectIDs known not to be in the index are skipped.
+        """
+        if self.__membership is not None:
+            object_ids = [
+                object_id
+                for object_id in object_ids
+                if self.__membership.might_contain(object_id)
+            ]
+        if not object_ids:
+            return
+
+        try:
+            self.__write(
+                self.__client.delete_objects,
+                object_ids=object_ids,
+                batch_size=batch_size,
+            )
+            self.__forget_fingerprints(object_ids)
+            if self.__membership is not None:
+                self.__membership.discard_many(object_ids)
+            logger.info("DELETE %d OBJECTS FROM %s", len(object_ids), self.index_name)
+        except AlgoliaException as e:
+            self.__dead_letter(
+                DELETE, [{"objectID": object_id} for object_id in object_ids], e
+            )
+            if DEBUG or raise_exceptions:
+                raise e
+            else:
+                logger.warning(
+                    "%d OBJECTS FROM %s NOT DELETED: %s", len(object_ids), self.model, e
+                )
+
     def update_records(self, qs, batch_size=1000, **kwargs):
         """
         Updates multiple records.
@@ -366,6 +1066,25 @@ class AlgoliaIndex(object):
         >>> update_records(MyModel, qs, myField=True)
         >>> qs.update(myField=True)
         """
+        batch = self.get_update_records(qs, **kwargs)
+
+        if len(batch) > 0 and len(batch[0]) > 1:
+            try:
+                self.__write(
+                    self.__client.partial_update_objects,
+                    objects=batch,
+                    batch_size=batch_size,
+                )
+            except AlgoliaException as e:
+                self.__dead_letter(PARTIAL_UPDATE, batch, e)
+                raise e
+            self.__forget_fingerprints([obj["objectID"] for obj in batch])
+
+    def get_update_records(self, qs, **kwargs):
+        """
+        Gets the raw partial records setting the given values on all the
+        records of the QuerySet.
+        """
         tmp = {}
         for key, value in kwargs.items():
             name = self.__translate_fields.get(key, None)
@@ -379,11 +1098,7 @@ class AlgoliaIndex(object):
         for elt in objectsIDs:
             tmp["objectID"] = elt
             batch.append(dict(tmp))
-
-        if len(batch) > 0:
-            self.__client.partial_update_objects(
-                index_name=self.index_name, objects=batch, wait_for_tasks=True, batch_size=batch_size,
-            )
+        return batch
 
     def raw_search(self, query="", params=None):
         """Performs a search query and returns the parsed JSON."""
@@ -431,6 +1146,10 @@ class AlgoliaIndex(object):
         try:
             _resp = self.__client.clear_objects(self.index_name)
             self.__client.wait_for_task(self.index_name, _resp.task_id)
+            if self.__fingerprints is not None:
+                self.__fingerprints.clear()
+            if self.__membership is not None:
+                self.__membership.seed([])
             logger.info("CLEAR INDEX %s", self.index_name)
         except AlgoliaException as e:
             if DEBUG:
@@ -454,17 +1173,528 @@ class AlgoliaIndex(object):
         if self.tmp_index_name:
             _resp = self.__client.delete_index(self.tmp_index_name)
             self.__client.wait_for_task(self.tmp_index_name, _resp.task_id)
+        # The records are gone, none can be skipped as unchanged
+        if self.__fingerprints is not None:
+            self.__fingerprints.clear()
+        if self.__membership is not None:
+            self.__membership.clear()
+
+    @staticmethod
+    def _iter_chunked(
+        qs, chunk_size, get_pk: Callable[[Any], Any] = attrgetter("pk")
+    ) -> Iterator[Any]:
+        """
+        Yields the instances of the QuerySet, reading chunk_size rows at a
+        time, so that memory does not grow with the size of the table.
+        `get_pk` returns the primary key of an item of the QuerySet.
+
+        The rows are read by keyset pagination on the primary key, which
+        keeps prefetch_related working. QuerySets which cannot be filtered or
+        reordered are read with iterator().
+        """
+        if not isinstance(qs, QuerySet):
+            yield from qs
+            return
+
+        if not qs.query.can_filter() or qs.query.combinator or qs.query.distinct_fields:
+            yield from qs.iterator(chunk_size=chunk_size)
+            return
+
+        qs = qs.order_by("pk")
+        chunk = list(qs[:chunk_size])
+        while chunk:
+            yield from chunk
+            if len(chunk) < chunk_size:
+                return
+            last_pk = get_pk(chunk[-1])
+            chunk = None  # Release the previous chunk before reading the next one
+            chunk = list(qs.filter(pk__gt=last_pk)[:chunk_size])
+
+    def _get_reindex_queryset(self):
+        """Returns the instances to reindex."""
+        if hasattr(self, "get_queryset") and callable(self.get_queryset):
+            return self.get_queryset()
+        return self._with_related(self.model.objects.all())
+
+    def _with_related(self, qs):
+        """Follows the relations of the related paths of the fields in the QuerySet."""
+        if self.__select_related:
+            qs = qs.select_related(*sorted(self.__select_related))
+        if self.__prefetch_related:
+            qs = qs.prefetch_related(*sorted(self.__prefetch_related))
+        return qs
+
+    @contextmanager
+    def _reading_from(self, batches):
+        """
+        Makes the reindex read the given (records, last_pk) batches instead
+        of the database, e.g. those built by an AlgoliaIndexGroup.
+        """
+        self.__batches = batches
+        try:
+            yield
+        finally:
+            self.__batches = None
+
+    def _share_fields(self, shared):
+        """
+        Reads the fields, tags and geo_field computed by a callable through
+        `shared`, the SharedFields of the group of the index.
+        """
+        attrs = {name: attr for attr, name in self.__translate_fields.items()}
+        for name, getter in self.__named_fields.items():
+            if not isinstance(getter, attrgetter):
+                self.__named_fields[name] = shared.wrap(attrs.get(name, name), getter)
+        if self.geo_field and not isinstance(self.geo_field, attrgetter):
+            self.geo_field = shared.wrap(self.geo_field, self.geo_field)
+        if callable(self.tags) and not isinstance(self.tags, attrgetter):
+            self.tags = shared.wrap(self.tags, self.tags)
+        self.__build_record = self.__compile_record_builder()
+
+    @staticmethod
+    def __can_split(qs):
+        """Returns True if the queryset is read in primary key order."""
+        if not qs.query.can_filter():
+            return False
+        return not (qs.query.combinator or qs.query.distinct_fields)
+
+    def __get_shards(self, processes):
+        """
+        Splits the primary keys to reindex in `processes` ranges of about the
+        same number of rows, as (lower, upper) bounds where None is open.
+
+        Returns None if the queryset cannot be split, nor resumed.
+        """
+        qs = self._get_reindex_queryset()
+        if not isinstance(qs, QuerySet) or not self.__can_split(qs):
+            if processes > 1:
+                logger.warning(
+                    "CANNOT SHARD THE REINDEX OF %s, USE ONE PROCESS", self.model
+                )
+            return None
+        if processes <= 1:
+            return [(None, None)]
+        if "fork" not in multiprocessing.get_all_start_methods():
+            logger.warning("CANNOT FORK TO REINDEX %s, USE ONE PROCESS", self.model)
+            return [(None, None)]
+
+        pks = qs.order_by("pk").values_list("pk", flat=True)
+        count = pks.count()
+        processes = min(processes, count)
+        bounds = []
+        for i in range(1, processes):
+            bound = pks[count * i // processes]
+            if bound not in bounds:
+                bounds.append(bound)
+        return list(zip([None] + bounds, bounds + [None]))
+
+    def __clear_checkpoint(self):
+        checkpoint = self.__state.get("checkpoint")
+        if checkpoint is None:
+            return
+        for position in range(len(checkpoint["shards"])):
+            self.__state.delete("checkpoint:{}".format(position))
+        self.__state.delete("checkpoint")
+
+    def __iter_batches(self, batch_size, shard=None, after=None):
+        """
+        Yields the raw records of the instances to index, by batch, only
+        those whose primary key is in the shard and after the given one if
+        any, along with the primary key of the last instance read.
+        """
+        if self.__batches is not None:
+            yield from self.__batches
+            return
+
+        qs = self._get_reindex_queryset()
+        # Only QuerySets are split in shards and resumed after a checkpoint
+        if isinstance(qs, QuerySet):
+            if shard is not None:
+                lower, upper = shard
+                if lower is not None:
+                    qs = qs.filter(pk__gte=lower)
+                if upper is not None:
+                    qs = qs.filter(pk__lt=upper)
+            if after is not None:
+                qs = qs.filter(pk__gt=after)
+
+        row_plan = self.__row_plan
+        if row_plan is not None and self.__can_read_rows(qs):
+            yield from self.__iter_row_batches(qs, batch_size, row_plan)
+            return
+
+        batch = []
+        should_index = self._should_index
+        last_pk = None
+        for instance in self._iter_chunked(qs, batch_size):
+            last_pk = instance.pk
+            if not should_index(instance):
+                continue  # should not index
+
+            batch.append(instance)
+            if len(batch) >= batch_size:
+                yield self._get_raw_records(batch), last_pk
+                batch = []
+        if len(batch) > 0:
+            yield self._get_raw_records(batch), last_pk
+
+    @staticmethod
+    def __can_read_rows(qs):
+        """Returns True if the instances of qs can be read as values_list() rows."""
+        return (
+            isinstance(qs, QuerySet)
+            and qs._iterable_class is ModelIterable
+            and not qs.query.combinator
+        )
+
+    def __iter_row_batches(self, qs, batch_size, row_plan):
+        """
+        Yields the raw records built from values_list() rows, by batch, along
+        with the primary key of the last row read, without instantiating the
+        models.
+        """
+        columns, build_row = row_plan
+        rows = qs.select_related(None).prefetch_related(None).values_list(*columns)
+
+        batch = []
+        last_pk = None
+        for row in self._iter_chunked(rows, batch_size, get_pk=itemgetter(0)):
+            last_pk = row[0]
+            record = build_row(row)
+            if record is None:
+                continue  # should not index
+
+            batch.append(record)
+            if len(batch) >= batch_size:
+                yield batch, last_pk
+                batch = []
+        if len(batch) > 0:
+            yield batch, last_pk
+
+    def _reindex_shard(
+        self, shard, batch_size, workers, position=None, batch_bytes=None
+    ):
+        """
+        Uploads the records of a shard (all of them if None) to the tmp index
+        and waits for their tasks.
+
+        With a position, the primary key of the last uploaded batch is
+        checkpointed in the state store, and the upload starts after the
+        checkpoint if any.
 
-    def reindex_all(self, batch_size=1000):
+        Returns the number of records. Their objectIDs are seeded into the
+        membership store while a reindex seeds it.
+        """
+        key = None if position is None else "checkpoint:{}".format(position)
+        progress = (self.__state.get(key) if key else None) or {}
+        counts = progress.get("counts", 0)
+
+        lock = threading.Lock()
+        uploaded = {}
+        committed = {"seq": 0, "counts": counts}
+        sent = {"counts": counts}
+
+        def upload(item):
+            seq, batch, last_pk = item
+            responses = []
+            skipped = []
+            for objects in self.__batcher.split(
+                batch, batch_size, batch_bytes, skipped
+            ):
+                responses += self.__retry.call(
+                    self.__client.save_objects,
+                    index_name=self.tmp_index_name,
+                    objects=objects,
+                    wait_for_tasks=False,
+                )
+            size = len(batch) - len(skipped)
+            logger.info("SAVE %d OBJECTS TO %s", size, self.tmp_index_name)
+
+            # The records skipped as too large are not counted nor seeded
+            with lock:
+                sent["counts"] += size
+                if self.__seeding is not None:
+                    skipped = set(skipped)
+                    self.__seeding.seed_many(
+                        obj["objectID"]
+                        for obj in batch
+                        if obj["objectID"] not in skipped
+                    )
+            if key is None:
+                return responses
+
+            # The batches may be uploaded out of order, the checkpoint only
+            # moves past the ones whose predecessors are all uploaded
+            with lock:
+                uploaded[seq] = (last_pk, size)
+                if committed["seq"] in uploaded:
+                    while committed["seq"] in uploaded:
+                        last_pk, size = uploaded.pop(committed["seq"])
+                        committed["seq"] += 1
+                        committed["counts"] += size
+                    self.__state.set(
+                        key, {"last_pk": last_pk, "counts": committed["counts"]}
+                    )
+            return responses
+
+        # Batches are built while the previous ones are uploaded, and
+        # their tasks are only waited for at the end
+        uploader = BatchUploader(upload, workers=workers)
+        try:
+            batches = self.__iter_batches(batch_size, shard, progress.get("last_pk"))
+            for seq, (batch, last_pk) in enumerate(batches):
+                uploader.put((seq, batch, last_pk))
+        except Exception:
+            uploader.abort()
+            raise
+
+        for responses in uploader.close():
+            for response in responses:
+                self.__client.wait_for_task(self.tmp_index_name, response.task_id)
+        return sent["counts"]
+
+    def reindex_since(
+        self, since=None, batch_size=1000, watermark_field=None, batch_bytes=None
+    ):
+        """
+        Saves the records of the instances modified since the given value of
+        the watermark field, directly into the index, and deletes those which
+        should not be indexed anymore.
+
+        Without `since`, the watermark of the last successful run is used,
+        minus the `watermark_lag`. The latest value read is stored as the new
+        watermark once all the records have been sent. Deleted rows are not
+        detected: they are only removed by the signals or by reindex_all.
+        """
+        watermark_field = watermark_field or self.watermark_field
+        if not watermark_field:
+            raise AlgoliaIndexError(
+                "{} has no watermark_field to reindex since".format(self.model)
+            )
+        qs = self._get_reindex_queryset()
+        if not isinstance(qs, QuerySet):
+            raise AlgoliaIndexError(
+                "The get_queryset of {} should return a QuerySet to reindex "
+                "since a watermark".format(self.index_name)
+            )
+
+        key = "watermark:{}".format(watermark_field)
+        if since is None:
+            if not self.__state.persistent:
+                raise AlgoliaIndexError(
+                    "The STATE_STORE does not persist the watermark of {}, "
+                    "reindex since a given value".format(self.index_name)
+                )
+            since = self.__state.get(key)
+            if since is None:
+                raise AlgoliaIndexError(
+                    "No watermark stored for {}, reindex since a given value".format(
+                        self.index_name
+                    )
+                )
+            if self.watermark_lag:
+                # e.g. an ISO 8601 string kept by the FileStateStore
+                field = self.model._meta.get_field(watermark_field)
+                since = field.to_python(since) - self.watermark_lag
+
+        qs = qs.filter(**{"{}__gte".format(watermark_field): since})
+        get_watermark = get_model_attr(watermark_field)
+        latest = None
+        counts = 0
+        instances = self._iter_chunked(qs, batch_size)
+        while True:
+            chunk = list(islice(instances, batch_size))
+            if not chunk:
+                break
+
+            indexed = []
+            object_ids = []
+            for instance in chunk:
+                value = get_watermark(instance)
+                if value is not None and (latest is None or value > latest):
+                    latest = value
+
+                if self._should_index(instance):
+                    indexed.append(instance)
+                else:
+                    object_ids.append(self.objectID(instance))
+
+            records = self._get_raw_records(indexed)
+
+            if records:
+                self.save_objects(
+                    records, batch_size, raise_exceptions=True, batch_bytes=batch_bytes
+                )
+            if object_ids:
+                self.delete_objects(object_ids, batch_size, raise_exceptions=True)
+            counts += len(records)
+
+        if latest is not None:
+            self.__state.set(key, latest)
+            logger.info("WATERMARK OF %s SET TO %s", self.index_name, latest)
+        return counts
+
+    def __reindex_diff(self, batch_size, batch_bytes=None):
+        """
+        Saves the records whose content hash differs from the one stored in
+        the index, directly into it, and deletes its orphans.
+        """
+        attribute = self.content_hash_attribute
+        snapshot = diff.snapshot_index(self.__client, self.index_name, attribute)
+        counts = 0
+        sent = 0
+        if self.__membership is not None:
+            self.__membership.begin_seed()
+
+        def save(batch):
+            skipped = []
+            self.__write(
+                self.__client.save_objects,
+                objects=batch,
+                batch_size=batch_size,
+                batch_bytes=batch_bytes,
+                skipped=skipped,
+            )
+            self.__forget_fingerprints([obj["objectID"] for obj in batch])
+            logger.info(
+                "SAVE %d OBJECTS TO %s", len(batch) - len(skipped), self.index_name
+            )
+            return len(batch) - len(skipped)
+
+        batch = []
+        for records, _ in self.__iter_batches(batch_size):
+            counts += len(records)
+            if self.__membership is not None:
+                self.__membership.seed_many(record["objectID"] for record in records)
+            for record in records:
+                value = diff.content_hash(record)
+                if snapshot.match(record["objectID"], value):
+                    continue  # unchanged
+
+                record[attribute] = diff.format_hash(value)
+                batch.append(record)
+                if len(batch) >= batch_size:
+                    sent += save(batch)
+                    batch = []
+        if batch:
+            sent += save(batch)
+
+        orphans = list(snapshot.orphans())
+        if orphans:
+            self.__write(
+                self.__client.delete_objects, object_ids=orphans, batch_size=batch_size
+            )
+            self.__forget_fingerprints(orphans)
+            logger.info("DELETE %d OBJECTS FROM %s", len(orphans), self.index_name)
+        if self.__membership is not None:
+            self.__membership.commit_seed()
+
+        logger.info(
+            "DIFF %s: %d RECORDS, %d SENT, %d DELETED",
+            self.index_name,
+            counts,
+            sent,
+            len(orphans),
+        )
+        return counts
+
+    def __copy_configuration(self, copy_settings=True):
+        """
+        Copies the rules and synonyms of the index to the tmp index, server
+        side, and its settings with `copy_settings`. Returns False if the copy
+        failed.
+        """
+        scope = [ScopeType.RULES, ScopeType.SYNONYMS]
+        if copy_settings:
+            scope.insert(0, ScopeType.SETTINGS)
+        try:
+            _resp = self.__client.operation_index(
+                self.index_name,
+                OperationIndexParams(
+                    operation=OperationType.COPY,
+                    destination=self.tmp_index_name,  # pyright: ignore
+                    scope=scope,
+                ),
+            )
+            self.__client.wait_for_task(self.index_name, _resp.task_id)
+        except AlgoliaException as e:
+            logger.warning(
+                "CANNOT COPY THE CONFIGURATION OF %s, BROWSE IT: %s", self.index_name, e
+            )
+            return False
+
+        logger.debug(
+            "COPY %s OF %s TO %s",
+            ", ".join(scope).upper(),
+            self.index_name,
+            self.tmp_index_name,
+        )
+        return True
+
+    def reindex_all(
+        self,
+        batch_size=1000,
+        workers=1,
+        processes=1,
+        resume=False,
+        strategy="swap",
+        batch_bytes=None,
+    ):
         """
         Reindex all the records.
 
         By default, this method use Model.objects.all() but you can implement
         a method `get_queryset` in your subclass. This can be used to optimize
         the performance (for example with select_related or prefetch_related).
+
+        The rows are read batch_size at a time, so that memory does not grow
+        with the size of the table, and the batches are uploaded by `workers`
+        threads while the next ones are built. With `batch_bytes` (default to
+        the BATCH_BYTES setting), a batch is also split in requests of at most
+        this encoded size.
+
+        The settings, rules and synonyms of the index are copied server side
+        to the tmp index, or browsed and saved again after the move if the
+        copy fails.
+
+        With `processes` > 1, the primary keys are split in as many ranges,
+        each one reindexed by a forked process, and the index is only moved
+        once all of them succeeded.
+
+        The progress is checkpointed in the state store after each uploaded
+        batch. With `resume`, the tmp index left by a failed run is not
+        cleared, and filled from the checkpoint.
+
+        With the "diff" `strategy`, the records are compared to the content
+        hashes stored in the index, and only the changed ones are sent to it,
+        along with the deletion of its orphans, without a tmp index.
         """
+        if strategy not in ("swap", "diff"):
+            raise AlgoliaIndexError(
+                "strategy must be one of swap, diff, got {}".format(strategy)
+            )
+        if resume and not self.__state.persistent:
+            raise AlgoliaIndexError(
+                "The STATE_STORE does not persist the checkpoints of {}, "
+                "it can't be resumed".format(self.index_name)
+            )
+        if strategy == "diff":
+            try:
+                return self.__reindex_diff(batch_size, batch_bytes)
+            except AlgoliaException as e:
+                if any("Index does not exist" in arg for arg in e.args):
+                    logger.info("NO INDEX %s TO DIFF, REBUILD IT", self.index_name)
+                elif DEBUG:
+                    raise e
+                else:
+                    logger.warning("ERROR DURING REINDEXING %s: %s", self.model, e)
+                    return
+
         should_keep_synonyms = False
         should_keep_rules = False
+        index_exists = True
+        # The settings defined by the class replace those of the index
+        has_settings = bool(self.settings)
         try:
             if not self.settings:
                 self.settings = self.get_settings()
@@ -477,13 +1707,19 @@ class AlgoliaIndex(object):
                 )
         except AlgoliaException as e:
             if any("Index does not exist" in arg for arg in e.args):
-                pass  # Expected, let's clear and recreate from scratch
+                index_exists = False  # Expected, let's clear and recreate from scratch
             else:
                 raise e  # Unexpected error while getting settings
         try:
             should_keep_replicas = False
             replicas = None
 
+            # The rules and synonyms are only browsed if they cannot be
+            # copied server side
+            copied = index_exists and self.__copy_configuration(
+                copy_settings=not has_settings
+            )
+
             if self.settings:
                 replicas = self.settings.get("replicas", None)
 
@@ -498,57 +1734,84 @@ class AlgoliaIndex(object):
                 logger.debug("APPLY SETTINGS ON %s_tmp", self.index_name)
 
             rules = []
-            self.__client.browse_rules(
-                self.index_name,
-                lambda _resp: rules.extend([sanitize(_hit.to_dict()) for _hit in _resp.hits]),
-            )
-            if len(rules):
-                logger.debug("Got rules for index %s: %s", self.index_name, rules)
-                should_keep_rules = True
-
             synonyms = []
-            self.__client.browse_synonyms(
-                self.index_name,
-                lambda _resp: synonyms.extend([sanitize(_hit.to_dict()) for _hit in _resp.hits]),
-            )
-            if len(synonyms):
-                logger.debug("Got synonyms for index %s: %s", self.index_name, rules)
-                should_keep_synonyms = True
-
-            _resp = self.__client.clear_objects(self.tmp_index_name)
-            self.__client.wait_for_task(self.tmp_index_name, _resp.task_id)
-            logger.debug("CLEAR INDEX %s", self.tmp_index_name)
+            if not copied:
+                self.__client.browse_rules(
+                    self.index_name,
+                    lambda _resp: rules.extend([sanitize(_hit.to_dict()) for _hit in _resp.hits]),
+                )
+                if len(rules):
+                    logger.debug("Got rules for index %s: %s", self.index_name, rules)
+                    should_keep_rules = True
 
-            counts = 0
-            batch = []
-            qs = []
+                self.__client.browse_synonyms(
+                    self.index_name,
+                    lambda _resp: synonyms.extend([sanitize(_hit.to_dict()) for _hit in _resp.hits]),
+                )
+                if len(synonyms):
+                    logger.debug("Got synonyms for index %s: %s", self.index_name, rules)
+                    should_keep_synonyms = True
+
+            checkpoint = self.__state.get("checkpoint") if resume else None
+            if checkpoint and checkpoint["tmp_index_name"] != self.tmp_index_name:
+                checkpoint = None
+
+            if checkpoint is None:
+                if resume:
+                    logger.warning(
+                        "NO CHECKPOINT TO RESUME %s, REINDEX FROM SCRATCH",
+                        self.index_name,
+                    )
+                self.__clear_checkpoint()
+                _resp = self.__client.clear_objects(self.tmp_index_name)
+                self.__client.wait_for_task(self.tmp_index_name, _resp.task_id)
+                logger.debug("CLEAR INDEX %s", self.tmp_index_name)
 
-            if hasattr(self, "get_queryset") and callable(self.get_queryset):
-                qs = self.get_queryset()
+                shards = self.__get_shards(processes)
+                if shards is not None:
+                    self.__state.set(
+                        "checkpoint",
+                        {"tmp_index_name": self.tmp_index_name, "shards": shards},
+                    )
             else:
-                qs = self.model.objects.all()
-
-            for instance in qs:
-                if not self._should_index(instance):
-                    continue  # should not index
+                shards = [tuple(shard) for shard in checkpoint["shards"]]
+                logger.info("RESUME REINDEX OF %s", self.tmp_index_name)
 
-                batch.append(self.get_raw_record(instance))
-                if len(batch) >= batch_size:
-                    self.__client.save_objects(
-                        index_name=self.tmp_index_name,
-                        objects=batch,
-                        wait_for_tasks=True,
-                    )
-                    logger.info(
-                        "SAVE %d OBJECTS TO %s", len(batch), self.tmp_index_name
+            forked = (
+                shards is not None
+                and len(shards) > 1
+                and "fork" in multiprocessing.get_all_start_methods()
+            )
+            # The objectIDs sent before resuming are unknown, and those sent
+            # by forked processes only reach a shared membership store
+            self.__seeding = None
+            if (
+                self.__membership is not None
+                and checkpoint is None
+                and (self.__membership.shared or not forked)
+            ):
+                self.__seeding = self.__membership
+                self.__seeding.begin_seed()
+
+            if shards is None:
+                results = [
+                    self._reindex_shard(None, batch_size, workers, None, batch_bytes)
+                ]
+            elif forked:
+                # Every process builds and uploads its shard into the tmp
+                # index, with its own database connection and HTTP session
+                connections.close_all()
+                self.__client.close()
+                results = reindex_shards(self, shards, batch_size, workers, batch_bytes)
+            else:
+                results = [
+                    self._reindex_shard(
+                        shard, batch_size, workers, position, batch_bytes
                     )
-                    batch = []
-                counts += 1
-            if len(batch) > 0:
-                self.__client.save_objects(
-                    index_name=self.tmp_index_name, objects=batch, wait_for_tasks=True
-                )
-                logger.info("SAVE %d OBJECTS TO %s", len(batch), self.tmp_index_name)
+                    for position, shard in enumerate(shards)
+                ]
+
+            counts = sum(results)
 
             _resp = self.__client.operation_index(
                 self.tmp_index_name,
@@ -559,6 +1822,14 @@ class AlgoliaIndex(object):
             )
             self.__client.wait_for_task(self.tmp_index_name, _resp.task_id)
             logger.info("MOVE INDEX %s TO %s", self.tmp_index_name, self.index_name)
+            self.__clear_checkpoint()
+            if self.__fingerprints is not None:
+                self.__fingerprints.clear()
+            if self.__seeding is not None:
+                self.__seeding, seeding = None, self.__seeding
+                seeding.commit_seed()
+            elif self.__membership is not None:
+                self.__membership.clear()
 
             if self.settings:
                 if should_keep_replicas:
@@ -0,0 +1,8 @@
+"""
+Durable outbox for the auto-indexing operations.
+
+Add "algoliasearch_django.outbox" to INSTALLED_APPS and set OUTBOX to True in
+the ALGOLIA settings: the signal receivers then record the operations in the
+AlgoliaOutbox table, in the same transaction as the change, and the
+`algolia_drain_outbox` command sends them to Algolia.
+"""
@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class AlgoliaOutboxConfig(AppConfig):
+    """AppConfig of the outbox of the auto-indexing operations."""
+
+    name = "algoliasearch_django.outbox"
+    label = "algolia_outbox"
+    verbose_name = "Algolia outbox"
+    default_auto_field = "django.db.models.BigAutoField"  # pyright: ignore[reportAssignmentType]
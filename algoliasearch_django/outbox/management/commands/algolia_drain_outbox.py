@@ -0,0 +1,44 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from algoliasearch_django.outbox.models import AlgoliaOutbox
+
+
+class Command(BaseCommand):
+    help = "Send the pending operations of the outbox to Algolia"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batchsize", nargs="?", default=1000, type=int)
+        parser.add_argument("--database", type=str)
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep waiting for new operations instead of exiting once empty",
+        )
+        parser.add_argument("--interval", default=1.0, type=float)
+
+    def handle(self, *args, **options):
+        """Run the management command."""
+        batch_size = options.get("batchsize", None) or 1000
+
+        counts = 0
+        while True:
+            try:
+                sent = AlgoliaOutbox.objects.drain(
+                    batch_size=batch_size, using=options.get("database")
+                )
+            except Exception as e:
+                if not options["loop"]:
+                    raise
+                self.stderr.write("Drain failed, retrying: {}".format(e))
+                sent = 0
+
+            counts += sent
+            if sent:
+                continue
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
+
+        self.stdout.write("Sent {} operations".format(counts))
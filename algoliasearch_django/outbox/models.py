@@ -0,0 +1,105 @@
+from __future__ import unicode_literals
+
+from collections import OrderedDict
+import logging
+
+from django.apps import apps
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+from django.db import router
+from django.db import transaction
+
+from ..buffer import DELETE, IndexingBuffer
+from ..group import iter_indices
+from ..registration import RegistrationError, algolia_engine
+
+logger = logging.getLogger(__name__)
+
+
+class AlgoliaOutboxManager(models.Manager):
+    def enqueue(self, adapter, instance, using=None):
+        """
+        Records that the instance changed, in the current transaction of the
+        `using` database.
+        """
+        self.using(using).create(
+            model=instance._meta.label_lower,
+            object_pk=str(instance.pk),
+            object_id=adapter.objectID(instance),
+        )
+
+    def drain(self, batch_size=1000, using=None):
+        """
+        Sends one batch of pending operations and deletes their rows.
+
+        The rows are claimed with SELECT ... FOR UPDATE SKIP LOCKED, so that
+        several drainers can run in parallel. The instances are read again
+        when sending: the index gets their latest state whatever the order in
+        which the batches are sent, and the instances which no longer exist
+        are deleted. If sending fails, the rows are left for a later drain.
+
+        Returns the number of rows sent.
+        """
+        using = using or router.db_for_write(self.model)
+        with transaction.atomic(using=using):  # pyright: ignore[reportGeneralTypeIssues]
+            rows = list(
+                self.using(using)
+                .select_for_update(skip_locked=True)
+                .order_by("pk")[:batch_size]
+            )
+            if not rows:
+                return 0
+
+            # Coalesce the operations on the same instance
+            changes = OrderedDict()
+            for row in rows:
+                changes.setdefault(row.model, OrderedDict())[row.object_pk] = (
+                    row.object_id
+                )
+
+            buffer = IndexingBuffer()
+            for label, object_ids in changes.items():
+                try:
+                    adapter = algolia_engine.get_adapter(apps.get_model(label))
+                except (LookupError, RegistrationError):
+                    logger.warning(
+                        "SKIP %d OPERATIONS OF %s: NOT REGISTERED",
+                        len(object_ids),
+                        label,
+                    )
+                    continue
+
+                found = set()
+                for instance in adapter.model._base_manager.using(using).filter(
+                    pk__in=list(object_ids)
+                ):
+                    found.add(str(instance.pk))
+                    buffer.save(adapter, instance)
+                for object_pk, object_id in object_ids.items():
+                    if object_pk not in found:
+                        for index in iter_indices(adapter):
+                            buffer.add(index, DELETE, {"objectID": object_id})
+
+            buffer.flush(raise_exceptions=True)
+            self.using(using).filter(pk__in=[row.pk for row in rows]).delete()
+
+        logger.info("DRAIN %d OPERATIONS", len(rows))
+        return len(rows)
+
+
+class AlgoliaOutbox(models.Model):
+    """An instance whose record has to be sent to Algolia."""
+
+    model = models.CharField(max_length=255)
+    object_pk = models.CharField(max_length=255)
+    # e.g. a UUID is stored as a string, like the record encoders send it
+    object_id = models.JSONField(encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = AlgoliaOutboxManager()
+
+    class Meta:
+        verbose_name = "Algolia outbox operation"
+
+    def __str__(self):
+        return "{} {}".format(self.model, self.object_pk)
@@ -0,0 +1,172 @@
+from __future__ import unicode_literals
+
+import multiprocessing
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any
+
+from algoliasearch.http.exceptions import AlgoliaException
+
+_STOP = object()
+
+
+class BatchUploader(object):
+    """
+    Uploads batches from a pool of threads, fed by a bounded queue, so that
+    the batches are built while the previous ones are uploaded.
+
+    `put` blocks while the queue is full, and raises the first error of an
+    upload. `close` waits for the uploads and returns their results.
+    """
+
+    def __init__(self, upload, workers=1, queue_size=None):
+        self._upload = upload
+        self._queue = queue.Queue(maxsize=queue_size or 2 * max(1, workers))
+        self._lock = threading.Lock()
+        self._results = []
+        self._error = None
+        self._aborted = False
+        self._threads = [
+            threading.Thread(
+                target=self._run, name="algolia-uploader-{}".format(i), daemon=True
+            )
+            for i in range(max(1, workers))
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def put(self, batch):
+        """Queues a batch to upload."""
+        if self._error is not None:
+            raise self._error
+        self._queue.put(batch)
+
+    def close(self):
+        """Waits for the queued batches to be uploaded and returns the results."""
+        for _ in self._threads:
+            self._queue.put(_STOP)
+        for thread in self._threads:
+            thread.join()
+
+        if self._error is not None and not self._aborted:
+            raise self._error
+        return self._results
+
+    def abort(self):
+        """Drops the queued batches and stops the workers."""
+        self._aborted = True
+        self.close()
+
+    def _run(self):
+        while True:
+            batch = self._queue.get()
+            if batch is _STOP:
+                return
+            # After an error, keep consuming so that put() never blocks
+            if self._error is not None or self._aborted:
+                continue
+
+            try:
+                result = self._upload(batch)
+            except Exception as e:
+                with self._lock:
+                    if self._error is None:
+                        self._error = e
+            else:
+                with self._lock:
+                    self._results.append(result)
+
+
+class _Failure(object):
+    def __init__(self, error):
+        self.error = error
+
+
+class BatchFeed(object):
+    """
+    Hands the batches built by one thread to a consumer in another, through
+    a bounded queue.
+
+    Iterating over the feed yields the batches until `close`, and raises the
+    error given to `fail`. A consumer which stops early calls `drain`, so
+    that `put` never blocks.
+    """
+
+    def __init__(self, queue_size=2):
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._done = False
+
+    def put(self, batch):
+        """Queues a batch for the consumer."""
+        self._queue.put(batch)
+
+    def close(self):
+        """Ends the feed."""
+        self._queue.put(_STOP)
+
+    def fail(self, error):
+        """Ends the feed with an error, raised in the consumer."""
+        self._queue.put(_Failure(error))
+        self._queue.put(_STOP)
+
+    def drain(self):
+        """Drops the batches left until the end of the feed."""
+        while not self._done:
+            if self._queue.get() is _STOP:
+                self._done = True
+
+    def __iter__(self):
+        while not self._done:
+            item = self._queue.get()
+            if item is _STOP:
+                self._done = True
+                return
+            if isinstance(item, _Failure):
+                raise item.error
+            yield item
+
+
+# The adapter of the forked processes, inherited from the parent
+_shard_adapter: Any = None
+
+
+def _init_shard_process(adapter):
+    global _shard_adapter
+    _shard_adapter = adapter
+
+
+def _reindex_shard(shard, batch_size, workers, position, batch_bytes):
+    try:
+        return _shard_adapter._reindex_shard(
+            shard, batch_size, workers, position, batch_bytes
+        )
+    except AlgoliaException as e:
+        # The errors of the client, like RequestException, can't always be
+        # unpickled by the parent: only send their message back
+        raise AlgoliaException(str(e)) from None
+
+
+def reindex_shards(adapter, shards, batch_size, workers=1, batch_bytes=None):
+    """
+    Reindexes each shard of the adapter in its own forked process, and
+    returns their results in order. It raises the first error once all the
+    processes are done. Each process checkpoints its progress under the
+    position of its shard.
+
+    The caller closes its database connections and HTTP sessions before, so
+    that every process opens its own.
+    """
+    with ProcessPoolExecutor(
+        max_workers=len(shards),
+        mp_context=multiprocessing.get_context("fork"),
+        initializer=_init_shard_process,
+        initargs=(adapter,),
+    ) as executor:
+        futures = [
+            executor.submit(
+                _reindex_shard, shard, batch_size, workers, position, batch_bytes
+            )
+            for position, shard in enumerate(shards)
+        ]
+    return [future.result() for future in futures]
@@ -1,12 +1,20 @@
 from __future__ import unicode_literals
+from contextlib import contextmanager
+from contextvars import ContextVar
 import logging
+from typing import Optional
 
 from django import __version__ as __django__version__
+from django.db.models.signals import post_init
 from django.db.models.signals import post_save
 from django.db.models.signals import pre_delete
 from algoliasearch_django.version import VERSION as __version__
 from algoliasearch.search.client import SearchClientSync
 
+from . import dispatcher
+from . import tracking
+from .buffer import IndexingBuffer, PARTIAL_UPDATE, TransactionBuffer
+from .group import AlgoliaIndexGroup, iter_indices
 from .models import AlgoliaIndex
 from .settings import SETTINGS
 
@@ -32,9 +40,32 @@ class AlgoliaEngine(object):
             raise AlgoliaEngineError("APPLICATION_ID and API_KEY must be defined.")
 
         self.__auto_indexing = settings.get("AUTO_INDEXING", True)
+        self.__index_on_commit = settings.get("INDEX_ON_COMMIT", False)
+        self.__outbox = settings.get("OUTBOX", False)
+
+        self.dispatcher = None
+        if settings.get("ASYNC_INDEXING", False):
+            backpressure = settings.get("ASYNC_BACKPRESSURE", dispatcher.BLOCK)
+            if backpressure not in dispatcher.BACKPRESSURE_POLICIES:
+                raise AlgoliaEngineError(
+                    "ASYNC_BACKPRESSURE must be one of {}, got {}".format(
+                        ", ".join(dispatcher.BACKPRESSURE_POLICIES), backpressure
+                    )
+                )
+            self.dispatcher = dispatcher.Dispatcher(
+                workers=settings.get("ASYNC_WORKERS", 1),
+                queue_size=settings.get("ASYNC_QUEUE_SIZE", 1000),
+                backpressure=backpressure,
+            )
+        self.__transaction_buffer = TransactionBuffer(send=self.__send_committed)
+        self.__collecting: ContextVar[Optional[IndexingBuffer]] = ContextVar(
+            "algolia_collecting", default=None
+        )
         self.__settings = settings
 
         self.__registered_models = {}
+        # The models whose saves and deletes are indexed by their signals
+        self.__auto_indexed = set()
         self.client = SearchClientSync(app_id, api_key)
         self.client.add_user_agent("Algolia for Django", __version__)
         self.client.add_user_agent("Django", __django__version__)
@@ -43,31 +74,60 @@ class AlgoliaEngine(object):
         """Checks whether the given models is registered with Algolia engine"""
         return model in self.__registered_models
 
+    def is_auto_indexed(self, model):
+        """
+        Checks whether the saves and deletes of the given model are indexed
+        by its signals, which may defer them or enqueue them in the outbox.
+        """
+        return model in self.__auto_indexed
+
     def register(self, model, index_cls=AlgoliaIndex, auto_indexing=None):
         """
         Registers the given model with Algolia engine.
 
-        If the given model is already registered with Algolia engine, a
-        RegistrationError will be raised.
+        A model registered with several indices gets an AlgoliaIndexGroup as
+        adapter. If the given model is already registered with the same
+        index name, a RegistrationError will be raised.
         """
-        # Check for existing registration.
-        if self.is_registered(model):
-            raise RegistrationError(
-                "{} is already registered with Algolia engine".format(model)
-            )
-
-        # Perform the registration.
         if not issubclass(index_cls, AlgoliaIndex):
             raise RegistrationError(
                 "{} should be a subclass of AlgoliaIndex".format(index_cls)
             )
         index_obj = index_cls(model, self.client, self.__settings)
+
+        # Check for existing registration.
+        if self.is_registered(model):
+            adapter = self.__registered_models[model]
+            indices = iter_indices(adapter)
+            if index_obj.index_name in [index.index_name for index in indices]:
+                raise RegistrationError(
+                    "{} is already registered with Algolia engine".format(model)
+                )
+            if index_obj.custom_objectID != adapter.custom_objectID:
+                raise RegistrationError(
+                    "The indices of {} must have the same custom_objectID".format(model)
+                )
+
+            if index_obj.track_changes:
+                post_init.connect(self.__post_init_receiver, model)
+            if isinstance(adapter, AlgoliaIndexGroup):
+                adapter.add(index_obj)
+            else:
+                self.__registered_models[model] = AlgoliaIndexGroup(
+                    model, [adapter, index_obj]
+                )
+            logger.info("REGISTER %s IN %s", model, index_obj.index_name)
+            return
+
         self.__registered_models[model] = index_obj
+        if index_obj.track_changes:
+            post_init.connect(self.__post_init_receiver, model)
 
         if (isinstance(auto_indexing, bool) and auto_indexing) or self.__auto_indexing:
             # Connect to the signalling framework.
             post_save.connect(self.__post_save_receiver, model)
             pre_delete.connect(self.__pre_delete_receiver, model)
+            self.__auto_indexed.add(model)
             logger.info("REGISTER %s", model)
 
     def unregister(self, model):
@@ -85,8 +145,10 @@ class AlgoliaEngine(object):
         del self.__registered_models[model]
 
         # Disconnect from the signalling framework.
+        post_init.disconnect(self.__post_init_receiver, model)
         post_save.disconnect(self.__post_save_receiver, model)
         pre_delete.disconnect(self.__pre_delete_receiver, model)
+        self.__auto_indexed.discard(model)
         logger.info("UNREGISTER %s", model)
 
     def get_registered_models(self):
@@ -97,7 +159,10 @@ class AlgoliaEngine(object):
         return list(self.__registered_models.keys())
 
     def get_adapter(self, model):
-        """Returns the adapter associated with the given model."""
+        """
+        Returns the adapter associated with the given model, an
+        AlgoliaIndexGroup if it is registered with several indices.
+        """
         if not self.is_registered(model):
             raise RegistrationError(
                 "{} is not registered with Algolia engine".format(model)
@@ -122,12 +187,20 @@ class AlgoliaEngine(object):
         https://github.com/algolia/algoliasearch-client-python#update-an-existing-object-in-the-index
         """
         adapter = self.get_adapter_from_instance(instance)
-        adapter.save_record(instance, **kwargs)
+        buffer = self.__collecting.get()
+        if buffer is not None:
+            buffer.save(adapter, instance, update_fields=kwargs.get("update_fields"))
+        else:
+            adapter.save_record(instance, **kwargs)
 
     def delete_record(self, instance):
         """Deletes the record."""
         adapter = self.get_adapter_from_instance(instance)
-        adapter.delete_record(instance)
+        buffer = self.__collecting.get()
+        if buffer is not None:
+            buffer.delete(adapter, instance)
+        else:
+            adapter.delete_record(instance)
 
     def update_records(self, model, qs, batch_size=1000, **kwargs):
         """
@@ -143,7 +216,13 @@ class AlgoliaEngine(object):
         >>> qs.update(myField=True)
         """
         adapter = self.get_adapter(model)
-        adapter.update_records(qs, batch_size=batch_size, **kwargs)
+        buffer = self.__collecting.get()
+        if buffer is not None:
+            for index in iter_indices(adapter):
+                for record in index.get_update_records(qs, **kwargs):
+                    buffer.add(index, PARTIAL_UPDATE, record)
+        else:
+            adapter.update_records(qs, batch_size=batch_size, **kwargs)
 
     def raw_search(self, model, query="", params=None):
         """Performs a search query and returns the parsed JSON."""
@@ -158,34 +237,185 @@ class AlgoliaEngine(object):
         adapter = self.get_adapter(model)
         adapter.clear_objects()
 
-    def reindex_all(self, model, batch_size=1000):
+    def reindex_all(
+        self,
+        model,
+        batch_size=1000,
+        workers=1,
+        processes=1,
+        resume=False,
+        strategy="swap",
+        batch_bytes=None,
+    ):
         """
         Reindex all the records.
 
         By default, this method use Model.objects.all() but you can implement
         a method `get_queryset` in your subclass. This can be used to optimize
         the performance (for example with select_related or prefetch_related).
+
+        The batches are uploaded by `workers` threads while the next ones are
+        built, in each of the `processes` reindexing a range of primary keys.
+        With `resume`, a failed reindex continues from its checkpoint.
+        With `batch_bytes`, the requests are also bounded by their size.
+
+        With the "diff" `strategy`, only the changed records are sent to the
+        index, along with the deletion of its orphans.
         """
         adapter = self.get_adapter(model)
-        return adapter.reindex_all(batch_size)
+        return adapter.reindex_all(
+            batch_size,
+            workers=workers,
+            processes=processes,
+            resume=resume,
+            strategy=strategy,
+            batch_bytes=batch_bytes,
+        )
+
+    def reindex_since(
+        self, model, since=None, batch_size=1000, watermark_field=None, batch_bytes=None
+    ):
+        """
+        Reindex the records of the instances modified since the given value
+        of the watermark field, or since the last successful run, directly
+        into the index.
+        """
+        adapter = self.get_adapter(model)
+        return adapter.reindex_since(
+            since,
+            batch_size=batch_size,
+            watermark_field=watermark_field,
+            batch_bytes=batch_bytes,
+        )
+
+    # Batching.
+
+    @contextmanager
+    def collect(self, send=True):
+        """
+        Collects the writes made through the engine (`save_record`,
+        `delete_record` and `update_records`) and sends them as one batch per
+        index when exiting.
+
+        Nested calls join the outermost collection. If `send` is False, the
+        collected operations are left in the yielded buffer, to be sent with
+        `flush()`.
+
+        >>> with algolia_engine.collect():
+        >>>     for obj in objs:
+        >>>         obj.save()
+        """
+        buffer = self.__collecting.get()
+        if buffer is not None:
+            yield buffer
+            return
+
+        buffer = IndexingBuffer()
+        token = self.__collecting.set(buffer)
+        try:
+            yield buffer
+        finally:
+            self.__collecting.reset(token)
+            if send:
+                self.flush(buffer)
+
+    def flush(self, buffer):
+        """Sends the operations of the buffer, through the dispatcher if there is one."""
+        if self.dispatcher is not None:
+            self.dispatcher.dispatch(buffer)
+        else:
+            buffer.flush()
+
+    def __enqueue(self, instance, using):
+        # Imported here, as the outbox is an optional app whose models import
+        # the engine
+        from .outbox.models import AlgoliaOutbox
+
+        adapter = self.get_adapter_from_instance(instance)
+        AlgoliaOutbox.objects.enqueue(adapter, instance, using=using)
+
+    def __send_committed(self, buffer):
+        collected = self.__collecting.get()
+        if collected is not None:
+            collected.merge(buffer)
+        else:
+            self.flush(buffer)
+
+    def shutdown(self, timeout=None):
+        """
+        Sends the operations queued for the background threads of
+        `ASYNC_INDEXING` and stops them. The later operations are sent inline.
+        """
+        if self.dispatcher is not None:
+            self.dispatcher.shutdown(timeout)
 
     def reset(self, settings=None):
         """Reinitializes the Algolia engine and its client.
         :param settings: settings to use instead of the default django.conf.settings.algolia
         """
+        self.shutdown()
         self.__init__(settings=settings if settings is not None else SETTINGS)
 
     # Signalling hooks.
 
+    def __is_tracked(self, model):
+        return any(
+            index.track_changes
+            for index in iter_indices(self.__registered_models[model])
+        )
+
+    def __post_init_receiver(self, instance, **kwargs):
+        """Signal handler keeping the loaded values of a tracked instance."""
+        tracking.take_snapshot(instance)
+
     def __post_save_receiver(self, instance, **kwargs):
         """Signal handler for when a registered model has been saved."""
         logger.debug("RECEIVE post_save FOR %s", instance.__class__)
-        self.save_record(instance, **kwargs)
+        if self.__is_tracked(instance.__class__) and tracking.has_snapshot(instance):
+            update_fields = kwargs.get("update_fields")
+            if update_fields is None and not kwargs.get("created"):
+                kwargs["update_fields"] = tracking.get_changed_fields(instance)
+            try:
+                self.__handle_save(instance, **kwargs)
+            finally:
+                tracking.take_snapshot(instance, update_fields)
+        else:
+            self.__handle_save(instance, **kwargs)
+
+    def __handle_save(self, instance, **kwargs):
+        using = kwargs.get("using")
+        if self.__outbox:
+            self.__enqueue(instance, using)
+        elif self.__index_on_commit and self.__transaction_buffer.in_transaction(using):
+            adapter = self.get_adapter_from_instance(instance)
+            self.__transaction_buffer.save(
+                adapter,
+                instance,
+                update_fields=kwargs.get("update_fields"),
+                using=using,
+            )
+        elif self.dispatcher is not None and self.__collecting.get() is None:
+            adapter = self.get_adapter_from_instance(instance)
+            self.dispatcher.save(
+                adapter, instance, update_fields=kwargs.get("update_fields")
+            )
+        else:
+            self.save_record(instance, **kwargs)
 
     def __pre_delete_receiver(self, instance, **kwargs):
         """Signal handler for when a registered model has been deleted."""
         logger.debug("RECEIVE pre_delete FOR %s", instance.__class__)
-        self.delete_record(instance)
+        using = kwargs.get("using")
+        if self.__outbox:
+            self.__enqueue(instance, using)
+        elif self.__index_on_commit and self.__transaction_buffer.in_transaction(using):
+            adapter = self.get_adapter_from_instance(instance)
+            self.__transaction_buffer.delete(adapter, instance, using=using)
+        elif self.dispatcher is not None and self.__collecting.get() is None:
+            adapter = self.get_adapter_from_instance(instance)
+            self.dispatcher.delete(adapter, instance)
+        else:
+            self.delete_record(instance)
 
 
 # Algolia engine
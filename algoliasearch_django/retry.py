@@ -0,0 +1,69 @@
+from __future__ import unicode_literals
+
+import logging
+import random
+import time
+
+from algoliasearch.http.exceptions import AlgoliaUnreachableHostException
+from algoliasearch.http.exceptions import RequestException
+
+logger = logging.getLogger(__name__)
+
+
+def is_retryable(error):
+    """
+    Returns True if the error is transient: a timeout, an unreachable host, a
+    rate limit (429) or a server error (5xx).
+    """
+    if isinstance(error, AlgoliaUnreachableHostException):
+        return True
+    if isinstance(error, RequestException):
+        status_code = error.status_code or 0
+        return status_code in (408, 429) or status_code >= 500
+    return False
+
+
+class RetryPolicy(object):
+    """
+    Calls a function again when it fails with a retryable error, with an
+    exponential backoff and full jitter.
+
+    It gives up after `max_attempts` calls, or when waiting for the next
+    attempt would go over `max_time` seconds since the first one.
+    """
+
+    def __init__(self, max_attempts=1, base_delay=0.5, max_delay=10, max_time=30):
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_time = max_time
+
+    def call(self, func, *args, **kwargs):
+        start = time.monotonic()
+        attempt = 1
+        while True:
+            try:
+                return func(*args, **kwargs)
+            except Exception as e:
+                if attempt >= self.max_attempts or not is_retryable(e):
+                    raise
+
+                delay = random.uniform(
+                    0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+                )
+                if time.monotonic() - start + delay > self.max_time:
+                    raise
+
+                logger.info("RETRY IN %.2fs AFTER ATTEMPT %d: %s", delay, attempt, e)
+                time.sleep(delay)
+                attempt += 1
+
+
+def get_policy(settings):
+    """Returns the retry policy configured by the RETRY_* settings."""
+    return RetryPolicy(
+        max_attempts=settings.get("RETRY_MAX_ATTEMPTS", 1),
+        base_delay=settings.get("RETRY_BASE_DELAY", 0.5),
+        max_delay=settings.get("RETRY_MAX_DELAY", 10),
+        max_time=settings.get("RETRY_MAX_TIME", 30),
+    )
@@ -0,0 +1,145 @@
+from __future__ import unicode_literals
+
+import datetime
+import json
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.utils.module_loading import import_string
+
+
+def get_store(index_name, settings):
+    """
+    Returns the state store configured by the STATE_STORE setting for the
+    given index, a CacheStateStore by default.
+    """
+    path = settings.get("STATE_STORE", "algoliasearch_django.state.CacheStateStore")
+    store_cls = import_string(path)
+    return store_cls(index_name, **settings.get("STATE_STORE_OPTIONS", {}))
+
+
+class StateStore(object):
+    """
+    Keeps the small state of the reindexing of an index between two runs,
+    like the watermark of the last delta reindex.
+
+    Subclasses implement the storage, keyed by name.
+    """
+
+    # False if the state is lost between two runs, so that a reindex can't
+    # be resumed nor continued from its watermark
+    persistent = True
+
+    def __init__(self, index_name):
+        self.index_name = index_name
+
+    def get(self, key, default=None):
+        """Returns the value stored for the key."""
+        raise NotImplementedError
+
+    def set(self, key, value):
+        """Stores a value for the key."""
+        raise NotImplementedError
+
+    def delete(self, key):
+        """Forgets the value of the key."""
+        raise NotImplementedError
+
+
+class CacheStateStore(StateStore):
+    """
+    Keeps the state in a Django cache, without expiration. The cache must be
+    shared by the processes and must not evict keys, e.g. a database cache.
+    """
+
+    def __init__(self, index_name, cache="default"):
+        super(CacheStateStore, self).__init__(index_name)
+        self.cache = caches[cache]
+        self.persistent = not isinstance(self.cache, (LocMemCache, DummyCache))
+
+    def _key(self, key):
+        return "algolia_state:{}:{}".format(self.index_name, key)
+
+    def get(self, key, default=None):
+        return self.cache.get(self._key(key), default)
+
+    def set(self, key, value):
+        self.cache.set(self._key(key), value, timeout=None)
+
+    def delete(self, key):
+        self.cache.delete(self._key(key))
+
+
+def _encode(value):
+    # Unlike DjangoJSONEncoder, keeps the microseconds of a watermark
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    return str(value)
+
+
+class FileStateStore(StateStore):
+    """
+    Keeps the state of all the indices in a JSON file, replaced atomically.
+    The values are stored as JSON, e.g. datetimes as ISO 8601 strings.
+
+    The updates are serialized by a lock file, so that the processes of a
+    sharded reindex can checkpoint concurrently.
+    """
+
+    _lock = threading.Lock()
+
+    def __init__(self, index_name, path):
+        super(FileStateStore, self).__init__(index_name)
+        self.path = path
+
+    @contextmanager
+    def _locked(self):
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self.path + ".lock", "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def _write(self, state):
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.path)))
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(state, f, default=_encode)
+        os.replace(tmp_path, self.path)
+
+    def get(self, key, default=None):
+        with self._locked():
+            return self._read().get(self.index_name, {}).get(key, default)
+
+    def set(self, key, value):
+        with self._locked():
+            state = self._read()
+            state.setdefault(self.index_name, {})[key] = value
+            self._write(state)
+
+    def delete(self, key):
+        with self._locked():
+            state = self._read()
+            if state.get(self.index_name, {}).pop(key, None) is not None:
+                self._write(state)
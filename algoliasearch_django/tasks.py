@@ -0,0 +1,61 @@
+from __future__ import unicode_literals
+
+import logging
+import queue
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Policies for the WAIT_FOR_TASKS setting
+ALWAYS = "always"
+BACKGROUND = "background"
+NEVER = "never"
+
+POLICIES = (ALWAYS, BACKGROUND, NEVER)
+
+
+class TaskWaiter(object):
+    """
+    Waits for Algolia tasks in a background thread.
+
+    Tasks are only waited for to log the ones that fail or time out: the
+    write was already accepted by Algolia when the task is added.
+    """
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def add(self, client, index_name, task_id):
+        """Queues a task to wait for."""
+        self._queue.put((client, index_name, task_id))
+        self._ensure_started()
+
+    def wait_all(self):
+        """Blocks until all the queued tasks have been waited for."""
+        self._queue.join()
+
+    def _ensure_started(self):
+        with self._lock:
+            # The thread does not survive a fork, so check it is still alive
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="algolia-task-waiter", daemon=True
+                )
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            client, index_name, task_id = self._queue.get()
+            try:
+                client.wait_for_task(index_name, task_id)
+                logger.debug("TASK %s PUBLISHED ON %s", task_id, index_name)
+            except Exception as e:
+                logger.warning("TASK %s ON %s FAILED: %s", task_id, index_name, e)
+            finally:
+                self._queue.task_done()
+
+
+# Task waiter shared by all the indices
+task_waiter = TaskWaiter()
@@ -0,0 +1,63 @@
+from __future__ import unicode_literals
+
+import copy
+
+SNAPSHOT_ATTR = "_algolia_snapshot"
+
+
+class ChangedFields(frozenset):
+    """
+    The names of the fields of an instance which changed since it was loaded,
+    given as `update_fields` to the indices when it is saved without them.
+
+    Unlike explicit update_fields, they are only used by the indices which
+    `track_changes`, the others send the full record.
+    """
+
+
+def _copy(value):
+    # Mutable values could be changed in place
+    if isinstance(value, (dict, list)):
+        return copy.deepcopy(value)
+    return value
+
+
+def has_snapshot(instance):
+    return SNAPSHOT_ATTR in instance.__dict__
+
+
+def take_snapshot(instance, update_fields=None):
+    """
+    Keeps the values of the concrete fields loaded on the instance, only
+    those of `update_fields` if given.
+    """
+    values = instance.__dict__
+    snapshot = values.setdefault(SNAPSHOT_ATTR, {})
+    for field in instance._meta.concrete_fields:
+        if update_fields is not None and field.name not in update_fields:
+            continue
+        if field.attname in values:  # Not deferred
+            snapshot[field.attname] = _copy(values[field.attname])
+
+
+def get_changed_fields(instance):
+    """
+    Returns the ChangedFields of the instance since its snapshot, by name
+    and attname, or None if there is no snapshot.
+    """
+    values = instance.__dict__
+    snapshot = values.get(SNAPSHOT_ATTR)
+    if snapshot is None:
+        return None
+
+    changed = set()
+    for field in instance._meta.concrete_fields:
+        if field.attname not in values:
+            continue  # Deferred and not set
+        if (
+            field.attname not in snapshot
+            or snapshot[field.attname] != values[field.attname]
+        ):
+            changed.add(field.name)
+            changed.add(field.attname)
+    return ChangedFields(changed)
@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+"""
+Measures the time to encode 1000 records holding Decimal, datetime, UUID and
+lazy string values, with each available RECORD_ENCODER, and with the
+serializer of the API client followed by `json.dumps`, for comparison.
+
+Run it from the root of the repository:
+
+    $ python benchmarks/encoding.py
+"""
+
+import datetime
+import decimal
+import json
+import os
+import sys
+import timeit
+import uuid
+
+import django
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "tests.settings")
+os.environ.setdefault("ALGOLIA_APPLICATION_ID", "benchmark")
+os.environ.setdefault("ALGOLIA_API_KEY", "benchmark")
+django.setup()
+
+from algoliasearch.http.serializer import body_serializer  # noqa: E402
+from django.utils.translation import gettext_lazy  # noqa: E402
+
+from algoliasearch_django import encoders  # noqa: E402
+
+RECORDS = 1000
+NUMBER = 20
+REPEAT = 5
+
+
+def build_records(native):
+    now = datetime.datetime(2024, 1, 2, 3, 4, 5, 123456, tzinfo=datetime.timezone.utc)
+    records = []
+    for i in range(RECORDS):
+        record = {
+            "objectID": i,
+            "name": "Example name-{}".format(i),
+            "tags": ["a", "b", "c"],
+            "_geoloc": {"lat": 48.85, "lng": 2.35},
+            "is_admin": False,
+        }
+        if native:
+            record.update(
+                price=12.5, created=now.isoformat(), uid=str(uuid.UUID(int=i))
+            )
+        else:
+            record.update(
+                price=decimal.Decimal("12.50"),
+                created=now,
+                uid=uuid.UUID(int=i),
+                label=gettext_lazy("Example"),
+            )
+        records.append(record)
+    return records
+
+
+def client_dumps(records):
+    # The client does not serialize datetimes nor UUIDs, so it gets
+    # JSON-native records
+    return json.dumps(body_serializer({"requests": records}))
+
+
+def main():
+    rich = build_records(native=False)
+    native = build_records(native=True)
+
+    candidates = [
+        ("client", lambda: client_dumps(native)),
+        ("json encode", lambda: encoders.JSONRecordEncoder().encode(rich)),
+        ("json normalize", lambda: encoders.JSONRecordEncoder().normalize(rich)),
+    ]
+    if encoders.orjson is not None:
+        candidates += [
+            ("orjson encode", lambda: encoders.OrjsonRecordEncoder().encode(rich)),
+            (
+                "orjson normalize",
+                lambda: encoders.OrjsonRecordEncoder().normalize(rich),
+            ),
+        ]
+    else:
+        print("orjson is not installed, skipping its encoder")
+
+    for label, encode in candidates:
+        best = min(timeit.repeat(encode, number=NUMBER, repeat=REPEAT)) / NUMBER
+        print("{:>16}: {:.2f} ms per {} records".format(label, best * 1000, RECORDS))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+"""
+Measures how many records per second `reindex_all` reads from the database
+and builds, from values_list() rows when all the fields are columns, and
+from model instances otherwise.
+
+Run it from the root of the repository:
+
+    $ python benchmarks/reindex_rows.py
+"""
+
+import os
+import sys
+import timeit
+
+import django
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "tests.settings")
+os.environ.setdefault("ALGOLIA_APPLICATION_ID", "benchmark")
+os.environ.setdefault("ALGOLIA_API_KEY", "benchmark")
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.db import connection  # noqa: E402
+from mock import MagicMock  # noqa: E402
+
+from algoliasearch_django import AlgoliaIndex  # noqa: E402
+from tests.models import Example  # noqa: E402
+
+RECORDS = 20000
+REPEAT = 5
+
+
+class ExampleIndex(AlgoliaIndex):
+    fields = ("uid", "name", "address", "lat", "lng", "is_admin")
+
+
+class InstanceExampleIndex(ExampleIndex):
+    def get_raw_record(self, instance, update_fields=None):
+        # Overriding get_raw_record disables the values_list() path
+        return super(InstanceExampleIndex, self).get_raw_record(instance, update_fields)
+
+
+def read_all(index):
+    for _ in index._AlgoliaIndex__iter_batches(1000):
+        pass
+
+
+def main():
+    connection.creation.create_test_db(verbosity=0)
+    Example.objects.bulk_create(
+        [
+            Example(
+                uid=i,
+                name="Example name-{}".format(i),
+                address="Example address-{}".format(i),
+                lat=48.85,
+                lng=2.35,
+                is_admin=False,
+            )
+            for i in range(RECORDS)
+        ]
+    )
+
+    for label, index_cls in (
+        ("instances", InstanceExampleIndex),
+        ("values_list", ExampleIndex),
+    ):
+        index = index_cls(Example, MagicMock(), settings.ALGOLIA)
+        best = min(timeit.repeat(lambda: read_all(index), number=1, repeat=REPEAT))
+        print("{:>12}: {:,.0f} records/sec".format(label, RECORDS / best))
+
+
+if __name__ == "__main__":
+    main()
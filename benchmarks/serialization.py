@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+"""
+Measures how many records per second an AlgoliaIndex builds, as done by
+`reindex_all` for each instance: `_should_index` then `get_raw_record`.
+
+Run it from the root of the repository:
+
+    $ python benchmarks/serialization.py
+"""
+
+import os
+import sys
+import timeit
+
+import django
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "tests.settings")
+os.environ.setdefault("ALGOLIA_APPLICATION_ID", "benchmark")
+os.environ.setdefault("ALGOLIA_API_KEY", "benchmark")
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from mock import MagicMock  # noqa: E402
+
+from algoliasearch_django import AlgoliaIndex  # noqa: E402
+from tests.models import Example  # noqa: E402
+
+RECORDS = 10000
+REPEAT = 5
+
+
+class ExampleIndex(AlgoliaIndex):
+    fields = ("uid", "name", "address", "lat", "lng", "is_admin")
+    geo_field = "location"
+    tags = "category"
+    should_index = "has_name"
+
+
+def build_all(index, instances):
+    should_index = index._should_index
+    get_raw_record = index.get_raw_record
+    for instance in instances:
+        if should_index(instance):
+            get_raw_record(instance)
+
+
+def main():
+    index = ExampleIndex(Example, MagicMock(), settings.ALGOLIA)
+    instances = [
+        Example(
+            id=i,
+            uid=i,
+            name="Example name-{}".format(i),
+            address="Example address-{}".format(i),
+            lat=48.85,
+            lng=2.35,
+            is_admin=False,
+        )
+        for i in range(RECORDS)
+    ]
+
+    best = min(
+        timeit.repeat(lambda: build_all(index, instances), number=1, repeat=REPEAT)
+    )
+    print("{:,.0f} records/sec".format(RECORDS / best))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,9 @@
+import uuid
+
 from django.db import models
 
+from algoliasearch_django.managers import AlgoliaManager
+
 
 class User(models.Model):
     name = models.CharField(max_length=30)
@@ -21,6 +25,9 @@ class User(models.Model):
     def permissions(self):
         return self._permissions.split(",")
 
+    def is_followed(self):
+        return self.followers_count > 0
+
 
 class Website(models.Model):
     name = models.CharField(max_length=100)
@@ -69,6 +76,25 @@ class Example(models.Model):
         return "foo"
 
 
+class Category(models.Model):
+    name = models.CharField(max_length=30)
+
+
 class BlogPost(models.Model):
     author = models.ForeignKey(User, on_delete=models.CASCADE)
     text = models.TextField(default="")
+    categories = models.ManyToManyField(Category, blank=True)
+
+
+class Store(models.Model):
+    name = models.CharField(max_length=100)
+    visits = models.IntegerField(default=0)
+    is_open = models.BooleanField(default=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = AlgoliaManager()
+
+
+class Ticket(models.Model):
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4)
+    name = models.CharField(max_length=100)
@@ -0,0 +1,156 @@
+from django.conf import settings
+from django.test import TestCase
+from mock import MagicMock, patch
+
+from algoliasearch_django import AlgoliaIndex
+from algoliasearch_django import algolia_engine
+from algoliasearch_django.batching import ACTION_BYTES, RecordBatcher
+from algoliasearch_django.encoders import JSONRecordEncoder
+
+from .factories import WebsiteFactory
+from .models import Website
+from .test_reindex import reindex_client
+
+
+def record(object_id, size):
+    # The encoded size of the record is `size` bytes
+    base = len('{"objectID":%d,"text":""}' % object_id)
+    return {"objectID": object_id, "text": "x" * (size - base)}
+
+
+class RecordBatcherTestCase(TestCase):
+    def setUp(self):
+        self.encoder = JSONRecordEncoder()
+
+    def ids(self, batches):
+        return [[obj["objectID"] for obj in batch] for batch in batches]
+
+    def test_without_limits(self):
+        batcher = RecordBatcher(self.encoder)
+
+        batches = list(batcher.split([record(i, 100) for i in range(5)], 2))
+
+        # The client splits the records by count
+        self.assertEqual(self.ids(batches), [[0, 1, 2, 3, 4]])
+
+    def test_batch_size(self):
+        batcher = RecordBatcher(self.encoder, batch_bytes=10**6)
+
+        batches = list(batcher.split([record(i, 100) for i in range(5)], 2))
+
+        self.assertEqual(self.ids(batches), [[0, 1], [2, 3], [4]])
+
+    def test_batch_bytes(self):
+        batcher = RecordBatcher(self.encoder, batch_bytes=1000 + 2 * ACTION_BYTES)
+        records = [record(0, 200), record(1, 800), record(2, 9000), record(3, 200)]
+
+        batches = list(batcher.split(records, 1000))
+
+        self.assertEqual(self.ids(batches), [[0, 1], [2], [3]])
+
+    def test_batch_bytes_override(self):
+        batcher = RecordBatcher(self.encoder, batch_bytes=10**6)
+        records = [record(i, 500) for i in range(3)]
+
+        batches = list(batcher.split(records, 1000, batch_bytes=600))
+
+        self.assertEqual(self.ids(batches), [[0], [1], [2]])
+
+    def test_skip_oversized(self):
+        batcher = RecordBatcher(self.encoder, max_record_bytes=1000)
+        records = [record(0, 200), record(1, 2000), record(2, 1000)]
+
+        skipped = []
+        with self.assertLogs("algoliasearch_django.batching", "WARNING") as logs:
+            batches = list(batcher.split(records, skipped=skipped))
+
+        self.assertEqual(self.ids(batches), [[0, 2]])
+        self.assertIn("RECORD 1 SKIPPED", logs.output[0])
+        self.assertEqual(skipped, [1])
+
+    def test_trim_oversized(self):
+        trim = MagicMock(
+            side_effect=lambda obj, max_bytes: {"objectID": obj["objectID"]}
+        )
+        batcher = RecordBatcher(self.encoder, max_record_bytes=1000, trim=trim)
+
+        batches = list(batcher.split([record(0, 200), record(1, 2000)]))
+
+        self.assertEqual(batches, [[record(0, 200), {"objectID": 1}]])
+        trim.assert_called_once_with(record(1, 2000), 1000)
+
+    def test_trim_too_large(self):
+        batcher = RecordBatcher(
+            self.encoder, max_record_bytes=1000, trim=lambda obj, max_bytes: obj
+        )
+
+        self.assertEqual(list(batcher.split([record(0, 2000)])), [])
+
+
+class TrimRecordTestCase(TestCase):
+    def test_trim_attributes(self):
+        class WebsiteIndex(AlgoliaIndex):
+            trim_attributes = ("description", "body")
+
+        index = WebsiteIndex(Website, MagicMock(), settings.ALGOLIA)
+        obj = {"objectID": 1, "name": "Algolia", "body": "x" * 100, "description": "y"}
+
+        self.assertEqual(
+            index.trim_record(obj, 100), {"objectID": 1, "name": "Algolia"}
+        )
+        self.assertIsNone(index.trim_record(obj, 10))
+
+    def test_write_in_batches(self):
+        client = MagicMock()
+        algolia_settings = dict(settings.ALGOLIA, BATCH_BYTES=1000)
+        index = AlgoliaIndex(Website, client, algolia_settings)
+
+        index.save_objects([record(i, 400) for i in range(5)])
+
+        sent = [
+            [obj["objectID"] for obj in kwargs["objects"]]
+            for _, kwargs in client.save_objects.call_args_list
+        ]
+        self.assertEqual(sent, [[0, 1], [2, 3], [4]])
+
+
+class SkippedRecordTestCase(TestCase):
+    def setUp(self):
+        self.client = reindex_client()
+        self.algolia_settings = dict(
+            settings.ALGOLIA,
+            RECORD_MAX_BYTES=1000,
+            FINGERPRINT_STORE="algoliasearch_django.fingerprints.LocMemFingerprintStore",
+            MEMBERSHIP_STORE="algoliasearch_django.membership.LocMemMembershipStore",
+        )
+        self.index = AlgoliaIndex(Website, self.client, self.algolia_settings)
+        self.fingerprints = self.index._AlgoliaIndex__fingerprints
+        self.membership = self.index._AlgoliaIndex__membership
+        self.membership.seed([])
+
+    def test_save_objects(self):
+        with self.assertLogs("algoliasearch_django.models", "INFO") as logs:
+            self.index.save_objects([record(0, 200), record(1, 2000)])
+
+        # The skipped record is not in the index
+        self.assertEqual(list(self.fingerprints.get_many([0, 1])), [0])
+        self.assertTrue(self.membership.might_contain(0))
+        self.assertFalse(self.membership.might_contain(1))
+        self.assertIn("SAVE 1 OBJECTS", logs.output[-1])
+
+    def test_save_record(self):
+        website = Website(id=1, name="x" * 2000, url="https://algolia.com")
+
+        self.index.save_record(website)
+
+        self.client.save_objects.assert_not_called()
+        self.assertEqual(self.fingerprints.get_many([1]), {})
+        self.assertFalse(self.membership.might_contain(1))
+
+    def test_reindex_all(self):
+        with patch.object(algolia_engine, "save_record"):
+            websites = [WebsiteFactory(), WebsiteFactory(name="x" * 2000)]
+
+        self.assertEqual(self.index.reindex_all(), 1)
+        self.assertTrue(self.membership.might_contain(websites[0].pk))
+        self.assertFalse(self.membership.might_contain(websites[1].pk))
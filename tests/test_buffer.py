@@ -0,0 +1,172 @@
+from mock import patch
+
+from django.conf import settings
+from django.db import transaction
+from django.test import TestCase
+
+from algoliasearch_django import algolia_engine
+from algoliasearch_django import AlgoliaEngine
+from algoliasearch_django import AlgoliaIndex
+from algoliasearch_django.buffer import IndexingBuffer
+
+from .factories import WebsiteFactory
+from .models import Website
+from .test_reindex import reindex_client
+
+
+class IndexingBufferTestCase(TestCase):
+    def setUp(self):
+        self.engine = AlgoliaEngine()
+        self.engine.register(Website, auto_indexing=False)
+        self.adapter = self.engine.get_adapter(Website)
+        self.website = Website(id=1, name="Algolia", url="https://algolia.com")
+
+    def tearDown(self):
+        self.engine.unregister(Website)
+
+    def test_collapse_saves(self):
+        buffer = IndexingBuffer()
+        buffer.save(self.adapter, self.website)
+        self.website.name = "Algolia Search"
+        buffer.save(self.adapter, self.website)
+
+        with patch.object(self.adapter, "save_objects") as mocked_save_objects:
+            buffer.flush()
+
+        self.assertEqual(len(buffer), 0)
+        mocked_save_objects.assert_called_once()
+        (records,), _ = mocked_save_objects.call_args
+        self.assertEqual(len(records), 1)
+        self.assertEqual(records[0]["name"], "Algolia Search")
+
+    def test_merge_partial_update_into_save(self):
+        buffer = IndexingBuffer()
+        buffer.save(self.adapter, self.website)
+        self.website.name = "Algolia Search"
+        buffer.save(self.adapter, self.website, update_fields=["name"])
+
+        with patch.object(self.adapter, "save_objects") as mocked_save_objects:
+            with patch.object(
+                self.adapter, "partial_update_objects"
+            ) as mocked_partial_update_objects:
+                buffer.flush()
+
+        (records,), _ = mocked_save_objects.call_args
+        self.assertEqual(records[0]["name"], "Algolia Search")
+        self.assertEqual(records[0]["url"], "https://algolia.com")
+        mocked_partial_update_objects.assert_called_once_with(
+            [], raise_exceptions=False
+        )
+
+    def test_prepare_batch(self):
+        class RankedWebsiteIndex(AlgoliaIndex):
+            fields = ("name", "url")
+
+            def prepare_batch(self, instances):
+                prepared.append([instance.pk for instance in instances])
+                return {instance.pk: {"rank": 1} for instance in instances}
+
+        prepared = []
+        adapter = RankedWebsiteIndex(Website, reindex_client(), settings.ALGOLIA)
+        other = Website(id=2, name="Other", url="https://other.com")
+        buffer = IndexingBuffer()
+        buffer.save(adapter, self.website)
+        buffer.save(adapter, other)
+        self.website.name = "Algolia Search"
+        buffer.save(adapter, self.website, update_fields=["name"])
+
+        with patch.object(adapter, "save_objects") as mocked_save_objects:
+            buffer.flush()
+
+        # Once for all the records of the index
+        self.assertEqual(prepared, [[2, 1]])
+        (records,), _ = mocked_save_objects.call_args
+        self.assertEqual(
+            [(record["name"], record["rank"]) for record in records],
+            [("Other", 1), ("Algolia Search", 1)],
+        )
+
+    def test_delete_replaces_save(self):
+        buffer = IndexingBuffer()
+        buffer.save(self.adapter, self.website)
+        buffer.delete(self.adapter, self.website)
+
+        with patch.object(self.adapter, "save_objects") as mocked_save_objects:
+            with patch.object(self.adapter, "delete_objects") as mocked_delete_objects:
+                buffer.flush()
+
+        mocked_save_objects.assert_called_once_with([], raise_exceptions=False)
+        mocked_delete_objects.assert_called_once_with([1], raise_exceptions=False)
+
+
+@patch.object(algolia_engine, "delete_record")
+@patch.object(algolia_engine, "save_record")
+class TransactionBufferTestCase(TestCase):
+    def setUp(self):
+        self.engine = AlgoliaEngine(
+            settings=dict(settings.ALGOLIA, INDEX_ON_COMMIT=True)
+        )
+        self.engine.register(Website)
+        self.adapter = self.engine.get_adapter(Website)
+
+    def tearDown(self):
+        self.engine.unregister(Website)
+
+    def test_flush_on_commit(self, *_):
+        with patch.object(self.adapter, "save_objects") as mocked_save_objects:
+            with self.captureOnCommitCallbacks(execute=True):
+                websites = WebsiteFactory.create_batch(3)
+                websites[0].name = "Algolia"
+                websites[0].save()
+
+                # Nothing is sent before the commit
+                mocked_save_objects.assert_not_called()
+
+        mocked_save_objects.assert_called_once()
+        (records,), _ = mocked_save_objects.call_args
+        self.assertEqual(
+            sorted(record["objectID"] for record in records),
+            sorted(website.pk for website in websites),
+        )
+
+    def test_rolled_back_savepoint(self, *_):
+        with patch.object(self.adapter, "save_objects") as mocked_save_objects:
+            with patch.object(self.adapter, "delete_objects") as mocked_delete_objects:
+                with self.captureOnCommitCallbacks(execute=True):
+                    website = WebsiteFactory()
+                    website_pk = website.pk
+                    try:
+                        with transaction.atomic():
+                            WebsiteFactory()
+                            website.delete()
+                            raise ValueError()
+                    except ValueError:
+                        pass
+
+        mocked_save_objects.assert_called_once()
+        (records,), _ = mocked_save_objects.call_args
+        self.assertEqual([record["objectID"] for record in records], [website_pk])
+        mocked_delete_objects.assert_called_once_with([], raise_exceptions=False)
+
+    def test_rolled_back_last_savepoint(self, *_):
+        with patch.object(self.adapter, "save_objects") as mocked_save_objects:
+            with self.captureOnCommitCallbacks(execute=True):
+                website = WebsiteFactory()
+                with transaction.atomic():
+                    committed = WebsiteFactory()
+                try:
+                    with transaction.atomic():
+                        WebsiteFactory()
+                        raise ValueError()
+                except ValueError:
+                    pass
+
+        # The operations made before the rolled back savepoint are still sent
+        self.assertEqual(
+            sorted(
+                record["objectID"]
+                for (records,), _ in mocked_save_objects.call_args_list
+                for record in records
+            ),
+            sorted([website.pk, committed.pk]),
+        )
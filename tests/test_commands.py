@@ -1,6 +1,10 @@
+import threading
+
 from django.test import TestCase
+from mock import patch
 from six import StringIO
 from django.core.management import call_command
+from django.core.management.base import CommandError
 
 from algoliasearch_django import algolia_engine
 from algoliasearch_django import get_adapter
@@ -159,3 +163,74 @@ class CommandsTestCase(TestCase):
             self.assertNotRegex(result, regex)
         except AttributeError:
             self.assertNotRegexpMatches(result, regex)
+
+
+@patch("algoliasearch_django.management.commands.algolia_reindex.reindex_all")
+class ConcurrentReindexTestCase(TestCase):
+    def setUp(self):
+        self.out = StringIO()
+        self.err = StringIO()
+
+    def test_jobs(self, mocked_reindex_all):
+        # Both models must be reindexed at the same time to pass the barrier
+        barrier = threading.Barrier(2, timeout=5)
+
+        def reindex_all(model, **kwargs):
+            barrier.wait()
+            return {Website: 3, User: 4}[model]
+
+        mocked_reindex_all.side_effect = reindex_all
+        call_command(
+            "algolia_reindex",
+            stdout=self.out,
+            model=["Website", "User"],
+            jobs=2,
+        )
+        result = self.out.getvalue()
+
+        self.assertRegex(result, r"Website --> 3")
+        self.assertRegex(result, r"User --> 4")
+        self.assertRegex(result, r"Reindexed 7 records of 2 models")
+
+    def test_failure_is_isolated(self, mocked_reindex_all):
+        def reindex_all(model, **kwargs):
+            if model is Website:
+                raise ValueError("Invalid record")
+            return 4
+
+        mocked_reindex_all.side_effect = reindex_all
+        with self.assertRaisesRegex(CommandError, "Failed to reindex Website"):
+            call_command(
+                "algolia_reindex",
+                stdout=self.out,
+                stderr=self.err,
+                model=["Website", "User"],
+                jobs=2,
+            )
+
+        self.assertRegex(self.out.getvalue(), r"User --> 4")
+        self.assertRegex(self.out.getvalue(), r"Reindexed 4 records of 1 models")
+        self.assertRegex(self.err.getvalue(), r"Website --> FAILED: Invalid record")
+
+    def test_logged_failure(self, mocked_reindex_all):
+        mocked_reindex_all.return_value = None
+
+        with self.assertRaisesRegex(CommandError, "Failed to reindex Website"):
+            call_command(
+                "algolia_reindex", stdout=self.out, stderr=self.err, model=["Website"]
+            )
+
+    def test_jobs_and_processes(self, mocked_reindex_all):
+        with self.assertRaises(CommandError):
+            call_command("algolia_reindex", stdout=self.out, jobs=2, processes=2)
+        mocked_reindex_all.assert_not_called()
+
+    def test_batch_bytes(self, mocked_reindex_all):
+        mocked_reindex_all.return_value = 3
+
+        call_command(
+            "algolia_reindex", stdout=self.out, model=["Website"], batch_bytes=1000
+        )
+
+        _, kwargs = mocked_reindex_all.call_args
+        self.assertEqual(kwargs["batch_bytes"], 1000)
@@ -0,0 +1,59 @@
+from mock import MagicMock
+
+from django.test import TestCase
+
+from algoliasearch_django.diff import (
+    IndexSnapshot,
+    content_hash,
+    format_hash,
+    parse_hash,
+    snapshot_index,
+)
+
+
+class ContentHashTestCase(TestCase):
+    def test_content_hash(self):
+        value = content_hash({"objectID": 1, "name": "Algolia"})
+
+        self.assertEqual(value, content_hash({"name": "Algolia", "objectID": 1}))
+        self.assertNotEqual(value, content_hash({"objectID": 1, "name": "Django"}))
+        self.assertLess(value, 2**64)
+        self.assertEqual(parse_hash(format_hash(value)), value)
+
+    def test_parse_invalid_hash(self):
+        self.assertEqual(parse_hash(None), 0)
+        self.assertEqual(parse_hash("not a hash"), 0)
+
+
+class IndexSnapshotTestCase(TestCase):
+    def test_match(self):
+        snapshot = IndexSnapshot(["3", "1", "2"], [30, 10, 20])
+
+        self.assertEqual(snapshot.object_ids, ["1", "2", "3"])
+        self.assertEqual(list(snapshot.hashes), [10, 20, 30])
+        self.assertTrue(snapshot.match(1, 10))
+        self.assertFalse(snapshot.match(2, 21))
+        self.assertFalse(snapshot.match(4, 40))
+        self.assertEqual(list(snapshot.orphans()), ["3"])
+
+    def test_snapshot_index(self):
+        client = MagicMock()
+
+        def browse_objects(index_name, aggregator, browse_params):
+            hits = [
+                {"objectID": "2", "_contentHash": format_hash(20)},
+                {"objectID": "1"},
+            ]
+            aggregator(
+                MagicMock(hits=[MagicMock(to_dict=lambda hit=hit: hit) for hit in hits])
+            )
+
+        client.browse_objects.side_effect = browse_objects
+        snapshot = snapshot_index(client, "index", "_contentHash")
+
+        (index_name, _, browse_params), _ = client.browse_objects.call_args
+        self.assertEqual(index_name, "index")
+        self.assertEqual(browse_params["attributesToRetrieve"], ["_contentHash"])
+        self.assertEqual(len(snapshot), 2)
+        self.assertTrue(snapshot.match("2", 20))
+        self.assertFalse(snapshot.match("1", content_hash({"objectID": "1"})))
@@ -0,0 +1,172 @@
+import threading
+
+from mock import patch
+
+from django.conf import settings
+from django.test import TestCase
+
+from algoliasearch_django import algolia_engine
+from algoliasearch_django import AlgoliaEngine
+from algoliasearch_django.buffer import SAVE
+from algoliasearch_django.dispatcher import Dispatcher
+from algoliasearch_django.registration import AlgoliaEngineError
+
+from .factories import WebsiteFactory
+from .models import Website
+
+
+class DispatcherTestCase(TestCase):
+    def setUp(self):
+        self.engine = AlgoliaEngine()
+        self.engine.register(Website, auto_indexing=False)
+        self.adapter = self.engine.get_adapter(Website)
+
+    def tearDown(self):
+        self.engine.unregister(Website)
+
+    def operation(self, object_id, name="Algolia"):
+        return self.adapter, SAVE, {"objectID": object_id, "name": name}
+
+    def test_merge_queued_operations(self):
+        dispatcher = Dispatcher(workers=1)
+        for object_id in (1, 2, 1):
+            dispatcher._queues[0].put(self.operation(object_id, str(object_id)))
+
+        with patch.object(self.adapter, "save_objects") as mocked_save_objects:
+            dispatcher._ensure_started()
+            dispatcher.join()
+            dispatcher.shutdown()
+
+        mocked_save_objects.assert_called_once()
+        (records,), _ = mocked_save_objects.call_args
+        self.assertEqual(
+            sorted(record["objectID"] for record in records),
+            [1, 2],
+        )
+
+    def test_close_connections(self):
+        dispatcher = Dispatcher(workers=1)
+        dispatcher._queues[0].put(self.operation(1))
+
+        with patch("algoliasearch_django.dispatcher.close_old_connections") as mocked:
+            with patch.object(self.adapter, "save_objects"):
+                dispatcher._ensure_started()
+                dispatcher.join()
+                dispatcher.shutdown()
+
+        # Before and after sending the operation, then the stop
+        self.assertEqual(mocked.call_count, 4)
+
+    def test_backpressure_inline(self):
+        dispatcher = Dispatcher(workers=1, queue_size=1, backpressure="inline")
+        dispatcher._queues[0].put(self.operation(1))
+
+        with patch.object(self.adapter, "save_objects") as mocked_save_objects:
+            dispatcher._put(dispatcher._queues[0], self.operation(2))
+
+        mocked_save_objects.assert_called_once_with(
+            [{"objectID": 2, "name": "Algolia"}], raise_exceptions=False
+        )
+        self.assertEqual(dispatcher._queues[0].qsize(), 1)
+
+    def test_backpressure_inline_after_same_record(self):
+        dispatcher = Dispatcher(workers=1, queue_size=1, backpressure="inline")
+        dispatcher._put(dispatcher._queues[0], self.operation(1, "Old"))
+
+        with patch.object(self.adapter, "save_objects") as mocked_save_objects:
+            # Queued behind the operation on the same record, not sent inline
+            timer = threading.Timer(0.1, dispatcher._ensure_started)
+            timer.start()
+            dispatcher._put(dispatcher._queues[0], self.operation(1, "New"))
+            dispatcher.join()
+            dispatcher.shutdown()
+            timer.join()
+
+        sent = [
+            record["name"]
+            for (records,), _ in mocked_save_objects.call_args_list
+            for record in records
+        ]
+        self.assertEqual(sent[-1], "New")
+        self.assertEqual(dispatcher._pending, {})
+
+    def test_backpressure_drop_oldest(self):
+        dispatcher = Dispatcher(workers=1, queue_size=1, backpressure="drop_oldest")
+        dispatcher._queues[0].put(self.operation(1))
+
+        with self.assertLogs("algoliasearch_django.dispatcher", level="WARNING"):
+            dispatcher._put(dispatcher._queues[0], self.operation(2))
+
+        _, _, record = dispatcher._queues[0].get_nowait()
+        self.assertEqual(record["objectID"], 2)
+
+    def test_invalid_backpressure(self):
+        with self.assertRaises(ValueError):
+            Dispatcher(backpressure="wait")
+
+    def test_shutdown_sends_queued_operations(self):
+        dispatcher = Dispatcher(workers=2)
+
+        with patch.object(self.adapter, "save_objects") as mocked_save_objects:
+            for object_id in range(10):
+                dispatcher._ensure_started()
+                dispatcher._put(
+                    dispatcher._queues[object_id % 2], self.operation(object_id)
+                )
+            dispatcher.shutdown()
+
+        sent = [
+            record["objectID"]
+            for (records,), _ in mocked_save_objects.call_args_list
+            for record in records
+        ]
+        self.assertEqual(sorted(sent), list(range(10)))
+
+        # Once stopped, operations are sent inline
+        with patch.object(self.adapter, "save_objects") as mocked_save_objects:
+            dispatcher.save(self.adapter, Website(id=11, name="Algolia"))
+        mocked_save_objects.assert_called_once()
+
+
+@patch.object(algolia_engine, "save_record")
+class AsyncIndexingTestCase(TestCase):
+    def setUp(self):
+        self.engine = AlgoliaEngine(
+            settings=dict(settings.ALGOLIA, ASYNC_INDEXING=True, ASYNC_WORKERS=2)
+        )
+        self.engine.register(Website)
+        self.adapter = self.engine.get_adapter(Website)
+
+    def tearDown(self):
+        self.engine.unregister(Website)
+        self.engine.dispatcher.shutdown()  # pyright: ignore
+
+    def test_save_signal(self, _):
+        with patch.object(self.adapter, "save_objects") as mocked_save_objects:
+            websites = WebsiteFactory.create_batch(3)
+            self.engine.dispatcher.join()  # pyright: ignore
+
+        sent = [
+            record["objectID"]
+            for (records,), _ in mocked_save_objects.call_args_list
+            for record in records
+        ]
+        self.assertEqual(sorted(sent), sorted(website.pk for website in websites))
+
+    def test_shutdown(self, _):
+        self.engine.shutdown()
+
+        # Once stopped, operations are sent inline
+        with patch.object(self.adapter, "save_objects") as mocked_save_objects:
+            website = WebsiteFactory.create()
+        mocked_save_objects.assert_called_once()
+        (records,), _ = mocked_save_objects.call_args
+        self.assertEqual([record["objectID"] for record in records], [website.pk])
+
+    def test_invalid_backpressure(self, _):
+        with self.assertRaises(AlgoliaEngineError):
+            AlgoliaEngine(
+                settings=dict(
+                    settings.ALGOLIA, ASYNC_INDEXING=True, ASYNC_BACKPRESSURE="wait"
+                )
+            )
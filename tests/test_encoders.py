@@ -0,0 +1,110 @@
+import datetime
+import decimal
+import json
+import unittest
+import uuid
+
+from django.conf import settings
+from django.test import TestCase
+from django.utils.translation import gettext_lazy
+from mock import MagicMock
+
+from algoliasearch_django import AlgoliaIndex
+from algoliasearch_django import encoders
+
+from .models import Website
+
+
+RECORD = {
+    "objectID": 1,
+    "price": decimal.Decimal("12.50"),
+    "created": datetime.datetime(2024, 1, 2, 3, 4, 5, 123456),
+    "day": datetime.date(2024, 1, 2),
+    "uid": uuid.UUID(int=1),
+    "label": gettext_lazy("Example"),
+    "tags": ("a", "b"),
+}
+
+NORMALIZED = {
+    "objectID": 1,
+    "price": 12.5,
+    "created": "2024-01-02T03:04:05.123456",
+    "day": "2024-01-02",
+    "uid": "00000000-0000-0000-0000-000000000001",
+    "label": "Example",
+    "tags": ["a", "b"],
+}
+
+
+class CustomEncoder(encoders.JSONRecordEncoder):
+    def __init__(self, option=None):
+        self.option = option
+
+
+class GetEncoderTestCase(TestCase):
+    def test_default(self):
+        encoder = encoders.get_encoder({})
+
+        if encoders.orjson is None:
+            self.assertIsInstance(encoder, encoders.JSONRecordEncoder)
+        else:
+            self.assertIsInstance(encoder, encoders.OrjsonRecordEncoder)
+
+    def test_custom(self):
+        encoder = encoders.get_encoder(
+            {
+                "RECORD_ENCODER": "tests.test_encoders.CustomEncoder",
+                "RECORD_ENCODER_OPTIONS": {"option": 1},
+            }
+        )
+
+        self.assertIsInstance(encoder, CustomEncoder)
+        self.assertEqual(encoder.option, 1)
+
+
+class JSONRecordEncoderTestCase(TestCase):
+    encoder_cls = encoders.JSONRecordEncoder
+
+    def test_normalize(self):
+        self.assertEqual(self.encoder_cls().normalize([RECORD]), [NORMALIZED])
+
+    def test_normalize_json_records(self):
+        records = [{"objectID": 1, "name": "Algolia", "tags": ["a"], "score": 1.5}]
+
+        # Records holding only JSON types are not encoded again
+        self.assertIs(self.encoder_cls().normalize(records), records)
+
+    def test_normalize_non_str_keys(self):
+        self.assertEqual(
+            self.encoder_cls().normalize([{"objectID": 1, "counts": {1: 2}}]),
+            [{"objectID": 1, "counts": {"1": 2}}],
+        )
+
+    def test_encode(self):
+        payload = self.encoder_cls().encode([RECORD, {"name": "é"}])
+
+        self.assertIsInstance(payload, bytes)
+        self.assertEqual(json.loads(payload), [NORMALIZED, {"name": "é"}])
+
+    def test_unsupported_type(self):
+        with self.assertRaises(TypeError):
+            self.encoder_cls().encode([{"objectID": 1, "value": object()}])
+
+
+class IndexEncodingTestCase(TestCase):
+    def test_normalize_before_write(self):
+        client = MagicMock()
+        index = AlgoliaIndex(Website, client, settings.ALGOLIA)
+
+        index.save_objects([RECORD])
+        index.partial_update_objects([RECORD])
+
+        _, kwargs = client.save_objects.call_args
+        self.assertEqual(kwargs["objects"], [NORMALIZED])
+        _, kwargs = client.partial_update_objects.call_args
+        self.assertEqual(kwargs["objects"], [NORMALIZED])
+
+
+@unittest.skipIf(encoders.orjson is None, "orjson is not installed")
+class OrjsonRecordEncoderTestCase(JSONRecordEncoderTestCase):
+    encoder_cls = encoders.OrjsonRecordEncoder
@@ -0,0 +1,135 @@
+from mock import MagicMock
+
+from django.conf import settings
+from django.test import TestCase
+
+from algoliasearch_django import AlgoliaIndex
+from algoliasearch_django.fingerprints import CacheFingerprintStore
+from algoliasearch_django.fingerprints import LocMemFingerprintStore
+from algoliasearch_django.fingerprints import fingerprint
+
+from .models import Website
+
+
+class FingerprintTestCase(TestCase):
+    def test_stable(self):
+        self.assertEqual(
+            fingerprint({"objectID": 1, "name": "Algolia", "tags": ["a"]}),
+            fingerprint({"tags": ["a"], "name": "Algolia", "objectID": 1}),
+        )
+        self.assertNotEqual(
+            fingerprint({"objectID": 1, "name": "Algolia"}),
+            fingerprint({"objectID": 1, "name": "Algolia "}),
+        )
+
+
+class LocMemFingerprintStoreTestCase(TestCase):
+    def test_lru(self):
+        store = LocMemFingerprintStore("index", max_size=2)
+        store.set_many({1: "a", 2: "b"})
+        store.get_many([1])
+        store.set_many({3: "c"})
+
+        self.assertEqual(store.get_many([1, 2, 3]), {1: "a", 3: "c"})
+
+    def test_delete_and_clear(self):
+        store = LocMemFingerprintStore("index")
+        store.set_many({1: "a", 2: "b"})
+        store.delete_many([1])
+        self.assertEqual(store.get_many([1, 2]), {2: "b"})
+
+        store.clear()
+        self.assertEqual(store.get_many([1, 2]), {})
+
+
+class CacheFingerprintStoreTestCase(TestCase):
+    def test_cache(self):
+        store = CacheFingerprintStore("index")
+        other = CacheFingerprintStore("other_index")
+        store.clear()
+        store.set_many({1: "a", "a b/c": "b"})
+
+        self.assertEqual(store.get_many([1, "a b/c", 3]), {1: "a", "a b/c": "b"})
+        self.assertEqual(other.get_many([1]), {})
+
+        store.delete_many([1])
+        self.assertEqual(store.get_many([1, "a b/c"]), {"a b/c": "b"})
+
+        store.clear()
+        self.assertEqual(store.get_many(["a b/c"]), {})
+
+
+class WebsiteIndex(AlgoliaIndex):
+    fields = ("name", "url")
+
+
+class IndexFingerprintTestCase(TestCase):
+    def setUp(self):
+        self.client = MagicMock()
+        algolia_settings = dict(
+            settings.ALGOLIA,
+            FINGERPRINT_STORE="algoliasearch_django.fingerprints.LocMemFingerprintStore",
+        )
+        self.index = WebsiteIndex(Website, self.client, algolia_settings)
+        self.website = Website(id=1, name="Algolia", url="https://algolia.com")
+
+    def test_skip_unchanged_save(self):
+        self.index.save_record(self.website)
+        self.index.save_record(self.website)
+        self.assertEqual(self.client.save_objects.call_count, 1)
+
+        self.website.name = "Algolia Search"
+        self.index.save_record(self.website)
+        self.assertEqual(self.client.save_objects.call_count, 2)
+
+    def test_delete(self):
+        self.index.save_record(self.website)
+        self.index.delete()
+
+        # The index is refilled, unchanged records included
+        self.index.save_record(self.website)
+        self.assertEqual(self.client.save_objects.call_count, 2)
+
+    def test_skip_unchanged_save_objects(self):
+        self.index.save_record(self.website)
+        other = Website(id=2, name="Other", url="https://example.org")
+
+        self.index.save_objects(
+            [self.index.get_raw_record(self.website), self.index.get_raw_record(other)]
+        )
+
+        _, kwargs = self.client.save_objects.call_args
+        self.assertEqual([obj["objectID"] for obj in kwargs["objects"]], [2])
+
+    def test_skip_empty_partial_update(self):
+        self.index.save_record(self.website, update_fields=["is_online"])
+        self.client.partial_update_objects.assert_not_called()
+
+        self.index.save_record(self.website, update_fields=["is_online", "name"])
+        self.client.partial_update_objects.assert_called_once()
+
+    def test_partial_update_invalidates(self):
+        self.index.save_record(self.website)
+        self.index.save_record(self.website, update_fields=["name"])
+        self.index.save_record(self.website)
+        self.assertEqual(self.client.save_objects.call_count, 2)
+
+    def test_delete_invalidates(self):
+        self.index.save_record(self.website)
+        self.index.delete_record(self.website)
+        self.index.save_record(self.website)
+        self.assertEqual(self.client.save_objects.call_count, 2)
+
+    def test_failed_save_not_remembered(self):
+        self.client.save_objects.side_effect = [Exception("Unreachable"), MagicMock()]
+        with self.assertRaises(Exception):
+            self.index.save_record(self.website)
+
+        self.index.save_record(self.website)
+        self.assertEqual(self.client.save_objects.call_count, 2)
+
+    def test_disabled(self):
+        index = WebsiteIndex(Website, self.client, settings.ALGOLIA)
+        index.save_record(self.website)
+        index.save_record(self.website)
+        self.assertEqual(self.client.save_objects.call_count, 2)
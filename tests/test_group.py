@@ -0,0 +1,212 @@
+from algoliasearch.search.models.operation_type import OperationType
+from mock import patch
+
+from django.conf import settings
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from algoliasearch_django import AlgoliaEngine
+from algoliasearch_django import AlgoliaIndex
+from algoliasearch_django import AlgoliaIndexGroup
+from algoliasearch_django import algolia_engine
+from algoliasearch_django.buffer import DELETE, SAVE, IndexingBuffer
+from algoliasearch_django.registration import RegistrationError
+
+from .factories import UserFactory
+from .models import User
+from .test_reindex import operations, reindex_client
+
+
+class UserEnIndex(AlgoliaIndex):
+    index_name = "User_en"
+    fields = ("name", "permissions")
+    geo_field = "location"
+
+
+class UserFrIndex(AlgoliaIndex):
+    index_name = "User_fr"
+    fields = ("username", "permissions")
+    geo_field = "location"
+    should_index = "is_followed"
+
+
+class UserIndexWithoutFilter(UserFrIndex):
+    index_name = "User_fr_all"
+    should_index = None
+
+
+class UserByUsernameIndex(AlgoliaIndex):
+    index_name = "User_by_username"
+    custom_objectID = "username"
+
+
+class GroupRegistrationTestCase(TestCase):
+    def setUp(self):
+        self.engine = AlgoliaEngine()
+
+    def tearDown(self):
+        for model in self.engine.get_registered_models():
+            self.engine.unregister(model)
+
+    def test_register_several_indices(self):
+        self.engine.register(User, UserEnIndex)
+        self.assertIsInstance(self.engine.get_adapter(User), UserEnIndex)
+
+        self.engine.register(User, UserIndexWithoutFilter)
+        adapter = self.engine.get_adapter(User)
+
+        self.assertIsInstance(adapter, AlgoliaIndexGroup)
+        self.assertEqual(
+            [type(index) for index in adapter.indices],
+            [UserEnIndex, UserIndexWithoutFilter],
+        )
+        self.assertEqual(self.engine.get_registered_models(), [User])
+
+    def test_register_same_index_name(self):
+        self.engine.register(User, UserEnIndex)
+
+        with self.assertRaises(RegistrationError):
+            self.engine.register(User, UserEnIndex)
+
+    def test_register_other_objectID(self):
+        self.engine.register(User, UserEnIndex)
+
+        with self.assertRaises(RegistrationError):
+            self.engine.register(User, UserByUsernameIndex)
+
+    def test_register_failure_not_tracked(self):
+        class UserTrackedByUsernameIndex(UserByUsernameIndex):
+            track_changes = True
+
+        self.engine.register(User, UserEnIndex)
+        with self.assertRaises(RegistrationError):
+            self.engine.register(User, UserTrackedByUsernameIndex)
+
+        with patch("algoliasearch_django.tracking.take_snapshot") as mocked:
+            User(name="Algolia")
+        mocked.assert_not_called()
+
+
+class GroupTestCase(TestCase):
+    def setUp(self):
+        self.client = reindex_client()
+        with patch.object(algolia_engine, "save_record"):
+            self.followed = UserFactory(followers_count=1)
+            self.unfollowed = UserFactory()
+
+    def build_group(self, *index_classes):
+        group = AlgoliaIndexGroup(
+            User,
+            [
+                index_cls(User, self.client, settings.ALGOLIA)
+                for index_cls in index_classes
+            ],
+        )
+        self.en, self.fr = [index.index_name for index in group.indices]
+        return group
+
+    def sent(self, index_name):
+        return [
+            obj["objectID"]
+            for _, kwargs in self.client.save_objects.call_args_list
+            if kwargs["index_name"] == index_name
+            for obj in kwargs["objects"]
+        ]
+
+    def test_save_record(self):
+        with patch.object(
+            User, "permissions", autospec=True, return_value=["admin"]
+        ) as mocked_permissions:
+            group = self.build_group(UserEnIndex, UserFrIndex)
+            group.save_record(self.followed)
+
+        # The shared field is computed once for both indices
+        mocked_permissions.assert_called_once_with(self.followed)
+        self.assertEqual(self.sent(self.en), [self.followed.pk])
+        self.assertEqual(self.sent(self.fr), [self.followed.pk])
+        _, kwargs = self.client.save_objects.call_args
+        self.assertEqual(kwargs["objects"][0]["permissions"], ["admin"])
+
+    def test_save_record_not_indexed(self):
+        group = self.build_group(UserEnIndex, UserFrIndex)
+
+        group.save_record(self.unfollowed)
+
+        self.assertEqual(self.sent(self.en), [self.unfollowed.pk])
+        _, kwargs = self.client.delete_objects.call_args
+        self.assertEqual(kwargs["index_name"], self.fr)
+
+    def test_buffer(self):
+        group = self.build_group(UserEnIndex, UserFrIndex)
+        buffer = IndexingBuffer()
+
+        buffer.save(group, self.unfollowed)
+        buffer.delete(group, self.followed)
+
+        self.assertEqual(
+            [
+                (index.index_name, action, record["objectID"])
+                for index, action, record in buffer
+            ],
+            [
+                (self.en, SAVE, self.unfollowed.pk),
+                (self.fr, DELETE, self.unfollowed.pk),
+                (self.en, DELETE, self.followed.pk),
+                (self.fr, DELETE, self.followed.pk),
+            ],
+        )
+
+    def test_reindex_all(self):
+        group = self.build_group(UserEnIndex, UserFrIndex)
+
+        with CaptureQueriesContext(connection) as queries:
+            counts = group.reindex_all()
+
+        # The users are read once for both indices
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(counts, 3)
+        en_tmp, fr_tmp = [index.tmp_index_name for index in group.indices]
+        self.assertEqual(self.sent(en_tmp), [self.followed.pk, self.unfollowed.pk])
+        self.assertEqual(self.sent(fr_tmp), [self.followed.pk])
+        self.assertEqual(
+            sorted(
+                index_name
+                for index_name, _ in operations(self.client, OperationType.MOVE)
+            ),
+            sorted([en_tmp, fr_tmp]),
+        )
+
+    def test_reindex_all_failure(self):
+        group = self.build_group(UserEnIndex, UserFrIndex)
+
+        with patch.object(
+            UserFrIndex, "get_raw_record", side_effect=ValueError("Invalid record")
+        ):
+            with self.assertRaises(ValueError):
+                group.reindex_all()
+
+        self.assertEqual(operations(self.client, OperationType.MOVE), [])
+
+    def test_reindex_all_in_turn(self):
+        class UserQuerySetIndex(UserFrIndex):
+            def get_queryset(self):
+                return User.objects.filter(followers_count__gt=0)
+
+        group = self.build_group(UserEnIndex, UserQuerySetIndex)
+
+        with CaptureQueriesContext(connection) as queries:
+            counts = group.reindex_all()
+
+        # The indices read different instances
+        self.assertEqual(len(queries), 2)
+        self.assertEqual(counts, 3)
+
+    def test_raw_search(self):
+        self.client.search_single_index.return_value.to_dict.return_value = {"hits": []}
+        group = self.build_group(UserEnIndex, UserFrIndex)
+
+        self.assertEqual(
+            group.raw_search("Algolia"),
+            {self.en: {"hits": []}, self.fr: {"hits": []}},
+        )
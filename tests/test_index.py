@@ -531,6 +531,23 @@ class IndexTestCase(TestCase):
         self.assertNotIn("_tags", obj)
         self.assertEqual(len(obj), 4)
 
+    def test_fields_with_methods_and_properties(self):
+        class UserIndex(AlgoliaIndex):
+            fields = ("name", "location", ("reverse_username", "login"), "permissions")
+
+        self.index = UserIndex(User, self.client, settings.ALGOLIA)
+        obj = self.index.get_raw_record(self.user)
+        self.assertEqual(
+            obj,
+            {
+                "objectID": self.user.pk,
+                "name": self.user.name,
+                "location": (123, -42.24),
+                "login": self.user.username[::-1],
+                "permissions": ["read", "write", "admin"],
+            },
+        )
+
     def test_invalid_fields(self):
         class UserIndex(AlgoliaIndex):
             fields = ("name", "color")
@@ -0,0 +1,194 @@
+from mock import patch
+
+from django.db.models import F
+from django.test import TestCase
+
+from algoliasearch_django import AlgoliaIndex
+from algoliasearch_django import algolia_engine
+from algoliasearch_django.decorators import disable_auto_indexing
+from algoliasearch_django.managers import AlgoliaQuerySet
+from algoliasearch_django.outbox.models import AlgoliaOutbox
+
+from .models import Store
+
+
+class StoreIndex(AlgoliaIndex):
+    fields = ("name", "visits")
+
+
+class OpenStoreIndex(StoreIndex):
+    should_index = "is_open"
+
+
+def sent(mocked):
+    return sorted(
+        (record for (records,), _ in mocked.call_args_list for record in records),
+        key=lambda record: (
+            record if not isinstance(record, dict) else record["objectID"]
+        ),
+    )
+
+
+class AlgoliaQuerySetTestCase(TestCase):
+    index_cls = StoreIndex
+
+    def setUp(self):
+        algolia_engine.register(Store, self.index_cls, auto_indexing=False)
+        self.adapter = algolia_engine.get_adapter(Store)
+
+    def tearDown(self):
+        algolia_engine.unregister(Store)
+
+    def create_stores(self, count=3):
+        with patch.object(self.adapter, "save_objects"):
+            return Store.objects.bulk_create(
+                [Store(name="Store {}".format(i)) for i in range(count)]
+            )
+
+    def test_bulk_create(self):
+        with patch.object(self.adapter, "save_objects") as mocked_save_objects:
+            stores = Store.objects.bulk_create(
+                [Store(name="Store {}".format(i)) for i in range(5)], batch_size=2
+            )
+
+        self.assertEqual(mocked_save_objects.call_count, 3)
+        self.assertEqual(
+            sent(mocked_save_objects),
+            [
+                {"objectID": store.pk, "name": store.name, "visits": 0}
+                for store in stores
+            ],
+        )
+
+    def test_bulk_update(self):
+        stores = self.create_stores()
+        for store in stores:
+            store.visits = 10
+
+        with patch.object(
+            self.adapter, "partial_update_objects"
+        ) as mocked_partial_update_objects:
+            Store.objects.bulk_update(stores, ["visits"])
+
+        self.assertEqual(
+            sent(mocked_partial_update_objects),
+            [{"objectID": store.pk, "visits": 10} for store in stores],
+        )
+
+    def test_update(self):
+        stores = self.create_stores()
+
+        with patch.object(
+            self.adapter, "partial_update_objects"
+        ) as mocked_partial_update_objects:
+            rows = Store.objects.filter(name__in=["Store 0", "Store 1"]).update(
+                name="Renamed"
+            )
+
+        self.assertEqual(rows, 2)
+        self.assertEqual(
+            sent(mocked_partial_update_objects),
+            [{"objectID": store.pk, "name": "Renamed"} for store in stores[:2]],
+        )
+
+    def test_update_chunks(self):
+        stores = self.create_stores()
+
+        with patch.object(AlgoliaQuerySet, "default_batch_size", 2):
+            with patch.object(
+                self.adapter, "partial_update_objects"
+            ) as mocked_partial_update_objects:
+                rows = Store.objects.update(name="Renamed")
+
+        self.assertEqual(rows, 3)
+        self.assertEqual(
+            [
+                [record["objectID"] for record in objects]
+                for (objects,), _ in mocked_partial_update_objects.call_args_list
+            ],
+            [[stores[0].pk, stores[1].pk], [stores[2].pk]],
+        )
+
+    def test_update_expression(self):
+        stores = self.create_stores()
+
+        with patch.object(
+            self.adapter, "partial_update_objects"
+        ) as mocked_partial_update_objects:
+            Store.objects.update(visits=F("visits") + 2)
+
+        self.assertEqual(
+            sent(mocked_partial_update_objects),
+            [{"objectID": store.pk, "visits": 2} for store in stores],
+        )
+
+    def test_delete(self):
+        stores = self.create_stores()
+
+        with patch.object(self.adapter, "delete_objects") as mocked_delete_objects:
+            Store.objects.filter(pk__in=[stores[0].pk, stores[1].pk]).delete()
+
+        mocked_delete_objects.assert_called_once()
+        self.assertEqual(sent(mocked_delete_objects), [stores[0].pk, stores[1].pk])
+        self.assertEqual(Store.objects.count(), 1)
+
+    def test_delete_chunks(self):
+        stores = self.create_stores()
+
+        with patch.object(AlgoliaQuerySet, "default_batch_size", 2):
+            with patch.object(self.adapter, "delete_objects") as mocked_delete_objects:
+                with disable_auto_indexing(Store):
+                    Store.objects.all().delete()
+
+        self.assertEqual(
+            [objects for (objects,), _ in mocked_delete_objects.call_args_list],
+            [[stores[0].pk, stores[1].pk], [stores[2].pk]],
+        )
+
+    def test_delete_outbox(self):
+        stores = self.create_stores(2)
+        algolia_engine.unregister(Store)
+        algolia_engine.register(Store, self.index_cls)
+
+        # The deletions are enqueued by pre_delete, and not sent again
+        with patch.object(algolia_engine, "_AlgoliaEngine__outbox", True):
+            with patch.object(self.adapter, "delete_objects") as mocked_delete_objects:
+                Store.objects.all().delete()
+
+        mocked_delete_objects.assert_not_called()
+        self.assertEqual(
+            sorted(AlgoliaOutbox.objects.values_list("object_id", flat=True)),
+            [store.pk for store in stores],
+        )
+
+    def test_not_registered(self):
+        algolia_engine.unregister(Store)
+        try:
+            with patch.object(self.adapter, "save_objects") as mocked_save_objects:
+                Store.objects.bulk_create([Store(name="Store")])
+            mocked_save_objects.assert_not_called()
+        finally:
+            algolia_engine.register(Store, self.index_cls, auto_indexing=False)
+
+
+class AlgoliaQuerySetShouldIndexTestCase(AlgoliaQuerySetTestCase):
+    index_cls = OpenStoreIndex
+
+    def test_update_should_index(self):
+        stores = self.create_stores()
+
+        with patch.object(self.adapter, "save_objects") as mocked_save_objects:
+            with patch.object(self.adapter, "delete_objects") as mocked_delete_objects:
+                Store.objects.filter(pk=stores[0].pk).update(is_open=False)
+                Store.objects.filter(pk=stores[1].pk).update(visits=1)
+
+        self.assertEqual(sent(mocked_delete_objects), [stores[0].pk])
+        self.assertEqual(
+            sent(mocked_save_objects),
+            [{"objectID": stores[1].pk, "name": "Store 1", "visits": 1}],
+        )
+
+    test_bulk_update = None
+    test_update = None
+    test_update_chunks = None
+    test_update_expression = None
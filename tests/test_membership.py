@@ -0,0 +1,155 @@
+from mock import MagicMock, patch
+
+from django.conf import settings
+from django.test import TestCase
+
+from algoliasearch_django import AlgoliaIndex
+from algoliasearch_django import algolia_engine
+from algoliasearch_django.membership import BloomMembershipStore
+from algoliasearch_django.membership import CacheMembershipStore
+from algoliasearch_django.membership import LocMemMembershipStore
+from algoliasearch_django.membership import MembershipStore
+
+from .factories import WebsiteFactory
+from .models import Website
+from .test_reindex import reindex_client
+
+
+class MembershipStoreTestCase(TestCase):
+    def check_store(self, store, exact=True):
+        # Nothing is known until the store is seeded
+        self.assertTrue(store.might_contain(1))
+        store.add_many([1])
+        self.assertTrue(store.might_contain(2))
+
+        store.seed([1, "a b/c"])
+        self.assertTrue(store.might_contain(1))
+        self.assertTrue(store.might_contain("a b/c"))
+        self.assertFalse(store.might_contain(2))
+
+        store.add_many([2])
+        self.assertTrue(store.might_contain(2))
+        store.discard_many([1])
+        self.assertEqual(store.might_contain(1), not exact)
+
+        store.clear()
+        self.assertTrue(store.might_contain(3))
+
+        # Seeded by batch, the new content is only used once committed
+        store.begin_seed()
+        store.seed_many([1])
+        store.seed_many([2])
+        self.assertTrue(store.might_contain(3))
+        store.commit_seed()
+        self.assertTrue(store.might_contain(1))
+        self.assertTrue(store.might_contain(2))
+        self.assertFalse(store.might_contain(3))
+
+    def test_locmem(self):
+        self.check_store(LocMemMembershipStore("index"))
+
+    def test_bloom(self):
+        self.check_store(BloomMembershipStore("index", capacity=100), exact=False)
+
+    def test_bloom_false_positive_rate(self):
+        store = BloomMembershipStore("index", capacity=1000, error_rate=0.01)
+        store.seed(range(1000))
+
+        false_positives = sum(store.might_contain(i) for i in range(1000, 11000))
+        self.assertLess(false_positives, 300)
+
+    def test_seed_fallback(self):
+        class SeedOnlyStore(LocMemMembershipStore):
+            begin_seed = MembershipStore.begin_seed
+            seed_many = MembershipStore.seed_many
+            commit_seed = MembershipStore.commit_seed
+
+        self.check_store(SeedOnlyStore("index"))
+
+    def test_cache(self):
+        store = CacheMembershipStore("index", batch_size=1)
+        store.clear()
+        self.check_store(store)
+        self.assertTrue(CacheMembershipStore("other_index").might_contain(1))
+
+    def test_cache_purge(self):
+        store = CacheMembershipStore("index")
+        store.clear()
+        store.seed([1, 2])
+        store.add_many([3])
+        keys = store._keys(1, [1, 2, 3])
+        self.assertEqual(len(store.cache.get_many(keys)), 3)
+
+        # The keys of the previous version are deleted
+        store.seed([1])
+        self.assertEqual(store.cache.get_many(keys), {})
+        self.assertTrue(store.might_contain(1))
+
+        store.clear()
+        self.assertEqual(store.cache.get_many(store._keys(2, [1])), {})
+
+
+class WebsiteIndex(AlgoliaIndex):
+    fields = ("name", "url")
+    should_index = "is_online"
+
+
+class IndexMembershipTestCase(TestCase):
+    def setUp(self):
+        self.client = MagicMock()
+        self.algolia_settings = dict(
+            settings.ALGOLIA,
+            MEMBERSHIP_STORE="algoliasearch_django.membership.LocMemMembershipStore",
+        )
+        self.index = WebsiteIndex(Website, self.client, self.algolia_settings)
+        self.website = Website(id=1, name="Algolia", is_online=False)
+
+    def test_delete_unknown_before_seed(self):
+        self.index.save_record(self.website)
+        self.client.delete_objects.assert_called_once()
+
+    def test_skip_delete_after_seed(self):
+        self.index.clear_objects()
+        self.index.save_record(self.website)
+        self.client.delete_objects.assert_not_called()
+
+        self.website.is_online = True
+        self.index.save_record(self.website)
+        self.website.is_online = False
+        self.index.save_record(self.website)
+        self.client.delete_objects.assert_called_once()
+
+        self.index.save_record(self.website)
+        self.client.delete_objects.assert_called_once()
+
+    def test_delete_objects(self):
+        self.index.clear_objects()
+        self.index.save_objects([{"objectID": 1, "name": "Algolia"}])
+        self.index.delete_objects([1, 2])
+
+        _, kwargs = self.client.delete_objects.call_args
+        self.assertEqual(kwargs["object_ids"], [1])
+
+    def test_delete(self):
+        self.index.clear_objects()
+
+        self.index.delete()
+
+        # The records saved again may be anything
+        self.assertTrue(self.index._AlgoliaIndex__membership.might_contain(1))
+
+    def test_reindex_all(self):
+        with patch.object(algolia_engine, "save_record"):
+            online = WebsiteFactory.create_batch(3, is_online=True)
+            offline = WebsiteFactory()
+        index = WebsiteIndex(Website, reindex_client(), self.algolia_settings)
+        store = index._AlgoliaIndex__membership
+
+        with patch.object(store, "seed_many", wraps=store.seed_many) as seed_many:
+            index.reindex_all(batch_size=2)
+
+        # Seeded by batch, not with the objectIDs of the whole table at once
+        self.assertEqual(seed_many.call_count, 2)
+        for website in online:
+            self.assertTrue(store.might_contain(website.pk))
+        self.assertFalse(store.might_contain(offline.pk))
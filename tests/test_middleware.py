@@ -0,0 +1,81 @@
+from asgiref.sync import async_to_sync, sync_to_async
+from mock import patch
+
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase
+
+from algoliasearch_django import algolia_engine
+from algoliasearch_django import get_adapter
+from algoliasearch_django import update_records
+from algoliasearch_django.middleware import BatchIndexingMiddleware
+
+from .factories import WebsiteFactory
+from .models import Website
+
+
+def create_websites(request):
+    WebsiteFactory.create_batch(3)
+    return HttpResponse()
+
+
+class BatchIndexingMiddlewareTestCase(TestCase):
+    def setUp(self):
+        self.request = RequestFactory().get("/")
+        self.adapter = get_adapter(Website)
+
+    def test_sync(self):
+        middleware = BatchIndexingMiddleware(create_websites)
+
+        with patch.object(self.adapter, "save_objects") as mocked_save_objects:
+            middleware(self.request)
+
+        mocked_save_objects.assert_called_once()
+        (records,), _ = mocked_save_objects.call_args
+        self.assertEqual(len(records), 3)
+
+    def test_async(self):
+        async def get_response(request):
+            return await sync_to_async(create_websites)(request)
+
+        middleware = BatchIndexingMiddleware(get_response)
+
+        with patch.object(self.adapter, "save_objects") as mocked_save_objects:
+            async_to_sync(middleware)(self.request)
+
+        mocked_save_objects.assert_called_once()
+        (records,), _ = mocked_save_objects.call_args
+        self.assertEqual(len(records), 3)
+
+
+class CollectTestCase(TestCase):
+    def setUp(self):
+        self.adapter = get_adapter(Website)
+
+    def test_nested(self):
+        with patch.object(self.adapter, "save_objects") as mocked_save_objects:
+            with algolia_engine.collect():
+                WebsiteFactory()
+                with algolia_engine.collect():
+                    WebsiteFactory()
+                mocked_save_objects.assert_not_called()
+
+        mocked_save_objects.assert_called_once()
+        (records,), _ = mocked_save_objects.call_args
+        self.assertEqual(len(records), 2)
+
+    def test_update_records(self):
+        with patch.object(algolia_engine, "save_record"):
+            websites = WebsiteFactory.create_batch(2)
+
+        with patch.object(
+            self.adapter, "partial_update_objects"
+        ) as mocked_partial_update_objects:
+            with algolia_engine.collect():
+                update_records(Website, Website.objects.all(), name="Algolia")
+
+        mocked_partial_update_objects.assert_called_once()
+        (records,), _ = mocked_partial_update_objects.call_args
+        self.assertEqual(
+            sorted(records, key=lambda record: record["objectID"]),
+            [{"objectID": website.pk, "name": "Algolia"} for website in websites],
+        )
@@ -0,0 +1,110 @@
+from io import StringIO
+
+from algoliasearch.http.exceptions import AlgoliaException
+from mock import patch
+
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase
+
+from algoliasearch_django import algolia_engine
+from algoliasearch_django.outbox.models import AlgoliaOutbox
+
+from .models import Ticket, Website
+
+
+class OutboxTestCase(TestCase):
+    def setUp(self):
+        patcher = patch.object(algolia_engine, "_AlgoliaEngine__outbox", True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.adapter = algolia_engine.get_adapter(Website)
+
+    def create_website(self, name="Algolia"):
+        return Website.objects.create(
+            name=name, url="https://algolia.com", is_online=False
+        )
+
+    def test_enqueue(self):
+        with patch.object(self.adapter, "save_record") as mocked:
+            website = self.create_website()
+
+        mocked.assert_not_called()
+        row = AlgoliaOutbox.objects.get()
+        self.assertEqual(row.model, "tests.website")
+        self.assertEqual(row.object_pk, str(website.pk))
+        self.assertEqual(row.object_id, website.pk)
+
+    def test_enqueue_uuid(self):
+        algolia_engine.register(Ticket)
+        self.addCleanup(algolia_engine.unregister, Ticket)
+
+        ticket = Ticket.objects.create(name="Algolia")
+
+        row = AlgoliaOutbox.objects.get()
+        self.assertEqual(row.object_pk, str(ticket.pk))
+        self.assertEqual(row.object_id, str(ticket.pk))
+
+    def test_enqueue_rolled_back(self):
+        with transaction.atomic():
+            sid = transaction.savepoint()
+            self.create_website()
+            transaction.savepoint_rollback(sid)
+
+        self.assertFalse(AlgoliaOutbox.objects.exists())
+
+    def test_drain(self):
+        first = self.create_website()
+        first.name = "Algolia Search"
+        first.save()
+        second = self.create_website("Other")
+        second_pk = second.pk
+        second.delete()
+
+        with patch.object(self.adapter, "save_objects") as mocked_save_objects:
+            with patch.object(self.adapter, "delete_objects") as mocked_delete_objects:
+                self.assertEqual(AlgoliaOutbox.objects.drain(), 4)
+
+        (records,), _ = mocked_save_objects.call_args
+        self.assertEqual(
+            [(record["objectID"], record["name"]) for record in records],
+            [(first.pk, "Algolia Search")],
+        )
+        (object_ids,), _ = mocked_delete_objects.call_args
+        self.assertEqual(object_ids, [second_pk])
+        self.assertFalse(AlgoliaOutbox.objects.exists())
+
+    def test_drain_failure_keeps_rows(self):
+        self.create_website()
+
+        with patch.object(
+            self.adapter.__class__,
+            "save_objects",
+            side_effect=AlgoliaException("Unreachable"),
+        ):
+            with self.assertRaises(AlgoliaException):
+                AlgoliaOutbox.objects.drain()
+
+        self.assertEqual(AlgoliaOutbox.objects.count(), 1)
+
+    def test_drain_unregistered(self):
+        self.create_website()
+        algolia_engine.unregister(Website)
+        try:
+            with self.assertLogs("algoliasearch_django.outbox", level="WARNING"):
+                self.assertEqual(AlgoliaOutbox.objects.drain(), 1)
+        finally:
+            algolia_engine.register(Website, self.adapter.__class__)
+
+        self.assertFalse(AlgoliaOutbox.objects.exists())
+
+    def test_command(self):
+        for i in range(3):
+            self.create_website(str(i))
+        out = StringIO()
+
+        with patch.object(self.adapter, "save_objects") as mocked_save_objects:
+            call_command("algolia_drain_outbox", batchsize=2, stdout=out)
+
+        self.assertEqual(mocked_save_objects.call_count, 2)
+        self.assertIn("Sent 3 operations", out.getvalue())
@@ -0,0 +1,829 @@
+import datetime
+import os
+import shutil
+import tempfile
+import threading
+import tracemalloc
+
+from io import StringIO
+
+from mock import MagicMock, patch
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from algoliasearch.http.exceptions import AlgoliaException, RequestException
+from algoliasearch.search.models.operation_type import OperationType
+from algoliasearch.search.models.scope_type import ScopeType
+
+from algoliasearch_django import AlgoliaIndex
+from algoliasearch_django import diff
+from algoliasearch_django.models import AlgoliaIndexError
+from algoliasearch_django import algolia_engine
+from algoliasearch_django.pipeline import BatchFeed, BatchUploader, reindex_shards
+
+from .factories import UserFactory, WebsiteFactory
+from .models import BlogPost, Category, Store, User, Website
+
+
+class WebsiteIndex(AlgoliaIndex):
+    fields = ("name", "url")
+
+
+def reindex_client():
+    """Returns a mocked client, with an index without settings, rules nor synonyms."""
+    client = MagicMock()
+    client.get_settings.return_value.to_dict.return_value = {}
+    client.save_objects.side_effect = lambda **kwargs: [
+        MagicMock(task_id=kwargs["objects"][0]["objectID"])
+    ]
+    return client
+
+
+def operations(client, operation_type):
+    """Returns the index operations of the given type sent by the client."""
+    return [
+        (index_name, params)
+        for (index_name, params), _ in client.operation_index.call_args_list
+        if params.operation == operation_type
+    ]
+
+
+class BatchUploaderTestCase(TestCase):
+    def test_upload(self):
+        threads = set()
+
+        def upload(batch):
+            threads.add(threading.current_thread().name)
+            return sum(batch)
+
+        uploader = BatchUploader(upload, workers=3)
+        for i in range(10):
+            uploader.put([i, i])
+
+        self.assertEqual(sorted(uploader.close()), [2 * i for i in range(10)])
+        self.assertTrue(all(name.startswith("algolia-uploader-") for name in threads))
+
+    def test_error(self):
+        def upload(batch):
+            raise ValueError(batch)
+
+        uploader = BatchUploader(upload, workers=2)
+        uploader.put([1])
+        with self.assertRaises(ValueError):
+            uploader.close()
+
+
+class PidAdapter(object):
+    def _reindex_shard(self, shard, batch_size, workers, position, batch_bytes):
+        if shard is None:
+            raise ValueError("Invalid shard")
+        if shard == "unavailable":
+            raise RequestException("Service unavailable", 503)
+        return shard, os.getpid()
+
+
+class BatchFeedTestCase(TestCase):
+    def test_feed(self):
+        feed = BatchFeed()
+        consumer = threading.Thread(target=lambda: received.extend(feed))
+        received = []
+        consumer.start()
+
+        for batch in range(5):
+            feed.put(batch)
+        feed.close()
+        consumer.join()
+
+        self.assertEqual(received, [0, 1, 2, 3, 4])
+
+    def test_fail(self):
+        feed = BatchFeed(queue_size=3)
+        feed.put(1)
+        feed.fail(ValueError("Invalid record"))
+
+        batches = iter(feed)
+        self.assertEqual(next(batches), 1)
+        with self.assertRaises(ValueError):
+            next(batches)
+        feed.drain()
+
+    def test_drain(self):
+        feed = BatchFeed(queue_size=1)
+        consumer = threading.Thread(target=feed.drain)
+        consumer.start()
+
+        # The consumer drops the batches, so that put() does not block
+        for batch in range(5):
+            feed.put(batch)
+        feed.close()
+        consumer.join(timeout=5)
+
+        self.assertFalse(consumer.is_alive())
+
+
+class ReindexShardsTestCase(TestCase):
+    def test_processes(self):
+        results = reindex_shards(PidAdapter(), [(None, 5), (5, None)], 10)
+
+        self.assertEqual([shard for shard, _ in results], [(None, 5), (5, None)])
+        self.assertNotIn(os.getpid(), [pid for _, pid in results])
+
+    def test_error(self):
+        with self.assertRaises(ValueError):
+            reindex_shards(PidAdapter(), [(None, 5), None], 10)
+
+    def test_algolia_error(self):
+        with self.assertRaises(AlgoliaException) as cm:
+            reindex_shards(PidAdapter(), [(None, 5), "unavailable"], 10)
+        self.assertIn("Service unavailable", str(cm.exception))
+
+
+class ReindexTestCase(TestCase):
+    def setUp(self):
+        self.client = reindex_client()
+        self.index = WebsiteIndex(Website, self.client, settings.ALGOLIA)
+
+    def create_websites(self, count):
+        with patch.object(algolia_engine, "save_record"):
+            return WebsiteFactory.create_batch(count)
+
+    def test_pipelined_upload(self):
+        websites = self.create_websites(5)
+        calls = []
+        self.client.wait_for_task.side_effect = lambda index_name, task_id: (
+            calls.append(("wait", task_id))
+        )
+
+        def move(index_name, params):
+            if params.operation == OperationType.MOVE:
+                calls.append(("move",))
+            return MagicMock()
+
+        self.client.operation_index.side_effect = move
+
+        counts = self.index.reindex_all(batch_size=2, workers=2)
+
+        self.assertEqual(counts, 5)
+        sent = [
+            obj["objectID"]
+            for _, kwargs in self.client.save_objects.call_args_list
+            for obj in kwargs["objects"]
+        ]
+        self.assertEqual(sorted(sent), [website.pk for website in websites])
+        for _, kwargs in self.client.save_objects.call_args_list:
+            self.assertEqual(kwargs["index_name"], self.index.tmp_index_name)
+            self.assertFalse(kwargs["wait_for_tasks"])
+
+        # All the tasks are waited for before the move
+        move = calls.index(("move",))
+        self.assertEqual(
+            sorted(task_id for _, task_id in calls[:move][-3:]),
+            [websites[0].pk, websites[2].pk, websites[4].pk],
+        )
+
+    def test_upload_error(self):
+        self.create_websites(5)
+        self.client.save_objects.side_effect = ValueError("Invalid record")
+
+        with self.assertRaises(ValueError):
+            self.index.reindex_all(batch_size=1, workers=2)
+        self.assertEqual(operations(self.client, OperationType.MOVE), [])
+
+    def test_shards(self):
+        websites = self.create_websites(10)
+        pks = [website.pk for website in websites]
+
+        shards = self.index._AlgoliaIndex__get_shards(3)
+
+        self.assertEqual(shards, [(None, pks[3]), (pks[3], pks[6]), (pks[6], None)])
+        self.assertEqual(self.index._AlgoliaIndex__get_shards(20)[-1], (pks[9], None))
+        with patch.object(algolia_engine, "delete_record"):
+            Website.objects.all().delete()
+        self.assertEqual(self.index._AlgoliaIndex__get_shards(3), [(None, None)])
+
+    @patch("algoliasearch_django.models.connections")
+    @patch("algoliasearch_django.models.reindex_shards")
+    def test_processes(self, mocked_reindex_shards, mocked_connections):
+        websites = self.create_websites(5)
+        mocked_reindex_shards.side_effect = (
+            lambda adapter, shards, batch_size, workers, batch_bytes: [
+                adapter._reindex_shard(
+                    shard, batch_size, workers, position, batch_bytes
+                )
+                for position, shard in enumerate(shards)
+            ]
+        )
+
+        counts = self.index.reindex_all(batch_size=2, processes=2)
+
+        self.assertEqual(counts, 5)
+        (_, shards, _, _, _), _ = mocked_reindex_shards.call_args
+        self.assertEqual(shards, [(None, websites[2].pk), (websites[2].pk, None)])
+        mocked_connections.close_all.assert_called_once()
+        self.client.close.assert_called_once()
+        sent = [
+            [obj["objectID"] for obj in kwargs["objects"]]
+            for _, kwargs in self.client.save_objects.call_args_list
+        ]
+        pks = [website.pk for website in websites]
+        self.assertEqual(sent, [pks[0:2], pks[2:4], pks[4:5]])
+        self.assertEqual(len(operations(self.client, OperationType.MOVE)), 1)
+
+    @patch("algoliasearch_django.models.reindex_shards")
+    def test_processes_failure(self, mocked_reindex_shards):
+        self.create_websites(5)
+        mocked_reindex_shards.side_effect = ValueError("Invalid record")
+
+        with patch("algoliasearch_django.models.connections"):
+            with self.assertRaises(ValueError):
+                self.index.reindex_all(processes=2)
+        self.assertEqual(operations(self.client, OperationType.MOVE), [])
+
+
+class ConfigurationCopyTestCase(TestCase):
+    def setUp(self):
+        self.client = reindex_client()
+        self.client.get_settings.return_value.to_dict.return_value = {
+            "replicas": ["replica"],
+            "searchableAttributes": ["name"],
+        }
+        self.index = WebsiteIndex(Website, self.client, settings.ALGOLIA)
+
+    def test_copy(self):
+        self.index.reindex_all()
+
+        ((index_name, params),) = operations(self.client, OperationType.COPY)
+        self.assertEqual(index_name, self.index.index_name)
+        self.assertEqual(params.destination, self.index.tmp_index_name)
+        self.assertEqual(
+            params.scope, [ScopeType.SETTINGS, ScopeType.RULES, ScopeType.SYNONYMS]
+        )
+        self.client.browse_rules.assert_not_called()
+        self.client.browse_synonyms.assert_not_called()
+        self.client.save_rules.assert_not_called()
+        self.client.save_synonyms.assert_not_called()
+
+        # The replicas are still removed from the tmp index and restored
+        (tmp_settings_call, settings_call) = self.client.set_settings.call_args_list
+        self.assertEqual(tmp_settings_call[0][0], self.index.tmp_index_name)
+        self.assertEqual(settings_call[0][0], self.index.index_name)
+        self.assertEqual(settings_call[0][1]["replicas"], ["replica"])
+
+    def test_copy_defined_settings(self):
+        class WebsiteSettingsIndex(WebsiteIndex):
+            settings = {"searchableAttributes": ["url"]}
+
+        index = WebsiteSettingsIndex(Website, self.client, settings.ALGOLIA)
+        index.reindex_all()
+
+        # The settings of the class are applied instead of copied
+        ((_, params),) = operations(self.client, OperationType.COPY)
+        self.assertEqual(params.scope, [ScopeType.RULES, ScopeType.SYNONYMS])
+        self.client.set_settings.assert_called_once_with(
+            index.tmp_index_name, {"searchableAttributes": ["url"]}
+        )
+
+    def test_copy_fallback(self):
+        def operation_index(index_name, params):
+            if params.operation == OperationType.COPY:
+                raise RequestException("Method not allowed with this API key", 403)
+            return MagicMock()
+
+        def browse_rules(index_name, aggregator):
+            rule = {"objectID": "rule", "_highlightResult": {}}
+            aggregator(MagicMock(hits=[MagicMock(to_dict=lambda: dict(rule))]))
+
+        self.client.operation_index.side_effect = operation_index
+        self.client.browse_rules.side_effect = browse_rules
+        self.index.reindex_all()
+
+        self.assertEqual(len(operations(self.client, OperationType.MOVE)), 1)
+        self.client.browse_synonyms.assert_called_once()
+        (index_name, rules, _), _ = self.client.save_rules.call_args
+        self.assertEqual(index_name, self.index.index_name)
+        self.assertEqual(rules, [{"objectID": "rule"}])
+        self.client.save_synonyms.assert_not_called()
+
+    def test_missing_index(self):
+        self.client.get_settings.side_effect = RequestException(
+            "Index does not exist", 404
+        )
+
+        self.index.reindex_all()
+
+        self.assertEqual(operations(self.client, OperationType.COPY), [])
+        self.assertEqual(len(operations(self.client, OperationType.MOVE)), 1)
+
+
+class ResumeTestCase(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.algolia_settings = dict(
+            settings.ALGOLIA,
+            STATE_STORE="algoliasearch_django.state.FileStateStore",
+            STATE_STORE_OPTIONS={"path": os.path.join(self.tmp_dir, "state.json")},
+        )
+        self.client = reindex_client()
+        self.index = WebsiteIndex(Website, self.client, self.algolia_settings)
+        with patch.object(algolia_engine, "save_record"):
+            self.websites = WebsiteFactory.create_batch(5)
+        self.pks = [website.pk for website in self.websites]
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def sent(self):
+        return [
+            obj["objectID"]
+            for _, kwargs in self.client.save_objects.call_args_list
+            for obj in kwargs["objects"]
+        ]
+
+    def fail_reindex(self):
+        save_objects = self.client.save_objects.side_effect
+
+        def fail_third_batch(**kwargs):
+            if self.client.save_objects.call_count == 3:
+                raise ValueError("Evicted")
+            return save_objects(**kwargs)
+
+        self.client.save_objects.side_effect = fail_third_batch
+        with self.assertRaises(ValueError):
+            self.index.reindex_all(batch_size=2)
+        self.client.save_objects.side_effect = save_objects
+        self.client.reset_mock()
+
+    def test_resume(self):
+        self.fail_reindex()
+
+        counts = self.index.reindex_all(batch_size=2, resume=True)
+
+        self.assertEqual(counts, 5)
+        self.assertEqual(self.sent(), self.pks[4:])
+        self.client.clear_objects.assert_not_called()
+        self.assertEqual(len(operations(self.client, OperationType.MOVE)), 1)
+
+        # The checkpoint is removed after the move
+        self.client.reset_mock()
+        self.index.reindex_all(batch_size=2, resume=True)
+        self.client.clear_objects.assert_called_once()
+        self.assertEqual(self.sent(), self.pks)
+
+    def test_without_resume(self):
+        self.fail_reindex()
+
+        self.assertEqual(self.index.reindex_all(batch_size=2), 5)
+        self.client.clear_objects.assert_called_once()
+        self.assertEqual(self.sent(), self.pks)
+
+    def test_resume_without_persistent_store(self):
+        # The default cache of the tests is a LocMemCache
+        index = WebsiteIndex(Website, self.client, settings.ALGOLIA)
+
+        with self.assertRaises(AlgoliaIndexError):
+            index.reindex_all(batch_size=2, resume=True)
+        self.client.clear_objects.assert_not_called()
+
+    def test_resume_shards(self):
+        with patch("algoliasearch_django.models.connections"):
+            with patch("algoliasearch_django.models.reindex_shards") as mocked:
+                mocked.side_effect = ValueError("Evicted")
+                with self.assertRaises(ValueError):
+                    self.index.reindex_all(batch_size=2, processes=2)
+        self.client.reset_mock()
+
+        # Without fork, the shards of the failed run are reindexed in turn
+        with patch("algoliasearch_django.models.reindex_shards") as mocked:
+            with patch("algoliasearch_django.models.multiprocessing") as mocked_mp:
+                mocked_mp.get_all_start_methods.return_value = ["spawn"]
+                self.index.reindex_all(batch_size=2, resume=True)
+        mocked.assert_not_called()
+        self.client.clear_objects.assert_not_called()
+        calls = self.client.save_objects.call_args_list
+        self.assertEqual([len(kwargs["objects"]) for _, kwargs in calls], [2, 2, 1])
+        self.assertEqual(self.sent(), self.pks)
+
+
+class DiffReindexTestCase(TestCase):
+    def setUp(self):
+        self.client = reindex_client()
+        self.index = WebsiteIndex(Website, self.client, settings.ALGOLIA)
+        with patch.object(algolia_engine, "save_record"):
+            self.websites = WebsiteFactory.create_batch(3)
+
+    def browse(self, records):
+        """Makes the index hold the given records, with their content hash."""
+        hits = [
+            {
+                "objectID": str(record["objectID"]),
+                "_contentHash": diff.format_hash(diff.content_hash(record)),
+            }
+            for record in records
+        ]
+
+        def browse_objects(index_name, aggregator, browse_params):
+            aggregator(MagicMock(hits=[MagicMock(to_dict=lambda h=h: h) for h in hits]))
+
+        self.client.browse_objects.side_effect = browse_objects
+
+    def test_diff(self):
+        unchanged, changed, new = self.websites
+        self.browse(
+            [
+                self.index.get_raw_record(unchanged),
+                dict(self.index.get_raw_record(changed), name="Old name"),
+                {"objectID": 999, "name": "Orphan"},
+            ]
+        )
+
+        counts = self.index.reindex_all(strategy="diff")
+
+        self.assertEqual(counts, 3)
+        _, kwargs = self.client.save_objects.call_args
+        self.assertEqual(kwargs["index_name"], self.index.index_name)
+        self.assertEqual(
+            [obj["objectID"] for obj in kwargs["objects"]], [changed.pk, new.pk]
+        )
+        record = dict(kwargs["objects"][0])
+        stored_hash = record.pop("_contentHash")
+        self.assertEqual(diff.parse_hash(stored_hash), diff.content_hash(record))
+
+        _, kwargs = self.client.delete_objects.call_args
+        self.assertEqual(kwargs["object_ids"], ["999"])
+        self.client.clear_objects.assert_not_called()
+        self.assertEqual(operations(self.client, OperationType.MOVE), [])
+
+    def test_nothing_changed(self):
+        self.browse([self.index.get_raw_record(website) for website in self.websites])
+
+        self.assertEqual(self.index.reindex_all(strategy="diff"), 3)
+        self.client.save_objects.assert_not_called()
+        self.client.delete_objects.assert_not_called()
+
+    def test_missing_index(self):
+        self.client.browse_objects.side_effect = RequestException(
+            "Index does not exist", 404
+        )
+
+        self.assertEqual(self.index.reindex_all(strategy="diff"), 3)
+        self.assertEqual(len(operations(self.client, OperationType.MOVE)), 1)
+
+    def test_invalid_strategy(self):
+        with self.assertRaises(AlgoliaIndexError):
+            self.index.reindex_all(strategy="merge")
+
+
+class StoreIndex(AlgoliaIndex):
+    fields = ("name",)
+    should_index = "is_open"
+    watermark_field = "updated_at"
+
+
+class ReindexSinceTestCase(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.algolia_settings = dict(
+            settings.ALGOLIA,
+            STATE_STORE="algoliasearch_django.state.FileStateStore",
+            STATE_STORE_OPTIONS={"path": os.path.join(self.tmp_dir, "state.json")},
+        )
+        self.client = MagicMock()
+        self.index = StoreIndex(Store, self.client, self.algolia_settings)
+
+        self.old = Store.objects.create(name="Old")
+        self.since = timezone.now()
+        self.changed = Store.objects.create(name="Changed")
+        self.closed = Store.objects.create(name="Closed", is_open=False)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_reindex_since(self):
+        counts = self.index.reindex_since(self.since)
+
+        self.assertEqual(counts, 1)
+        _, kwargs = self.client.save_objects.call_args
+        self.assertEqual(kwargs["index_name"], self.index.index_name)
+        self.assertEqual(
+            kwargs["objects"], [{"objectID": self.changed.pk, "name": "Changed"}]
+        )
+        _, kwargs = self.client.delete_objects.call_args
+        self.assertEqual(kwargs["object_ids"], [self.closed.pk])
+        self.assertEqual(operations(self.client, OperationType.MOVE), [])
+
+    def test_watermark(self):
+        self.index.reindex_since(self.since)
+        self.client.reset_mock()
+
+        # The next run starts from the latest modification already sent
+        Store.objects.filter(pk=self.old.pk).update(
+            updated_at=self.closed.updated_at + datetime.timedelta(seconds=1)
+        )
+        index = StoreIndex(Store, self.client, self.algolia_settings)
+        self.assertEqual(index.reindex_since(), 1)
+
+        sent = [
+            obj["objectID"]
+            for _, kwargs in self.client.save_objects.call_args_list
+            for obj in kwargs["objects"]
+        ]
+        self.assertEqual(sent, [self.old.pk])
+
+    def test_watermark_lag(self):
+        self.index.reindex_since(self.since)
+        self.client.reset_mock()
+
+        # Committed after the last run, but modified before its watermark
+        Store.objects.filter(pk=self.old.pk).update(
+            updated_at=self.closed.updated_at - datetime.timedelta(seconds=1)
+        )
+        index = StoreIndex(Store, self.client, self.algolia_settings)
+        index.watermark_lag = datetime.timedelta(minutes=1)
+        index.reindex_since()
+
+        sent = [
+            obj["objectID"]
+            for _, kwargs in self.client.save_objects.call_args_list
+            for obj in kwargs["objects"]
+        ]
+        self.assertIn(self.old.pk, sent)
+
+    def test_watermark_without_persistent_store(self):
+        index = StoreIndex(Store, self.client, settings.ALGOLIA)
+
+        with self.assertRaises(AlgoliaIndexError):
+            index.reindex_since()
+        self.assertEqual(index.reindex_since(self.since), 1)
+
+    def test_no_watermark(self):
+        with self.assertRaises(AlgoliaIndexError):
+            self.index.reindex_since()
+
+        with self.assertRaises(AlgoliaIndexError):
+            WebsiteIndex(Website, self.client, settings.ALGOLIA).reindex_since(
+                self.since
+            )
+        self.client.save_objects.assert_not_called()
+
+    def test_not_queryset(self):
+        index = StoreIndex(Store, self.client, self.algolia_settings)
+        index.get_queryset = lambda: list(Store.objects.all())
+
+        with self.assertRaises(AlgoliaIndexError):
+            index.reindex_since(self.since)
+        self.client.save_objects.assert_not_called()
+
+    def test_failure_keeps_watermark(self):
+        self.client.save_objects.side_effect = ValueError("Invalid record")
+
+        with self.assertRaises(ValueError):
+            self.index.reindex_since(self.since)
+        with self.assertRaises(AlgoliaIndexError):
+            self.index.reindex_since()
+
+    @patch("algoliasearch_django.management.commands.algolia_reindex.reindex_since")
+    def test_command(self, mocked_reindex_since):
+        mocked_reindex_since.return_value = 1
+
+        call_command(
+            "algolia_reindex",
+            model=["Website"],
+            since="2024-01-02T03:04:05",
+            watermark_field="updated_at",
+            stdout=StringIO(),
+        )
+
+        (model, since), kwargs = mocked_reindex_since.call_args
+        self.assertEqual(model, Website)
+        self.assertEqual(
+            since.replace(tzinfo=None), datetime.datetime(2024, 1, 2, 3, 4, 5)
+        )
+        self.assertEqual(kwargs["watermark_field"], "updated_at")
+
+
+class OnlineWebsiteIndex(AlgoliaIndex):
+    fields = ("name", ("url", "link"))
+    should_index = "is_online"
+    tags = "name"
+
+
+class InstanceWebsiteIndex(OnlineWebsiteIndex):
+    def get_raw_record(self, instance, update_fields=None):
+        return super(InstanceWebsiteIndex, self).get_raw_record(instance, update_fields)
+
+
+class ValuesReindexTestCase(TestCase):
+    def setUp(self):
+        with patch.object(algolia_engine, "save_record"):
+            self.websites = WebsiteFactory.create_batch(5, is_online=True)
+            Website.objects.filter(pk=self.websites[1].pk).update(is_online=False)
+
+    def sent(self, index_cls):
+        client = reindex_client()
+        index_cls(Website, client, settings.ALGOLIA).reindex_all(batch_size=2)
+        return [
+            obj
+            for _, kwargs in client.save_objects.call_args_list
+            for obj in kwargs["objects"]
+        ]
+
+    def test_values(self):
+        with patch.object(Website, "from_db", side_effect=AssertionError):
+            records = self.sent(OnlineWebsiteIndex)
+
+        # Same records as the ones built from the instances
+        self.assertEqual(records, self.sent(InstanceWebsiteIndex))
+        self.assertEqual(len(records), 4)
+        self.assertEqual(set(records[0]), {"objectID", "name", "link", "_tags"})
+
+    def test_instances(self):
+        class MethodIndex(AlgoliaIndex):
+            fields = ("name", "location")
+
+        def row_plan(index_cls, model):
+            index = index_cls(model, MagicMock(), settings.ALGOLIA)
+            return index._AlgoliaIndex__row_plan
+
+        self.assertIsNone(row_plan(InstanceWebsiteIndex, Website))
+        self.assertIsNone(row_plan(MethodIndex, User))
+        columns, _ = row_plan(WebsiteIndex, Website)
+        self.assertEqual(columns, ("pk", "name", "url"))
+
+    def test_sliced_queryset(self):
+        class SlicedIndex(OnlineWebsiteIndex):
+            def get_queryset(self):
+                return Website.objects.order_by("-pk")[:3]
+
+        records = self.sent(SlicedIndex)
+        self.assertEqual(
+            [record["objectID"] for record in records],
+            [self.websites[4].pk, self.websites[3].pk, self.websites[2].pk],
+        )
+
+
+class BlogPostIndex(AlgoliaIndex):
+    fields = ("text", "author__name", "author.username", ("categories__name", "tags"))
+
+
+class RelatedPathTestCase(TestCase):
+    def setUp(self):
+        with patch.object(algolia_engine, "save_record"):
+            self.authors = UserFactory.create_batch(2)
+        django, python = Category.objects.bulk_create(
+            [Category(name="Django"), Category(name="Python")]
+        )
+        self.posts = []
+        for i in range(4):
+            post = BlogPost.objects.create(author=self.authors[i % 2], text=str(i))
+            post.categories.set([django, python][: i % 3])
+            self.posts.append(post)
+
+    def test_record(self):
+        index = BlogPostIndex(BlogPost, MagicMock(), settings.ALGOLIA)
+
+        self.assertEqual(
+            index.get_raw_record(self.posts[2]),
+            {
+                "objectID": self.posts[2].pk,
+                "text": "2",
+                "author__name": self.authors[0].name,
+                "author.username": self.authors[0].username,
+                "tags": ["Django", "Python"],
+            },
+        )
+        self.assertEqual(index.get_raw_record(self.posts[0])["tags"], [])
+
+    def test_queries(self):
+        client = reindex_client()
+        index = BlogPostIndex(BlogPost, client, settings.ALGOLIA)
+
+        # One query for the posts and their authors, one for the categories
+        with self.assertNumQueries(2):
+            self.assertEqual(index.reindex_all(batch_size=10), 4)
+
+        ((_, kwargs),) = client.save_objects.call_args_list
+        self.assertEqual(
+            [record["tags"] for record in kwargs["objects"]],
+            [[], ["Django"], ["Django", "Python"], []],
+        )
+
+    def test_values(self):
+        class AuthorIndex(AlgoliaIndex):
+            fields = ("text", ("author__name", "author"))
+
+        client = reindex_client()
+        index = AuthorIndex(BlogPost, client, settings.ALGOLIA)
+        columns, _ = index._AlgoliaIndex__row_plan
+        self.assertEqual(columns, ("pk", "text", "author__name"))
+
+        with patch.object(BlogPost, "from_db", side_effect=AssertionError):
+            index.reindex_all()
+        ((_, kwargs),) = client.save_objects.call_args_list
+        self.assertEqual(kwargs["objects"][1]["author"], self.authors[1].name)
+
+    def test_invalid_path(self):
+        for path in ("author__missing", "text__name", "missing__name"):
+            index_cls = type(str("InvalidIndex"), (AlgoliaIndex,), {"fields": (path,)})
+            with self.assertRaises(AlgoliaIndexError):
+                index_cls(BlogPost, MagicMock(), settings.ALGOLIA)
+
+
+class ChunkedIterationTestCase(TestCase):
+    def setUp(self):
+        with patch.object(algolia_engine, "save_record"):
+            Website.objects.bulk_create(
+                [
+                    Website(name=str(i), url="https://algolia.com", is_online=True)
+                    for i in range(25)
+                ]
+            )
+
+    def test_chunks(self):
+        with self.assertNumQueries(3):
+            names = [
+                website.name
+                for website in AlgoliaIndex._iter_chunked(Website.objects.all(), 10)
+            ]
+        self.assertEqual(names, [str(i) for i in range(25)])
+
+    def test_sliced(self):
+        qs = Website.objects.order_by("-pk")[:12]
+        with self.assertNumQueries(1):
+            names = [website.name for website in AlgoliaIndex._iter_chunked(qs, 5)]
+        self.assertEqual(names, [str(i) for i in range(24, 12, -1)])
+
+    def test_iterable(self):
+        websites = list(Website.objects.all())
+        self.assertEqual(list(AlgoliaIndex._iter_chunked(websites, 10)), websites)
+
+    def test_memory_is_bounded(self):
+        with patch.object(algolia_engine, "save_record"):
+            Website.objects.bulk_create(
+                [
+                    Website(name="x" * 200, url="https://algolia.com", is_online=True)
+                    for _ in range(5000)
+                ]
+            )
+
+        first = Website.objects.filter(name="x" * 200).order_by("pk").first().pk
+
+        def peak_memory(rows):
+            qs = Website.objects.filter(pk__gte=first, pk__lt=first + rows)
+            tracemalloc.start()
+            for _ in AlgoliaIndex._iter_chunked(qs, 100):
+                pass
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            return peak
+
+        small = peak_memory(500)
+        large = peak_memory(5000)
+        self.assertLess(large, small * 1.5)
+
+
+class RankedWebsiteIndex(WebsiteIndex):
+    def prepare_batch(self, instances):
+        self.batches.append([instance.pk for instance in instances])
+        return {instance.pk: {"rank": instance.pk * 10} for instance in instances}
+
+
+class PrepareBatchTestCase(TestCase):
+    def setUp(self):
+        with patch.object(algolia_engine, "save_record"):
+            self.websites = WebsiteFactory.create_batch(5)
+        self.client = reindex_client()
+        self.index = RankedWebsiteIndex(Website, self.client, settings.ALGOLIA)
+        self.index.batches = []
+
+    def sent(self):
+        return [
+            obj
+            for _, kwargs in self.client.save_objects.call_args_list
+            for obj in kwargs["objects"]
+        ]
+
+    def test_reindex_all(self):
+        self.index.reindex_all(batch_size=2)
+
+        pks = [website.pk for website in self.websites]
+        self.assertEqual(self.index.batches, [pks[:2], pks[2:4], pks[4:]])
+        self.assertEqual(
+            [(obj["objectID"], obj["rank"]) for obj in self.sent()],
+            [(pk, pk * 10) for pk in pks],
+        )
+
+    def test_save_record(self):
+        website = self.websites[0]
+
+        self.index.save_record(website)
+
+        self.assertEqual(self.index.batches, [[website.pk]])
+        self.assertEqual(self.sent()[0]["rank"], website.pk * 10)
+
+    def test_partial_update(self):
+        self.index.save_record(self.websites[0], update_fields=["name"])
+
+        self.assertEqual(self.index.batches, [])
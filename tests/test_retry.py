@@ -0,0 +1,192 @@
+import decimal
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from algoliasearch.http.exceptions import AlgoliaUnreachableHostException
+from algoliasearch.http.exceptions import RequestException
+from mock import MagicMock, patch
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import TestCase
+
+from algoliasearch_django import AlgoliaIndex
+from algoliasearch_django import ALGOLIA_SETTINGS
+from algoliasearch_django import algolia_engine
+from algoliasearch_django.deadletters import FileDeadLetterSink
+from algoliasearch_django.retry import RetryPolicy, is_retryable
+
+from .models import Website
+
+
+@patch("algoliasearch_django.retry.time.sleep")
+class RetryPolicyTestCase(TestCase):
+    def test_is_retryable(self, _):
+        self.assertTrue(is_retryable(RequestException("Too many requests", 429)))
+        self.assertTrue(is_retryable(RequestException("Unavailable", 503)))
+        self.assertTrue(is_retryable(AlgoliaUnreachableHostException("Timeout")))
+        self.assertFalse(is_retryable(RequestException("Bad request", 400)))
+        self.assertFalse(is_retryable(ValueError()))
+
+    def test_retry_until_success(self, mocked_sleep):
+        func = MagicMock(side_effect=[RequestException("Unavailable", 503), "ok"])
+        policy = RetryPolicy(max_attempts=3, base_delay=1, max_delay=2)
+
+        self.assertEqual(policy.call(func, 1, name="Algolia"), "ok")
+        self.assertEqual(func.call_count, 2)
+        func.assert_called_with(1, name="Algolia")
+        (delay,), _ = mocked_sleep.call_args
+        self.assertTrue(0 <= delay <= 1)
+
+    def test_max_attempts(self, mocked_sleep):
+        func = MagicMock(side_effect=RequestException("Unavailable", 503))
+        policy = RetryPolicy(max_attempts=3)
+
+        with self.assertRaises(RequestException):
+            policy.call(func)
+        self.assertEqual(func.call_count, 3)
+        self.assertEqual(mocked_sleep.call_count, 2)
+
+    def test_max_time(self, mocked_sleep):
+        func = MagicMock(side_effect=RequestException("Unavailable", 503))
+        policy = RetryPolicy(max_attempts=10, base_delay=10, max_delay=10, max_time=0)
+
+        with self.assertRaises(RequestException):
+            policy.call(func)
+        func.assert_called_once()
+        mocked_sleep.assert_not_called()
+
+    def test_permanent_error(self, mocked_sleep):
+        func = MagicMock(side_effect=RequestException("Bad request", 400))
+        policy = RetryPolicy(max_attempts=3)
+
+        with self.assertRaises(RequestException):
+            policy.call(func)
+        func.assert_called_once()
+
+
+@patch("algoliasearch_django.retry.time.sleep")
+class DeadLetterTestCase(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.algolia_settings = dict(
+            settings.ALGOLIA,
+            RETRY_MAX_ATTEMPTS=2,
+            DEAD_LETTER_SINK="algoliasearch_django.deadletters.FileDeadLetterSink",
+            DEAD_LETTER_SINK_OPTIONS={
+                "path": os.path.join(self.tmp_dir, "dead_letters.jsonl")
+            },
+        )
+        self.sink = FileDeadLetterSink(os.path.join(self.tmp_dir, "dead_letters.jsonl"))
+        self.website = Website(id=1, name="Algolia", url="https://algolia.com")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_exhausted_write(self, _):
+        client = MagicMock()
+        client.save_objects.side_effect = RequestException("Unavailable", 503)
+        index = AlgoliaIndex(Website, client, self.algolia_settings)
+
+        with patch("algoliasearch_django.models.DEBUG", False):
+            index.save_record(self.website)
+
+        self.assertEqual(client.save_objects.call_count, 2)
+        (entry,) = self.sink.pop_all()
+        self.assertEqual(entry["index_name"], index.index_name)
+        self.assertEqual(entry["action"], "save")
+        self.assertEqual(entry["records"][0]["objectID"], 1)
+        self.assertEqual(self.sink.pop_all(), [])
+
+    def test_kept_as_sent(self, _):
+        client = MagicMock()
+        client.save_objects.side_effect = RequestException("Unavailable", 503)
+        index = AlgoliaIndex(Website, client, self.algolia_settings)
+
+        with patch("algoliasearch_django.models.DEBUG", False):
+            index.save_objects([{"objectID": 1, "price": decimal.Decimal("12.50")}])
+
+        # The replay sends the same payload
+        (entry,) = self.sink.pop_all()
+        self.assertEqual(entry["records"], [{"objectID": 1, "price": 12.5}])
+
+    def test_permanent_error_is_not_kept(self, _):
+        client = MagicMock()
+        client.delete_objects.side_effect = RequestException("Bad request", 400)
+        index = AlgoliaIndex(Website, client, self.algolia_settings)
+
+        with patch("algoliasearch_django.models.DEBUG", False):
+            index.delete_record(self.website)
+
+        client.delete_objects.assert_called_once()
+        self.assertEqual(self.sink.pop_all(), [])
+
+    def test_replay_command(self, _):
+        adapter = algolia_engine.get_adapter(Website)
+        self.sink.add(adapter.index_name, "save", [{"objectID": 1, "name": "A"}], "")
+        self.sink.add(adapter.index_name, "save", [{"objectID": 1, "name": "B"}], "")
+        self.sink.add(adapter.index_name, "delete", [{"objectID": 2}], "")
+        self.sink.add("unknown_index", "delete", [{"objectID": 3}], "")
+        out = StringIO()
+
+        with patch.dict(ALGOLIA_SETTINGS, self.algolia_settings):
+            with patch.object(adapter, "save_objects") as mocked_save_objects:
+                with patch.object(adapter, "delete_objects") as mocked_delete_objects:
+                    call_command(
+                        "algolia_replay_dead_letters", stdout=out, stderr=StringIO()
+                    )
+
+        (records,), _ = mocked_save_objects.call_args
+        self.assertEqual(records, [{"objectID": 1, "name": "B"}])
+        (object_ids,), _ = mocked_delete_objects.call_args
+        self.assertEqual(object_ids, [2])
+        self.assertIn("Replayed 2 records, 0 failed", out.getvalue())
+
+        (kept,) = self.sink.pop_all()
+        self.assertEqual(kept["index_name"], "unknown_index")
+
+    def test_replay_puts_back_failures(self, _):
+        adapter = algolia_engine.get_adapter(Website)
+        self.sink.add(adapter.index_name, "save", [{"objectID": 1, "name": "A"}], "")
+        self.sink.add(adapter.index_name, "delete", [{"objectID": 2}], "")
+        out = StringIO()
+
+        with patch.dict(ALGOLIA_SETTINGS, self.algolia_settings):
+            with patch.object(
+                adapter, "save_objects", side_effect=ValueError("Not serializable")
+            ):
+                with patch.object(
+                    adapter,
+                    "delete_objects",
+                    side_effect=RequestException("Bad request", 400),
+                ):
+                    call_command(
+                        "algolia_replay_dead_letters", stdout=out, stderr=StringIO()
+                    )
+
+        self.assertIn("Replayed 0 records, 2 failed", out.getvalue())
+        self.assertEqual(
+            [(entry["action"], entry["records"]) for entry in self.sink.pop_all()],
+            [("save", [{"objectID": 1, "name": "A"}]), ("delete", [{"objectID": 2}])],
+        )
+
+    def test_replay_interrupted(self, _):
+        adapter = algolia_engine.get_adapter(Website)
+        self.sink.add(adapter.index_name, "save", [{"objectID": 1, "name": "A"}], "")
+
+        with patch.dict(ALGOLIA_SETTINGS, self.algolia_settings):
+            with patch.object(adapter, "save_objects", side_effect=KeyboardInterrupt):
+                with self.assertRaises(KeyboardInterrupt):
+                    call_command(
+                        "algolia_replay_dead_letters",
+                        stdout=StringIO(),
+                        stderr=StringIO(),
+                    )
+
+        self.sink.add(adapter.index_name, "delete", [{"objectID": 2}], "")
+        self.assertEqual(
+            [entry["action"] for entry in self.sink.pop_all()], ["save", "delete"]
+        )
+        self.assertEqual(os.listdir(self.tmp_dir), [])
@@ -0,0 +1,62 @@
+import datetime
+import os
+import shutil
+import tempfile
+
+from django.test import TestCase
+
+from algoliasearch_django.state import CacheStateStore, FileStateStore, get_store
+
+
+class StateStoreTestCase(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, "state.json")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_get_store(self):
+        self.assertIsInstance(get_store("index", {}), CacheStateStore)
+        # The default cache of the tests is a LocMemCache
+        self.assertFalse(get_store("index", {}).persistent)
+        store = get_store(
+            "index",
+            {
+                "STATE_STORE": "algoliasearch_django.state.FileStateStore",
+                "STATE_STORE_OPTIONS": {"path": self.path},
+            },
+        )
+        self.assertIsInstance(store, FileStateStore)
+        self.assertTrue(store.persistent)
+
+    def test_cache_store(self):
+        store = CacheStateStore("index")
+        other = CacheStateStore("other")
+
+        store.set("watermark:updated_at", 42)
+        self.assertEqual(store.get("watermark:updated_at"), 42)
+        self.assertIsNone(other.get("watermark:updated_at"))
+
+        store.delete("watermark:updated_at")
+        self.assertEqual(store.get("watermark:updated_at", 0), 0)
+
+    def test_file_store(self):
+        store = FileStateStore("index", self.path)
+        other = FileStateStore("other", self.path)
+        now = datetime.datetime(
+            2024, 1, 2, 3, 4, 5, 123456, tzinfo=datetime.timezone.utc
+        )
+
+        store.set("watermark:updated_at", now)
+        other.set("watermark:updated_at", 42)
+
+        reopened = FileStateStore("index", self.path)
+        self.assertEqual(
+            reopened.get("watermark:updated_at"), "2024-01-02T03:04:05.123456+00:00"
+        )
+        self.assertEqual(other.get("watermark:updated_at"), 42)
+
+        store.delete("watermark:updated_at")
+        self.assertIsNone(store.get("watermark:updated_at"))
+        self.assertEqual(other.get("watermark:updated_at"), 42)
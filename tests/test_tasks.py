@@ -0,0 +1,73 @@
+from mock import MagicMock
+
+from django.conf import settings
+from django.test import TestCase
+
+from algoliasearch_django import AlgoliaIndex
+from algoliasearch_django import wait_all
+from algoliasearch_django.models import AlgoliaIndexError
+from algoliasearch_django.tasks import TaskWaiter
+
+from .models import Website
+
+
+class TaskWaiterTestCase(TestCase):
+    def test_wait_all(self):
+        client = MagicMock()
+        waiter = TaskWaiter()
+        waiter.add(client, "index", 1)
+        waiter.add(client, "index", 2)
+        waiter.wait_all()
+
+        self.assertEqual(client.wait_for_task.call_count, 2)
+        client.wait_for_task.assert_called_with("index", 2)
+
+    def test_log_failures(self):
+        client = MagicMock()
+        client.wait_for_task.side_effect = Exception("Task timed out")
+        waiter = TaskWaiter()
+
+        with self.assertLogs("algoliasearch_django.tasks", level="WARNING") as logs:
+            waiter.add(client, "index", 1)
+            waiter.wait_all()
+
+        self.assertIn("TASK 1 ON index FAILED: Task timed out", logs.output[0])
+
+
+class WaitForTasksTestCase(TestCase):
+    def setUp(self):
+        self.client = MagicMock()
+        self.client.save_objects.return_value = [MagicMock(task_id=42)]
+        self.website = Website(id=1, name="Algolia", url="https://algolia.com")
+
+    def test_always(self):
+        index = AlgoliaIndex(Website, self.client, settings.ALGOLIA)
+        index.save_record(self.website)
+
+        _, kwargs = self.client.save_objects.call_args
+        self.assertTrue(kwargs["wait_for_tasks"])
+
+    def test_background(self):
+        algolia_settings = dict(settings.ALGOLIA, WAIT_FOR_TASKS="background")
+        index = AlgoliaIndex(Website, self.client, algolia_settings)
+        index.save_record(self.website)
+        wait_all()
+
+        _, kwargs = self.client.save_objects.call_args
+        self.assertFalse(kwargs["wait_for_tasks"])
+        self.client.wait_for_task.assert_called_once_with(index.index_name, 42)
+
+    def test_never(self):
+        algolia_settings = dict(settings.ALGOLIA, WAIT_FOR_TASKS="never")
+        index = AlgoliaIndex(Website, self.client, algolia_settings)
+        index.save_record(self.website)
+        wait_all()
+
+        _, kwargs = self.client.save_objects.call_args
+        self.assertFalse(kwargs["wait_for_tasks"])
+        self.client.wait_for_task.assert_not_called()
+
+    def test_invalid_policy(self):
+        algolia_settings = dict(settings.ALGOLIA, WAIT_FOR_TASKS="sometimes")
+        with self.assertRaises(AlgoliaIndexError):
+            AlgoliaIndex(Website, self.client, algolia_settings)
@@ -0,0 +1,178 @@
+from mock import patch
+
+from django.test import TestCase
+
+from algoliasearch_django import AlgoliaEngine
+from algoliasearch_django import algolia_engine
+from algoliasearch_django import AlgoliaIndex
+from algoliasearch_django.tracking import ChangedFields, get_changed_fields
+
+from .factories import UserFactory
+from .models import User
+from .test_reindex import reindex_client
+
+
+class UserIndex(AlgoliaIndex):
+    fields = ("name", "bio", ("permissions", "roles"))
+    geo_field = "location"
+    track_changes = True
+    field_dependencies = {
+        "permissions": ("_permissions",),
+        "location": ("_lat", "_lng"),
+    }
+
+
+class TrackingTestCase(TestCase):
+    def setUp(self):
+        self.engine = AlgoliaEngine()
+        self.engine.client = reindex_client()
+        self.engine.client.partial_update_objects.return_value = []
+        patcher = patch.object(algolia_engine, "save_record")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        for model in self.engine.get_registered_models():
+            self.engine.unregister(model)
+
+    def register(self, index_cls=UserIndex):
+        self.engine.register(User, index_cls)
+        user = UserFactory(followers_count=1, _permissions="admin")
+        self.engine.client.reset_mock()
+        return User.objects.get(pk=user.pk)
+
+    def partial_records(self):
+        return [
+            obj
+            for _, kwargs in self.engine.client.partial_update_objects.call_args_list
+            for obj in kwargs["objects"]
+        ]
+
+    def test_changed_fields(self):
+        user = self.register()
+
+        self.assertEqual(get_changed_fields(user), ChangedFields())
+        user.bio = "Algolia"
+        self.assertEqual(get_changed_fields(user), {"bio"})
+
+    def test_partial_update(self):
+        user = self.register()
+
+        user.bio = "Algolia"
+        user.save()
+
+        self.assertEqual(
+            self.partial_records(), [{"objectID": user.pk, "bio": "Algolia"}]
+        )
+        self.engine.client.save_objects.assert_not_called()
+
+    def test_dependencies(self):
+        user = self.register()
+
+        user._permissions = "admin,editor"
+        user.save()
+        user._lat = 48.8
+        user.save()
+
+        self.assertEqual(
+            self.partial_records(),
+            [
+                {"objectID": user.pk, "roles": ["admin", "editor"]},
+                {"objectID": user.pk, "_geoloc": {"lat": 48.8, "lng": user._lng}},
+            ],
+        )
+
+    def test_undeclared_dependencies(self):
+        class UserUndeclaredIndex(UserIndex):
+            field_dependencies = {}
+
+        user = self.register(UserUndeclaredIndex)
+
+        user.bio = "Algolia"
+        user.save()
+
+        self.assertEqual(
+            self.partial_records(),
+            [
+                {
+                    "objectID": user.pk,
+                    "bio": "Algolia",
+                    "roles": ["admin"],
+                    "_geoloc": {"lat": user._lat, "lng": user._lng},
+                }
+            ],
+        )
+
+    def test_unchanged(self):
+        user = self.register()
+
+        user.save()
+
+        self.engine.client.partial_update_objects.assert_not_called()
+        self.engine.client.save_objects.assert_not_called()
+
+    def test_snapshot_refreshed(self):
+        user = self.register()
+
+        user.bio = "Algolia"
+        user.save(update_fields=["bio"])
+        user.name = "Algolia"
+        user.save()
+
+        self.assertEqual(
+            self.partial_records(),
+            [
+                {"objectID": user.pk, "bio": "Algolia"},
+                {"objectID": user.pk, "name": "Algolia"},
+            ],
+        )
+
+    def test_created(self):
+        self.engine.register(User, UserIndex)
+
+        UserFactory()
+
+        self.engine.client.save_objects.assert_called_once()
+        self.engine.client.partial_update_objects.assert_not_called()
+
+    def test_without_track_changes(self):
+        class UserUntrackedIndex(UserIndex):
+            track_changes = False
+
+        user = self.register(UserUntrackedIndex)
+
+        user.bio = "Algolia"
+        user.save()
+
+        self.engine.client.save_objects.assert_called_once()
+        self.engine.client.partial_update_objects.assert_not_called()
+
+    def test_should_index(self):
+        class UserFollowedIndex(UserIndex):
+            should_index = "is_followed"
+
+        user = self.register(UserFollowedIndex)
+
+        user.bio = "Algolia"
+        user.save()
+
+        # should_index could have changed, the record is sent in full
+        self.engine.client.save_objects.assert_called_once()
+        self.engine.client.partial_update_objects.assert_not_called()
+
+    def test_should_index_dependencies(self):
+        class UserFollowedIndex(UserIndex):
+            should_index = "is_followed"
+            field_dependencies = dict(
+                UserIndex.field_dependencies, is_followed=("followers_count",)
+            )
+
+        user = self.register(UserFollowedIndex)
+
+        user.bio = "Algolia"
+        user.save()
+        self.engine.client.save_objects.assert_not_called()
+
+        user.followers_count = 2
+        user.save()
+        self.engine.client.save_objects.assert_called_once()